@@ -26,6 +26,11 @@ setup(name='vrpwrp',
           'requests',
           'pillow'
       ],
+      extras_require={
+          'async': ['aiohttp'],
+          'video': ['opencv-python'],
+          'fast': ['orjson']
+      },
       test_suite='nose.collector',
       tests_require=['nose'],
       include_package_data=True,
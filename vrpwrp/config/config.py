@@ -6,3 +6,66 @@ __author__ = 'Iván de Paz Centeno'
 FACE_DETECTION_API = "http://visnode.sockhost.net:9909/detection-requests/faces/stream"
 FACE_RECOGNITION_API = "http://visnode.sockhost.net:9909/recognition-requests/face/embedding/stream"
 PORN_CLASSIFICATION_API = ""
+
+# Connection pool shared by the API wrappers.
+POOL_CONNECTIONS = 10       # Number of different hosts to keep a pool for.
+POOL_MAXSIZE = 10           # Maximum number of keep-alive connections kept per host.
+POOL_BLOCK = False          # Whether to block when the pool of a host has no free connections.
+KEEP_ALIVE = True           # Reuse the connections between requests.
+REQUEST_TIMEOUT = (5, 60)   # (connect, read) timeouts in seconds.
+MAX_RETRIES = 3             # Retries for failed connections and 502/503/504 responses.
+BACKOFF_FACTOR = 0.3        # Sleep between retries: {backoff factor} * (2 ** ({retry number} - 1)) seconds.
+COALESCE_REQUESTS = True    # Share a single request among concurrent identical ones (same method, URL and payload).
+
+# Connection pool shared by the asyncio wrappers.
+ASYNC_MAX_CONCURRENCY = 100 # Maximum number of requests in flight.
+
+# Face bundle.
+FACE_BUNDLE_WORKERS = 8             # Face embeddings requested in parallel for a single image.
+FACE_BUNDLE_CROP_FORMAT = "PNG"     # Format of the uploaded faces: "PNG" (lossless), "JPEG" or "PPM" (raw).
+FACE_BUNDLE_CROP_QUALITY = 90       # JPEG quality of the uploaded faces.
+FACE_BUNDLE_CROP_MAX_SIDE = None    # Downscale the uploaded faces to this size. None to keep them as they are.
+
+# Batch face recognition.
+FACE_RECOGNITION_BATCH_API = ""     # Endpoint that embeds several faces in a multipart request. Empty if unavailable.
+FACE_RECOGNITION_WORKERS = 8        # Parallel single requests when batching is not available.
+FACE_RECOGNITION_BATCH_COOLDOWN = 300    # Seconds without batching after a failed batch request.
+
+# Face detection uploads.
+FACE_DETECTION_MAX_SIDE = None          # Downscale bigger images to this size before upload. None to disable.
+FACE_DETECTION_MAX_PIXELS = None        # Downscale images with more pixels than this before upload. None to disable.
+FACE_DETECTION_UPLOAD_FORMAT = "JPEG"   # Format of the downscaled images: "JPEG", "PNG" or "PPM".
+FACE_DETECTION_UPLOAD_QUALITY = 90      # JPEG quality of the downscaled images.
+
+# Cache of results, keyed by the hash of the uploaded content and the endpoint.
+RESULT_CACHE_ENABLED = False    # Whether the wrappers share a cache by default.
+RESULT_CACHE_MAX_ENTRIES = 1024 # Results kept in memory. The least recently used are evicted first.
+RESULT_CACHE_TTL = None         # Seconds a result is valid for. None to keep them until evicted.
+RESULT_CACHE_PATH = None        # Sqlite database to persist the results on disk. None to keep them only in memory.
+
+# Porn classification.
+PORN_CLASSIFICATION_WORKERS = 8     # Segments of an image scored in parallel.
+PORN_CLASSIFICATION_ADAPTIVE = False            # is_porn() scores a downscaled image first, refining only if uncertain.
+PORN_CLASSIFICATION_COARSE_SIDE = 1024          # Maximum side of the downscaled image of the adaptive scoring.
+PORN_CLASSIFICATION_UNCERTAIN_BAND = (0.2, 0.8) # Scores of the downscaled image that require refining into segments.
+PORN_CLASSIFICATION_SEGMENTS_OVERLAP = 128      # Pixels shared by contiguous segments when refining.
+
+# Video face tracking.
+VIDEO_KEYFRAME_INTERVAL = 15        # Maximum number of frames between face detections.
+VIDEO_SCENE_CHANGE_THRESHOLD = 30.0 # Mean pixel difference (0-255) between frames that triggers a new detection.
+VIDEO_TRACK_IOU_THRESHOLD = 0.3     # Minimum IoU to associate a detection with a track.
+VIDEO_TRACK_MAX_MISSED = 2          # Keyframes a track may be missing from the detections before it is dropped.
+
+# Frame pipeline.
+FRAME_PIPELINE_WORKERS = 8          # Frames processed at the same time.
+FRAME_PIPELINE_LOOK_AHEAD = 16      # Frames read and not yet yielded. Bounds the memory used.
+FRAME_PIPELINE_FORMAT = "JPEG"      # Format of the uploaded decoded frames: "JPEG", "PNG" or "PPM".
+FRAME_PIPELINE_QUALITY = 90         # JPEG quality of the uploaded frames.
+
+# Process pool for the CPU work on images (decoding, cropping and encoding).
+IMAGE_PROCESS_POOL_ENABLED = False          # Whether FaceBundle and PornClassification use the shared pool by default.
+IMAGE_PROCESS_POOL_WORKERS = None           # Worker processes. None to use all the cores.
+IMAGE_PROCESS_POOL_START_METHOD = "spawn"   # Start method of the workers. "spawn" is safe along with threads.
+
+# JSON.
+FAST_JSON = True    # Parse the responses with orjson, if it is installed (pip3 install vrpwrp[fast]).
@@ -5,12 +5,22 @@ import io
 from PIL import Image
 from vrpwrp.tools.boundingbox import BoundingBox
 
+# Numpy allows tiles to be views of a decoded array.
+try:
+    import numpy as np
+    NUMPY_LOADED = True
+except Exception as ex:
+    NUMPY_LOADED = False
+
 __author__ = 'Iván de Paz Centeno'
 
 
 HORIZONTAL = 0
 VERTICAL = 1
 
+# Image modes that each lossy or raw format can store. Other modes are encoded as RGB.
+_ENCODABLE_MODES = {"JPEG": ("1", "L", "RGB", "CMYK"), "PPM": ("1", "L", "RGB")}
+
 def get_file_binary_content(uri):
     """
     Retrieves the binary content of a file URI.
@@ -32,26 +42,121 @@ def get_file_image(uri):
         image = im.convert("RGB")
     return image
 
-def get_image(image_bytes):
+def get_image(image_bytes, draft_size=None):
     """
     Retrieves the PIL image from the given array of bytes.
     :param image_bytes: bytes to convert into a PIL image.
+    :param draft_size: if specified, JPEG images are decoded at the smallest reduced resolution (1/2, 1/4 or 1/8) that
+    is still bigger than this (width, height), which is much faster. Other formats are decoded at full resolution.
     :return: PIL image.
     """
     with io.BytesIO(image_bytes) as bytes_io, Image.open(bytes_io) as im:
+        if draft_size is not None:
+            im.draft("RGB", draft_size)
+
         image = im.convert("RGB")
     return image
 
+def get_image_size(image_bytes):
+    """
+    Retrieves the size of the image from the given array of bytes, reading only its header.
+    :param image_bytes: bytes of the image file.
+    :return: tuple (width, height) of the image.
+    """
+    with io.BytesIO(image_bytes) as bytes_io, Image.open(bytes_io) as im:
+        size = im.size
+    return size
+
+def get_scale(size, max_side=None, max_pixels=None):
+    """
+    Computes the scale factor to reduce an image of the given size so that it fits the given limits.
+    :param size: tuple (width, height) of the image.
+    :param max_side: maximum size of the width and the height. None for no limit.
+    :param max_pixels: maximum number of pixels (width * height). None for no limit.
+    :return: scale factor, 1.0 if the image already fits.
+    """
+    width, height = size
+    scale = 1.0
+
+    if max_side is not None:
+        scale = min(scale, max_side / max(width, height))
+
+    if max_pixels is not None:
+        scale = min(scale, (max_pixels / (width * height)) ** 0.5)
+
+    return scale
+
+def get_preview(image_bytes, max_side):
+    """
+    Retrieves a reduced version of the image from the given array of bytes. JPEG images are decoded directly at reduced
+    resolution, which is much faster and lighter than decoding them whole.
+    :param image_bytes: bytes of the image file.
+    :param max_side: maximum size of the width and the height of the preview.
+    :return: PIL image, downscaled if it did not fit.
+    """
+    width, height = get_image_size(image_bytes)
+    scale = get_scale((width, height), max_side)
+
+    if scale >= 1:
+        return get_image(image_bytes)
+
+    image = get_image(image_bytes, draft_size=(max(1, int(round(width * scale))), max(1, int(round(height * scale)))))
+
+    return downscale(image, max_side)
+
 def to_byte_array(pil_image):
     """
     converts the PIL image into a bytes array.
     :param pil_image: PIL image to convert to
     :return: Bytes array representing the image.
     """
+    return encode_image(pil_image)
+
+def downscale(pil_image, max_side):
+    """
+    Reduces the size of a PIL image, keeping its aspect ratio, so that none of its sides is bigger than max_side.
+    :param pil_image: PIL image to downscale.
+    :param max_side: maximum size of the width and the height.
+    :return: the downscaled PIL image, or the same image if it already fits.
+    """
+    return resize_by_scale(pil_image, get_scale(pil_image.size, max_side))
+
+def resize_by_scale(pil_image, scale):
+    """
+    Reduces the size of a PIL image by a scale factor.
+    :param pil_image: PIL image to downscale.
+    :param scale: scale factor. Values of 1 or more leave the image as it is.
+    :return: the downscaled PIL image, or the same image if the scale is not lower than 1.
+    """
+    if scale >= 1:
+        return pil_image
+
+    width, height = pil_image.size
+
+    return pil_image.resize((max(1, int(round(width * scale))), max(1, int(round(height * scale)))), Image.BILINEAR)
+
+def encode_image(pil_image, image_format="PNG", quality=90, max_side=None):
+    """
+    Encodes the PIL image into the bytes of an image file.
+    :param pil_image: PIL image to encode.
+    :param image_format: format of the image file: "PNG" (lossless), "JPEG" (much faster and smaller) or "PPM" (raw
+    pixels, no compression at all). Images that the format can't store, like the ones with transparency or a palette,
+    are encoded as RGB.
+    :param quality: quality of the JPEG compression, from 1 to 95. Ignored for other formats.
+    :param max_side: if specified, the image is downscaled before encoding so that none of its sides exceeds it.
+    :return: Bytes array representing the image.
+    """
+    if pil_image.mode not in _ENCODABLE_MODES.get(image_format.upper(), (pil_image.mode,)):
+        pil_image = pil_image.convert("RGB")
+
+    if max_side is not None:
+        pil_image = downscale(pil_image, max_side)
+
+    options = {"quality": quality} if image_format == "JPEG" else {}
+
     with io.BytesIO() as bytes_io:
-        pil_image.save(bytes_io, "PNG")
-        bytes_io.seek(0)
-        result = bytes_io.read()
+        pil_image.save(bytes_io, image_format, **options)
+        result = bytes_io.getvalue()
 
     return result
 
@@ -79,6 +184,68 @@ def get_cropped_faces(pil_image, bounding_boxes):
     """
     return [crop_by_bbox(pil_image, bounding_box) for bounding_box in bounding_boxes]
 
+def _get_segments_positions(size, segment_width, segment_height, iteration_order=HORIZONTAL, overlap=0):
+    """
+    Generator of the (left, top, width, height) of the segments of an image of the given size.
+    """
+    if overlap < 0:
+        raise ValueError("The overlap must not be negative, but it is {}.".format(overlap))
+
+    # Bigger overlaps would multiply the number of segments, up to one per pixel.
+    overlap = min(overlap, min(segment_width, segment_height) // 2)
+
+    width, height = size
+    step_x = segment_width - overlap
+    step_y = segment_height - overlap
+
+    horizontal_segment_count = 1 + max(0, width - overlap - 1) // step_x if width > 0 else 0
+    vertical_segment_count = 1 + max(0, height - overlap - 1) // step_y if height > 0 else 0
+
+    if iteration_order==VERTICAL:
+        positions = ((x, y) for x in range(horizontal_segment_count) for y in range(vertical_segment_count))
+    else:
+        positions = ((x, y) for y in range(vertical_segment_count) for x in range(horizontal_segment_count))
+
+    for x, y in positions:
+        yield x * step_x, y * step_y, min(segment_width, width - x * step_x), min(segment_height, height - y * step_y)
+
+def get_segments_bounding_boxes(size, segment_width, segment_height, iteration_order=HORIZONTAL, overlap=0):
+    """
+    Generator of the bounding boxes of the segments of an image of the given size, in the same order as
+    segment_image(). Segments in the right and bottom borders may be smaller.
+    :param size: tuple (width, height) of the image.
+    :param segment_width: the width of the fragment.
+    :param segment_height: the height of the fragment.
+    :param iteration_order: order of the iteration_order.
+    :param overlap: number of pixels shared by contiguous segments, so that content across the borders of a segment
+    is also seen whole in another one. It is limited to half the size of the segments.
+    :return:
+    """
+    for left, top, width, height in _get_segments_positions(size, segment_width, segment_height, iteration_order,
+                                                            overlap):
+        yield BoundingBox(left, top, width, height)
+
+def get_tiles(image, segment_width, segment_height, iteration_order=HORIZONTAL, overlap=0):
+    """
+    Generator of lightweight descriptors of the segments of an image. Nothing is cropped, copied or encoded until a
+    tile is actually used, so iterating the tiles of a very large image is almost free.
+    :param image: PIL image, or numpy array of shape (height, width) or (height, width, channels). With an array, the
+    tiles are views of it.
+    :param segment_width: the width of the fragment.
+    :param segment_height: the height of the fragment.
+    :param iteration_order: order of the iteration_order.
+    :param overlap: number of pixels shared by contiguous segments.
+    :return: yields ImageTile objects.
+    """
+    if NUMPY_LOADED and isinstance(image, np.ndarray):
+        size = (image.shape[1], image.shape[0])
+    else:
+        size = image.size
+
+    for left, top, width, height in _get_segments_positions(size, segment_width, segment_height, iteration_order,
+                                                            overlap):
+        yield ImageTile(image, left, top, width, height)
+
 def segment_image(pil_image, segment_width, segment_height, iteration_order=HORIZONTAL):
     """
     Generator of segments of a PIL image. This generator breaks the PIL image into a
@@ -90,24 +257,96 @@ def segment_image(pil_image, segment_width, segment_height, iteration_order=HORI
     :param iteration_order: order of the iteration_order.
     :return:
     """
-    width, height = pil_image.size
+    for tile in get_tiles(pil_image, segment_width, segment_height, iteration_order):
+        yield tile.get_image()
 
-    horizontal_segment_count = width // segment_width + int(width % segment_width > 0)
-    vertical_segment_count = height // segment_height + int(height % segment_height > 0)
 
-    if iteration_order==VERTICAL:
-        for x in range(horizontal_segment_count):
-            for y in range(vertical_segment_count):
-                bounding_box = BoundingBox(x * segment_width, y * segment_height,
-                                           min(segment_width, width - x * segment_width),
-                                           min(segment_height, height - y * segment_height))
+class ImageTile(object):
+    """
+    Descriptor of a rectangular region of an image. The pixels are only cropped (or viewed, for numpy arrays) and
+    encoded when requested.
+    """
+    __slots__ = ("source", "left", "top", "width", "height")
 
-                yield crop_by_bbox(pil_image, bounding_box)
-    else:
-        for y in range(vertical_segment_count):
-            for x in range(horizontal_segment_count):
-                bounding_box = BoundingBox(x * segment_width, y * segment_height,
-                                           min(segment_width, width - x * segment_width),
-                                           min(segment_height, height - y * segment_height))
+    def __init__(self, source, left, top, width, height):
+        """
+        Initializer of the tile.
+        :param source: PIL image or numpy array the tile belongs to.
+        :param left: horizontal position of the tile in the source.
+        :param top: vertical position of the tile in the source.
+        :param width: width of the tile.
+        :param height: height of the tile.
+        """
+        self.source = source
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+
+    def get_bounding_box(self):
+        """
+        :return: BoundingBox of the tile in the source.
+        """
+        return BoundingBox(self.left, self.top, self.width, self.height)
+
+    def _is_array(self):
+        return NUMPY_LOADED and isinstance(self.source, np.ndarray)
+
+    def get_array(self):
+        """
+        :return: numpy array of the pixels of the tile. It is a view (no copy) if the source is a numpy array.
+        """
+        if self._is_array():
+            return self.source[self.top:self.top + self.height, self.left:self.left + self.width]
+
+        if not NUMPY_LOADED:
+            raise Exception("Numpy is required for the arrays of the tiles.")
+
+        return np.asarray(self.get_image())
+
+    def get_image(self):
+        """
+        :return: PIL image of the tile.
+        """
+        if self._is_array():
+            return Image.fromarray(np.ascontiguousarray(self.get_array()))
+
+        return self.source.crop((self.left, self.top, self.left + self.width, self.top + self.height))
+
+    def encode(self, image_format="PNG", quality=90, max_side=None):
+        """
+        Encodes the tile into the bytes of an image file.
+        :param image_format: "PNG", "JPEG" or "PPM". See encode_image().
+        :param quality: quality for the JPEG format.
+        :param max_side: if specified, the tile is downscaled so that none of its sides exceeds it.
+        :return: bytes of the encoded tile.
+        """
+        return encode_image(self.get_image(), image_format, quality, max_side)
+
+class LazyImage(object):
+    """
+    Wraps the bytes of an image file, decoding them into a PIL image only the first time it is required.
+    """
+
+    def __init__(self, image_bytes):
+        """
+        Initializer of the lazy image.
+        :param image_bytes: bytes of the image file.
+        """
+        self.image_bytes = image_bytes
+        self._image = None
+
+    def is_decoded(self):
+        """
+        :return: True if the image was already decoded.
+        """
+        return self._image is not None
+
+    def get_image(self):
+        """
+        :return: the decoded PIL image.
+        """
+        if self._image is None:
+            self._image = get_image(self.image_bytes)
 
-                yield crop_by_bbox(pil_image, bounding_box)
+        return self._image
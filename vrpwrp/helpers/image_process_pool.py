@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from vrpwrp.config import config
+from vrpwrp.helpers import image_helper
+from vrpwrp.tools.boundingbox import BoundingBox
+
+# Shared memory blocks, required by the pool, are available since Python 3.8.
+try:
+    from multiprocessing.shared_memory import SharedMemory
+    SHARED_MEMORY_LOADED = True
+except Exception as ex:
+    SHARED_MEMORY_LOADED = False
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def _read_shared_bytes(name, length):
+    """
+    Reads the bytes of an image file from a block of shared memory.
+    """
+    memory = SharedMemory(name=name)
+
+    try:
+        return bytes(memory.buf[:length])
+    finally:
+        memory.close()
+
+def _encode_crops(pil_image, boxes, image_format, quality, max_side):
+    """
+    Crops and encodes the regions (x, y, width, height) of a PIL image.
+    """
+    return [image_helper.encode_image(image_helper.crop_by_bbox(pil_image, BoundingBox(*box)), image_format, quality,
+                                      max_side) for box in boxes]
+
+def _decode_into(source_name, source_length, target_name):
+    """
+    Worker task: decodes the image file of a shared block into the RGB pixels of another one.
+    :return: size of the decoded image.
+    """
+    pil_image = image_helper.get_image(_read_shared_bytes(source_name, source_length))
+    target = SharedMemory(name=target_name)
+
+    try:
+        pixels = pil_image.tobytes()
+        target.buf[:len(pixels)] = pixels
+    finally:
+        target.close()
+
+    return pil_image.size
+
+def _crop_and_encode_file(source_name, source_length, boxes, image_format, quality, max_side):
+    """
+    Worker task: decodes the image file of a shared block and encodes some of its regions.
+    :return: list of the bytes of the encoded regions.
+    """
+    pil_image = image_helper.get_image(_read_shared_bytes(source_name, source_length))
+
+    return _encode_crops(pil_image, boxes, image_format, quality, max_side)
+
+def _crop_and_encode_pixels(name, size, boxes, image_format, quality, max_side):
+    """
+    Worker task: encodes some regions of the RGB pixels of a shared block, without copying the whole image.
+    :return: list of the bytes of the encoded regions.
+    """
+    memory = SharedMemory(name=name)
+
+    try:
+        pil_image = Image.frombuffer("RGB", size, memory.buf, "raw", "RGB", 0, 1)
+        result = _encode_crops(pil_image, boxes, image_format, quality, max_side)
+
+        # The image maps the shared block: it must be released before closing it.
+        del pil_image
+    finally:
+        memory.close()
+
+    return result
+
+def _encode_preview(source_name, source_length, max_side):
+    """
+    Worker task: decodes a downscaled version of the image file of a shared block and encodes it.
+    :return: bytes of the encoded preview.
+    """
+    return image_helper.to_byte_array(image_helper.get_preview(_read_shared_bytes(source_name, source_length),
+                                                               max_side))
+
+
+class SharedImage(object):
+    """
+    RGB pixels of a decoded image, stored in a block of shared memory. The worker processes of an ImageProcessPool
+    read them directly, so the image is never pickled nor copied between processes. It must be closed to release the
+    memory.
+    """
+
+    def __init__(self, size):
+        """
+        Initializer of the shared image. Allocates the memory for the pixels.
+        :param size: tuple (width, height) of the image.
+        """
+        if not SHARED_MEMORY_LOADED:
+            raise Exception("Python 3.8 or newer is required for the SharedImage.")
+
+        self.size = tuple(size)
+        self._memory = SharedMemory(create=True, size=max(1, self.size[0] * self.size[1] * 3))
+
+    @property
+    def name(self):
+        """
+        :return: name of the block of shared memory.
+        """
+        return self._memory.name
+
+    def get_image(self):
+        """
+        :return: a PIL image with a copy of the pixels.
+        """
+        return Image.frombytes("RGB", self.size, bytes(self._memory.buf[:self.size[0] * self.size[1] * 3]))
+
+    def close(self):
+        """
+        Releases the shared memory of the image.
+        """
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ImageProcessPool(object):
+    """
+    Pool of processes for the CPU work on images: decoding, cropping and encoding. PIL holds the GIL during most of
+    this work, so a pool of threads is limited to a single core; the worker processes of this pool use all of them.
+
+    Images are handed to the workers through shared memory: the bytes of the image files and the decoded pixels are
+    written once into shared blocks, and only their names are sent to the workers. Only the small encoded results are
+    sent back.
+    """
+
+    _shared_pool = None
+    _shared_pool_lock = threading.Lock()
+
+    def __init__(self, workers=None, start_method=None):
+        """
+        Initializer of the pool. The processes are started the first time they are needed.
+
+        :param workers: number of worker processes. By default it is taken from config, or all the cores if not set.
+        :param start_method: multiprocessing start method of the workers ("spawn", "forkserver" or "fork"). By default
+        it is taken from config.
+        """
+        if not SHARED_MEMORY_LOADED:
+            raise Exception("Python 3.8 or newer is required for the ImageProcessPool.")
+
+        if workers is None:
+            workers = config.IMAGE_PROCESS_POOL_WORKERS or os.cpu_count() or 1
+
+        if start_method is None:
+            start_method = config.IMAGE_PROCESS_POOL_START_METHOD
+
+        self.workers = workers
+        self.start_method = start_method
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def get_shared_pool(cls):
+        """
+        Retrieves the pool shared by all the wrappers, building it the first time.
+        :return: ImageProcessPool object.
+        """
+        with ImageProcessPool._shared_pool_lock:
+            if ImageProcessPool._shared_pool is None:
+                ImageProcessPool._shared_pool = ImageProcessPool()
+
+            pool = ImageProcessPool._shared_pool
+
+        return pool
+
+    def _get_executor(self):
+        """
+        Retrieves the process pool, starting it the first time.
+        :return: ProcessPoolExecutor object.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(self.start_method))
+
+        return self._executor
+
+    def _run_on_bytes(self, task, image_bytes, *args):
+        """
+        Runs a task in a worker over the bytes of an image file, which are handed through a shared block.
+        :return: the result of the task.
+        """
+        source = SharedMemory(create=True, size=max(1, len(image_bytes)))
+
+        try:
+            source.buf[:len(image_bytes)] = image_bytes
+            return self._get_executor().submit(task, source.name, len(image_bytes), *args).result()
+        finally:
+            source.close()
+            source.unlink()
+
+    def decode(self, image_bytes):
+        """
+        Decodes an image file in a worker into shared memory.
+        :param image_bytes: bytes of the image file.
+        :return: SharedImage object, to be closed when it is not needed anymore.
+        """
+        shared_image = SharedImage(image_helper.get_image_size(image_bytes))
+
+        try:
+            size = self._run_on_bytes(_decode_into, image_bytes, shared_image.name)
+        except BaseException:
+            shared_image.close()
+            raise
+
+        if tuple(size) != shared_image.size:
+            shared_image.close()
+            raise IOError("The decoded image has a size {} different from its header.".format(size))
+
+        return shared_image
+
+    def crop_and_encode(self, image_bytes, bounding_boxes, image_format="PNG", quality=90, max_side=None):
+        """
+        Decodes an image file in a worker, and crops and encodes some of its regions there.
+        :param image_bytes: bytes of the image file.
+        :param bounding_boxes: list of BoundingBox objects of the regions.
+        :param image_format: format of the encoded regions. See image_helper.encode_image().
+        :param quality: quality for the JPEG format.
+        :param max_side: if specified, regions are downscaled so that none of their sides exceeds it.
+        :return: list of the bytes of the encoded regions, in the same order as the bounding boxes.
+        """
+        boxes = [bounding_box.get_box() for bounding_box in bounding_boxes]
+
+        return self._run_on_bytes(_crop_and_encode_file, image_bytes, boxes, image_format, quality, max_side)
+
+    def encode_regions(self, shared_image, bounding_boxes, image_format="PNG", quality=90, max_side=None):
+        """
+        Crops and encodes some regions of a decoded image in a worker.
+        :param shared_image: SharedImage object returned by decode().
+        :param bounding_boxes: list of BoundingBox objects of the regions.
+        :param image_format: format of the encoded regions. See image_helper.encode_image().
+        :param quality: quality for the JPEG format.
+        :param max_side: if specified, regions are downscaled so that none of their sides exceeds it.
+        :return: list of the bytes of the encoded regions, in the same order as the bounding boxes.
+        """
+        boxes = [bounding_box.get_box() for bounding_box in bounding_boxes]
+
+        return self._get_executor().submit(_crop_and_encode_pixels, shared_image.name, shared_image.size, boxes,
+                                           image_format, quality, max_side).result()
+
+    def get_preview(self, image_bytes, max_side):
+        """
+        Decodes a downscaled version of an image file in a worker. See image_helper.get_preview().
+        :param image_bytes: bytes of the image file.
+        :param max_side: maximum size of the sides of the preview.
+        :return: bytes of the preview, encoded as PNG.
+        """
+        return self._run_on_bytes(_encode_preview, image_bytes, max_side)
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
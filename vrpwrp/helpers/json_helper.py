@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+from vrpwrp.config import config
+
+# Orjson parses and serializes JSON several times faster than the standard library.
+try:
+    import orjson
+    ORJSON_LOADED = True
+except Exception as ex:
+    ORJSON_LOADED = False
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def _use_orjson():
+    return ORJSON_LOADED and config.FAST_JSON
+
+def loads(content):
+    """
+    Parses a JSON document, with orjson if it is available. Documents it does not accept, like the ones with NaN
+    values, are parsed by the standard library.
+    :param content: JSON document, as a string or as UTF-8 bytes.
+    :return: parsed object.
+    """
+    if _use_orjson():
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+
+    return json.loads(content)
+
+def dumps(obj):
+    """
+    Serializes an object into a JSON document, with orjson if it is available.
+    :param obj: object to serialize.
+    :return: JSON document as a string.
+    """
+    if _use_orjson():
+        try:
+            return orjson.dumps(obj).decode("UTF-8")
+        except TypeError:
+            # Types only known by the standard library, like subclasses of dict.
+            pass
+
+    return json.dumps(obj)
+
+def parse_response(response):
+    """
+    Parses the JSON body of a requests response. With orjson, the raw bytes of the body are parsed directly; bodies
+    it does not accept (other encodings, NaN values) are parsed by requests as usual.
+    :param response: requests response object.
+    :return: parsed object.
+    """
+    content = getattr(response, "content", None)
+
+    if _use_orjson() and type(content) is bytes:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+
+    return response.json()
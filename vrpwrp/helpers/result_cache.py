@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def get_cache_key(method, url, data, params=None):
+    """
+    Computes the content-addressed key of a request: a hash of its payload together with the endpoint.
+
+    :param method: HTTP method of the request.
+    :param url: URL of the endpoint.
+    :param data: payload of the request, as bytes or string.
+    :param params: query parameters of the request.
+    :return: hexadecimal SHA-256 digest.
+    """
+    if type(data) is str:
+        data = data.encode("UTF-8")
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([method.upper(), url, params], sort_keys=True).encode("UTF-8"))
+    digest.update(b"\0")
+    digest.update(data)
+
+    return digest.hexdigest()
+
+
+class SqliteCacheStorage(object):
+    """
+    On-disk tier for the ResultCache, kept in a sqlite database. Values must be JSON-serializable.
+    """
+
+    def __init__(self, path):
+        """
+        Opens (or creates) the database of the storage.
+
+        :param path: path to the sqlite database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS results "
+                                     "(key TEXT PRIMARY KEY, expires REAL, value TEXT)")
+
+    def get(self, key):
+        """
+        Retrieves a value from the storage.
+
+        :param key: key of the value.
+        :return: the value, or None if it is not stored or it expired.
+        """
+        entry = self.get_entry(key)
+
+        return None if entry is None else entry[1]
+
+    def get_entry(self, key):
+        """
+        Retrieves a value from the storage, together with its expiration.
+
+        :param key: key of the value.
+        :return: tuple (expires, value), or None if it is not stored or it expired.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT expires, value FROM results WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        expires, value = row
+
+        if expires is not None and expires < time.time():
+            self.delete(key)
+            return None
+
+        return expires, json.loads(value)
+
+    def set(self, key, value, expires=None):
+        """
+        Stores a value.
+
+        :param key: key of the value.
+        :param value: JSON-serializable value.
+        :param expires: timestamp from which the value is no longer valid. None to keep it forever.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO results (key, expires, value) VALUES (?, ?, ?)",
+                                     (key, expires, json.dumps(value)))
+
+    def delete(self, key):
+        """
+        Removes a value from the storage.
+
+        :param key: key of the value.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def clear(self):
+        """
+        Removes all the values of the storage.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results")
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+class ResultCache(object):
+    """
+    Cache of the parsed responses of the API, keyed by the hash of the uploaded content and the endpoint.
+
+    Results are kept in memory in a LRU of max_entries, optionally backed by a persistent storage (for example a
+    SqliteCacheStorage) that survives between processes. Results older than ttl seconds are discarded in both tiers.
+    It is thread-safe, and counts the hits and misses of the lookups.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, storage=None):
+        """
+        Initializer of the cache.
+
+        :param max_entries: maximum number of results kept in memory. The least recently used are evicted first.
+        :param ttl: seconds a result is valid for. None to keep them until evicted.
+        :param storage: optional persistent tier, with the get_entry(), set(), clear() and close() methods of
+        SqliteCacheStorage.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.storage = storage
+
+        self.hits = 0
+        self.misses = 0
+        self.storage_hits = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        :return: number of results kept in memory.
+        """
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Looks up a result, first in memory and then in the storage.
+
+        :param key: key of the result, as computed by get_cache_key().
+        :return: the result, or None if it is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                expires, value = entry
+
+                if expires is None or expires >= time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._entries[key]
+
+        entry = None if self.storage is None else self.storage.get_entry(key)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.storage_hits += 1
+
+        # The result keeps the expiration it was stored with.
+        expires, value = entry
+        self._store_in_memory(key, value, expires)
+
+        return value
+
+    def set(self, key, value):
+        """
+        Caches a result in memory and in the storage.
+
+        :param key: key of the result, as computed by get_cache_key().
+        :param value: result to cache. It must be JSON-serializable if a storage is used.
+        """
+        expires = None if self.ttl is None else time.time() + self.ttl
+        self._store_in_memory(key, value, expires)
+
+        if self.storage is not None:
+            self.storage.set(key, value, expires)
+
+    def _store_in_memory(self, key, value, expires):
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all the results of the cache, including the ones in the storage, and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.storage_hits = 0
+
+        if self.storage is not None:
+            self.storage.clear()
+
+    def get_stats(self):
+        """
+        :return: dictionary with the number of "hits" (of which "storage_hits" were served by the storage), "misses"
+        and "size" (results kept in memory).
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "storage_hits": self.storage_hits,
+                "size": len(self._entries),
+            }
+
+    def close(self):
+        """
+        Closes the storage of the cache, if any.
+        """
+        if self.storage is not None:
+            self.storage.close()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+from concurrent.futures import Future
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class SingleFlight(object):
+    """
+    Deduplicates concurrent identical calls: while a call for a key is in flight, any other call for the same key
+    waits for it and receives its result (or its exception) instead of running again.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Runs a function, unless a call for the same key is already in flight, in which case its result is shared.
+
+        :param key: key identifying identical calls, for example a hash of the request.
+        :param function: function to run.
+        :param args: positional arguments for the function.
+        :param kwargs: keyword arguments for the function.
+        :return: the result of the function, from this call or from the one in flight.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return result
+
+    def get_in_flight(self):
+        """
+        :return: number of distinct calls in flight.
+        """
+        with self._lock:
+            return len(self._calls)
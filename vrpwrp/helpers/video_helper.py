@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+from PIL import Image
+
+# OpenCV is required to decode video files.
+try:
+    import cv2
+    CV2_LOADED = True
+except Exception as ex:
+    CV2_LOADED = False
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def iterate_image_sequence(source, step=1):
+    """
+    Generator of the frames of an image sequence. Files are read lazily, one by one, and not decoded: the bytes of
+    each file can be uploaded as they are.
+    :param source: path to a directory of image files, sorted by name, or list of paths to image files.
+    :param step: only one of each `step` frames is read.
+    :return: yields tuples (frame number, bytes of the image file).
+    """
+    if isinstance(source, str):
+        source = [os.path.join(source, filename) for filename in sorted(os.listdir(source))
+                  if os.path.isfile(os.path.join(source, filename))]
+
+    for frame_number in range(0, len(source), step):
+        with open(source[frame_number], "rb") as f:
+            image_bytes = f.read()
+
+        yield frame_number, image_bytes
+
+def iterate_video_frames(path, step=1, every_seconds=None):
+    """
+    Generator of the frames of a video file, decoded one by one. Frames that are skipped are grabbed but not decoded.
+    Requires OpenCV (pip3 install vrpwrp[video]).
+    :param path: path to the video file.
+    :param step: only one of each `step` frames is decoded.
+    :param every_seconds: if specified, only one frame every this number of seconds of video is decoded, according
+    to the frame rate of the video. It overrides step.
+    :return: yields tuples (frame number, PIL image).
+    """
+    if not CV2_LOADED:
+        raise Exception("OpenCV is required to decode video files.")
+
+    capture = cv2.VideoCapture(path)
+
+    if not capture.isOpened():
+        raise IOError("The video {} could not be opened.".format(path))
+
+    if every_seconds is not None:
+        step = max(1, int(round((capture.get(cv2.CAP_PROP_FPS) or 25) * every_seconds)))
+
+    try:
+        frame_number = 0
+
+        while capture.grab():
+            if frame_number % step == 0:
+                decoded, frame = capture.retrieve()
+
+                if not decoded:
+                    break
+
+                yield frame_number, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+            frame_number += 1
+    finally:
+        capture.release()
+
+def iterate_frames(source, step=1, every_seconds=None):
+    """
+    Generator of the frames of any kind of source.
+    :param source: path to a video file, path to a directory of image files, list of paths to image files, or
+    iterable of PIL images or bytes of image files.
+    :param step: only one of each `step` frames is read.
+    :param every_seconds: for video files, only one frame every this number of seconds is read.
+    :return: yields tuples (frame number, frame), where the frame is either a PIL image or the bytes of an image file.
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        return iterate_image_sequence(source, step)
+
+    if isinstance(source, str):
+        return iterate_video_frames(source, step, every_seconds)
+
+    if isinstance(source, (list, tuple)) and len(source) > 0 and isinstance(source[0], str):
+        return iterate_image_sequence(source, step)
+
+    return ((frame_number, frame) for frame_number, frame in enumerate(source) if frame_number % step == 0)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+from vrpwrp.helpers import image_helper
+from vrpwrp.tools.boundingbox import BoundingBox
+from vrpwrp.wrappers.face_recognition import FaceRecognition
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class FakeResponse(object):
+    """
+    Response of requests, either with a parsed JSON content or with a raw body.
+    """
+    def __init__(self, json_content=None, ok=True, content=None):
+        self.json_content = json_content
+        self.ok = ok
+        self.content = content
+        self.json_calls = 0
+
+    def json(self):
+        self.json_calls += 1
+
+        if self.content is not None:
+            return json.loads(self.content.decode("latin-1"))
+
+        return self.json_content
+
+
+class FakeSession(object):
+    """
+    Session that records the requests instead of sending them, and answers them with a fixed JSON content. With a list
+    of answers, each request is answered with the next one, cycling through them, and answers that are exceptions are
+    raised. It tracks the number of requests in flight.
+    """
+    def __init__(self, json_content=None, delay=0.0, ok=True, answers=None):
+        self.json_content = json_content
+        self.delay = delay
+        self.ok = ok
+        self.answers = answers
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def urls(self):
+        return [url for _, url, _ in self.requests]
+
+    @property
+    def uploads(self):
+        return [kwargs.get("data") for _, _, kwargs in self.requests]
+
+    def answer(self, method, url, **kwargs):
+        """
+        :return: the JSON content answered to a request without a list of answers.
+        """
+        return self.json_content
+
+    def request(self, method, url, **kwargs):
+        with self.lock:
+            index = len(self.requests)
+            self.requests.append((method, url, kwargs))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            time.sleep(self.delay)
+
+            if self.answers is None:
+                answer = self.answer(method, url, **kwargs)
+            else:
+                answer = self.answers[index % len(self.answers)]
+
+            if isinstance(answer, Exception):
+                raise answer
+
+            return FakeResponse(answer, self.ok)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def build_score_answers(scores):
+    """
+    Builds the answers of the porn classification API for a list of scores. Exceptions are kept as they are.
+    """
+    return [score if isinstance(score, Exception) else {'Image Result': {'Porn Score': str(score)}}
+            for score in scores]
+
+
+class FakeFaceDetection(object):
+    """
+    Face detection that returns a fixed list of boxes (x, y, width, height) for every image, records the uploaded
+    images and fails for the ones smaller than 10 bytes.
+    """
+    def __init__(self, boxes=None):
+        self.boxes = [[0, 0, 10, 10]] if boxes is None else boxes
+        self.uploads = []
+        self.lock = threading.Lock()
+
+    def get_boxes(self):
+        return self.boxes
+
+    def analyze_bytes(self, image_bytes):
+        if len(image_bytes) < 10:
+            raise IOError("Not an image")
+
+        with self.lock:
+            self.uploads.append(image_bytes)
+
+        return [BoundingBox(*box) for box in self.get_boxes()]
+
+    def analyze_pil(self, pillow_image):
+        with self.lock:
+            self.uploads.append(pillow_image)
+
+        return [BoundingBox(*box) for box in self.get_boxes()]
+
+
+class FakeEmbedding(object):
+    def __init__(self, value):
+        self.value = value
+
+    def get_embedding_np(self):
+        return self.value
+
+
+class FakeFaceRecognition(FaceRecognition):
+    """
+    Face recognition whose embedding is the width of the face, delayed inversely to it. It counts the requests and
+    tracks the number of them in flight.
+    """
+    def __init__(self, delay=0.0):
+        super().__init__("http://localhost/embed", batch_API_URL="")
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get_embeddings_from_bytes(self, image_bytes):
+        pillow_image = image_helper.get_image(image_bytes)
+
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(self.delay / pillow_image.size[0])
+
+        with self.lock:
+            self.in_flight -= 1
+
+        return FakeEmbedding(pillow_image.size[0])
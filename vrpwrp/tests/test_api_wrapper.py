@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from vrpwrp.tests.fakes import FakeSession
+from vrpwrp.wrappers.APIWrapper import APIWrapper, build_session
+from vrpwrp.wrappers.face_detection import FaceDetection
+from vrpwrp.wrappers.face_recognition import FaceRecognition
+from vrpwrp.wrappers.porn_classification import PornClassification
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class BlockingSession(FakeSession):
+    """
+    Session whose requests wait until they are released.
+    """
+    def __init__(self, json_content=None, error=None):
+        super().__init__(json_content)
+        self.error = error
+        self.release = threading.Event()
+
+    def answer(self, method, url, **kwargs):
+        self.release.wait(5)
+
+        if self.error is not None:
+            raise self.error
+
+        return self.json_content
+
+
+class TestAPIWrapper(unittest.TestCase):
+    """
+    Unit tests for the class APIWrapper
+    """
+
+    def test_wrappers_share_pool(self):
+        """
+        Tests that the wrappers share the same session by default.
+        """
+        face_detection = FaceDetection()
+        face_recognition = FaceRecognition()
+        porn_classification = PornClassification()
+
+        self.assertIs(face_detection.session, face_recognition.session)
+        self.assertIs(face_detection.session, porn_classification.session)
+
+    def test_configure_pool(self):
+        """
+        Tests that reconfiguring the pool affects the existing wrappers.
+        """
+        face_detection = FaceDetection()
+        session = APIWrapper.configure_pool(pool_maxsize=32, max_retries=1)
+
+        # The previous pool is closed by configure_pool(): the next wrapper builds a default one again.
+        self.addCleanup(setattr, APIWrapper, "_shared_session", None)
+        self.addCleanup(session.close)
+
+        self.assertIs(face_detection.session, session)
+
+        adapter = session.get_adapter("http://example.com")
+        self.assertEqual(adapter._pool_maxsize, 32)
+        self.assertEqual(adapter.max_retries.total, 1)
+
+    def test_build_session_without_keep_alive(self):
+        """
+        Tests that a session can be built to close the connections after each request.
+        """
+        session = build_session(keep_alive=False)
+        self.assertEqual(session.headers['Connection'], 'close')
+
+    def test_custom_session_and_timeout(self):
+        """
+        Tests that a specific session and timeout are used for the requests.
+        """
+        session = FakeSession({'bounding_boxes': ["[1, 2, 3, 4]"]})
+        face_detection = FaceDetection(API_URL="http://localhost/detect", session=session, timeout=3)
+
+        bounding_boxes = face_detection.analyze_bytes(b"image")
+
+        self.assertEqual(bounding_boxes[0].get_box(), [1, 2, 3, 4])
+        method, url, kwargs = session.requests[0]
+        self.assertEqual(method, "PUT")
+        self.assertEqual(url, "http://localhost/detect")
+        self.assertEqual(kwargs['timeout'], 3)
+        self.assertEqual(kwargs['data'], b"image")
+
+    def _analyze_concurrently(self, face_detection, session, count):
+        """
+        Analyzes the same image from several threads at once, releasing the requests once all of them are waiting.
+        """
+        coalesced = APIWrapper._in_flight.coalesced
+
+        with ThreadPoolExecutor(count) as executor:
+            futures = [executor.submit(face_detection.analyze_bytes, b"image") for _ in range(count)]
+
+            deadline = time.time() + 5
+            while len(session.requests) + APIWrapper._in_flight.coalesced - coalesced < count and \
+                    time.time() < deadline:
+                time.sleep(0.01)
+
+            session.release.set()
+
+        return futures
+
+    def test_coalesce_requests(self):
+        """
+        Tests that concurrent identical requests share a single request.
+        """
+        session = BlockingSession({'bounding_boxes': ["[1, 2, 3, 4]"]})
+        face_detection = FaceDetection("http://localhost/coalesce", session=session, coalesce=True)
+
+        futures = self._analyze_concurrently(face_detection, session, 8)
+
+        self.assertEqual(len(session.requests), 1)
+        self.assertTrue(all(future.result()[0].get_box() == [1, 2, 3, 4] for future in futures))
+        self.assertEqual(APIWrapper._in_flight.get_in_flight(), 0)
+
+    def test_coalesce_requests_errors(self):
+        """
+        Tests that the error of a coalesced request is raised to all the callers.
+        """
+        session = BlockingSession(error=IOError("unreachable"))
+        face_detection = FaceDetection("http://localhost/coalesce-error", session=session, coalesce=True)
+
+        futures = self._analyze_concurrently(face_detection, session, 4)
+
+        self.assertEqual(len(session.requests), 1)
+        self.assertTrue(all(type(future.exception()) is OSError for future in futures))
+
+    def test_coalesce_disabled(self):
+        """
+        Tests that every request is sent when coalescing is disabled.
+        """
+        session = BlockingSession({'bounding_boxes': []})
+        face_detection = FaceDetection("http://localhost/no-coalesce", session=session, coalesce=False)
+
+        self._analyze_concurrently(face_detection, session, 4)
+
+        self.assertEqual(len(session.requests), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
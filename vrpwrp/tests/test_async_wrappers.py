@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from vrpwrp.helpers import image_helper
+from vrpwrp.helpers.result_cache import ResultCache
+from vrpwrp.tests.fakes import FakeSession
+from vrpwrp.tools.boundingbox import BoundingBox
+from vrpwrp.tools.embedding import Embedding
+from vrpwrp.wrappers.AsyncAPIWrapper import AsyncConnectionPool
+from vrpwrp.wrappers.async_face_detection import AsyncFaceDetection
+from vrpwrp.wrappers.async_face_recognition import AsyncFaceRecognition
+from vrpwrp.wrappers.async_porn_classification import AsyncPornClassification
+
+try:
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except:
+    AIOHTTP_AVAILABLE = False
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class FakeServer(object):
+    """
+    Local HTTP server that answers every request with a fixed JSON content and status, and counts the requests.
+    """
+    def __init__(self, json_content, status=200):
+        self.json_content = json_content
+        self.status = status
+        self.requests = 0
+        self.url = None
+        self._runner = None
+
+    async def _handle(self, request):
+        await request.read()
+        self.requests += 1
+        return web.json_response(self.json_content, status=self.status)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self._handle)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+
+        self.url = "http://127.0.0.1:{}/".format(self._runner.addresses[0][1])
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._runner.cleanup()
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsyncWrappers(unittest.TestCase):
+    """
+    Unit tests for the asyncio wrappers
+    """
+
+    def test_analyze_bytes(self):
+        """
+        Tests that the asyncio face detection returns bounding boxes.
+        """
+        pool = AsyncConnectionPool(session=FakeSession({'bounding_boxes': ["[1, 2, 3, 4]", "[5, 6, 7, 8]"]}))
+        face_detection = AsyncFaceDetection("http://localhost/detect", pool=pool)
+
+        bounding_boxes = run(face_detection.analyze_bytes(b"image"))
+
+        self.assertTrue(all(type(bbox) is BoundingBox for bbox in bounding_boxes))
+        self.assertEqual([bbox.get_box() for bbox in bounding_boxes], [[1, 2, 3, 4], [5, 6, 7, 8]])
+
+    def test_get_embeddings_from_bytes(self):
+        """
+        Tests that the asyncio face recognition returns embeddings.
+        """
+        pool = AsyncConnectionPool(session=FakeSession({'embedding_data': {'embedding': "[0.5 0.25 0.125]"}}))
+        face_recognition = AsyncFaceRecognition("http://localhost/embed", pool=pool)
+
+        embedding = run(face_recognition.get_embeddings_from_bytes(b"image"))
+
+        self.assertTrue(type(embedding) is Embedding)
+
+    def test_get_score(self):
+        """
+        Tests that the asyncio porn classification returns the score.
+        """
+        pool = AsyncConnectionPool(session=FakeSession({'Image Result': {'Porn Score': "0.75"}}))
+        porn_classification = AsyncPornClassification("http://localhost/porn", pool=pool)
+
+        self.assertEqual(run(porn_classification.get_score(b"image")), 0.75)
+
+    def test_cache(self):
+        """
+        Tests that the asyncio wrappers serve repeated content from the cache.
+        """
+        session = FakeSession({'bounding_boxes': ["[1, 2, 3, 4]"]})
+        face_detection = AsyncFaceDetection("http://localhost/detect", pool=AsyncConnectionPool(session=session),
+                                            cache=ResultCache())
+
+        run(face_detection.analyze_bytes(b"image"))
+        bounding_boxes = run(face_detection.analyze_bytes(b"image"))
+
+        self.assertEqual(bounding_boxes[0].get_box(), [1, 2, 3, 4])
+        self.assertEqual(face_detection.cache.get_stats()["hits"], 1)
+
+    def test_failed_requests_are_not_cached(self):
+        """
+        Tests that the error responses of the server are not cached.
+        """
+        session = FakeSession({'Image Result': {'Porn Score': "0.0"}}, ok=False)
+        porn_classification = AsyncPornClassification("http://localhost/porn",
+                                                      pool=AsyncConnectionPool(session=session), cache=ResultCache())
+
+        run(porn_classification.get_score(b"image"))
+        run(porn_classification.get_score(b"image"))
+
+        self.assertEqual(len(session.requests), 2)
+        self.assertEqual(len(porn_classification.cache), 0)
+
+    def test_concurrency_is_bounded(self):
+        """
+        Tests that the pool never exceeds the maximum number of requests in flight.
+        """
+        session = FakeSession({'bounding_boxes': []}, delay=0.02)
+        pool = AsyncConnectionPool(max_concurrency=3, session=session)
+        face_detection = AsyncFaceDetection("http://localhost/detect", pool=pool)
+
+        async def analyze_many():
+            return await asyncio.gather(*[face_detection.analyze_bytes(b"image") for _ in range(12)])
+
+        results = run(analyze_many())
+
+        self.assertEqual(len(results), 12)
+        self.assertLessEqual(session.max_in_flight, 3)
+        self.assertGreater(session.max_in_flight, 1)
+
+    def test_get_segments_scores(self):
+        """
+        Tests that the asyncio porn classification scores every segment of an image.
+        """
+        session = FakeSession({'Image Result': {'Porn Score': "0.25"}})
+        porn_classification = AsyncPornClassification("http://localhost/porn", workers=3, cache=False,
+                                                      pool=AsyncConnectionPool(session=session))
+        image_bytes = image_helper.get_file_binary_content("vrpwrp/samples/subject2_2.jpg")
+
+        results = run(porn_classification.get_segments_scores(image_bytes, 200, 200))
+
+        self.assertEqual([bbox.get_box() for bbox, _, _ in results[:2]], [[0, 0, 200, 200], [200, 0, 200, 200]])
+        self.assertEqual(run(porn_classification.get_score_segmented(image_bytes, 200, 200)), [0.25] * 12)
+        self.assertFalse(run(porn_classification.is_porn(image_bytes)))
+        self.assertEqual(len(session.requests), 12 + 12 + 1)
+
+
+@unittest.skipUnless(AIOHTTP_AVAILABLE, "aiohttp is required for these tests.")
+class TestAsyncWrappersAiohttp(unittest.TestCase):
+    """
+    Unit tests for the asyncio wrappers over aiohttp, against a local server
+    """
+
+    def test_analyze_bytes(self):
+        """
+        Tests that the requests are sent through aiohttp, and that the client of a previous loop is closed.
+        """
+        pool = AsyncConnectionPool(max_concurrency=4)
+
+        async def analyze():
+            async with FakeServer({'bounding_boxes': ["[1, 2, 3, 4]"]}) as server:
+                face_detection = AsyncFaceDetection(server.url, pool=pool, cache=False)
+                bounding_boxes = await face_detection.analyze_bytes(b"image")
+
+            return server, bounding_boxes
+
+        server, bounding_boxes = run(analyze())
+        client = pool._client
+
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(bounding_boxes[0].get_box(), [1, 2, 3, 4])
+        self.assertFalse(client.closed)
+
+        async def analyze_and_close():
+            try:
+                return await analyze()
+            finally:
+                await pool.close()
+
+        server, bounding_boxes = run(analyze_and_close())
+
+        self.assertEqual(server.requests, 1)
+        self.assertTrue(client.closed)
+
+    def test_failed_requests_are_not_cached(self):
+        """
+        Tests that the error statuses of the server are not cached.
+        """
+        pool = AsyncConnectionPool()
+
+        async def classify():
+            try:
+                async with FakeServer({'message': 'Internal error'}, status=500) as server:
+                    porn_classification = AsyncPornClassification(server.url, pool=pool, cache=ResultCache())
+                    scores = [await porn_classification.get_score(b"image") for _ in range(2)]
+
+                return server, porn_classification, scores
+            finally:
+                await pool.close()
+
+        server, porn_classification, scores = run(classify())
+
+        self.assertEqual(scores, [0.0, 0.0])
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(len(porn_classification.cache), 0)
+
+    def test_is_porn_stops_early(self):
+        """
+        Tests that the segments not scored yet are cancelled once one of them is over the threshold.
+        """
+        pool = AsyncConnectionPool()
+        image_bytes = image_helper.get_file_binary_content("vrpwrp/samples/subject2_2.jpg")
+
+        async def classify():
+            try:
+                async with FakeServer({'Image Result': {'Porn Score': "0.75"}}) as server:
+                    porn_classification = AsyncPornClassification(server.url, workers=1, pool=pool, cache=False)
+                    results = await porn_classification.get_segments_scores(image_bytes, 200, 200,
+                                                                            stop_threshold=0.5)
+
+                return server, results
+            finally:
+                await pool.close()
+
+        server, results = run(classify())
+
+        self.assertEqual(len(results), 1)
+        self.assertLess(server.requests, 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
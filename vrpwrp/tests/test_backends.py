@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+import time
+import unittest
+import vrpwrp.wrappers.face_recognition as FACEREC
+from concurrent.futures import ThreadPoolExecutor
+from vrpwrp.helpers import image_helper
+from vrpwrp.wrappers.APIWrapper import APIWrapper
+from vrpwrp.wrappers.backends import FakeBackend, HTTPBackend, LocalBackend
+from vrpwrp.wrappers.face_bundle import FaceBundle
+from vrpwrp.wrappers.face_detection import FaceDetection
+from vrpwrp.wrappers.face_recognition import FaceRecognition
+from vrpwrp.wrappers.porn_classification import PornClassification
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestBackends(unittest.TestCase):
+    """
+    Unit tests for the backends of the wrappers
+    """
+
+    def setUp(self):
+        """
+        Loads the sample images and builds a fake backend.
+        """
+        self.image_bytes = image_helper.get_file_binary_content("vrpwrp/samples/subject2_2.jpg")
+        self.other_image_bytes = image_helper.get_file_binary_content("vrpwrp/samples/subject1_1.jpg")
+        self.backend = FakeBackend(max_faces=5)
+
+    def test_face_detection(self):
+        """
+        Tests that the fake faces are deterministic and inside the image.
+        """
+        face_detection = FaceDetection(backend=self.backend, cache=False)
+
+        bounding_boxes = face_detection.analyze_bytes(self.image_bytes)
+
+        self.assertEqual([bbox.get_box() for bbox in bounding_boxes],
+                         [bbox.get_box() for bbox in FaceDetection(backend=FakeBackend(max_faces=5),
+                                                                   cache=False).analyze_bytes(self.image_bytes)])
+
+        for bbox in bounding_boxes:
+            self.assertTrue(bbox.x >= 0 and bbox.y >= 0 and bbox.x + bbox.width <= 800 and
+                            bbox.y + bbox.height <= 600)
+
+    def test_face_recognition(self):
+        """
+        Tests that the fake embeddings are deterministic unit vectors, also when requested in batch.
+        """
+        self.addCleanup(setattr, FACEREC, "NUMPY_AVAILABLE", FACEREC.NUMPY_AVAILABLE)
+
+        backend = FakeBackend(face_recognition_batch_url="http://localhost/batch")
+        face_recognition = FaceRecognition(batch_API_URL="http://localhost/batch", backend=backend, cache=False)
+
+        emb1 = face_recognition.get_embeddings_from_bytes(self.image_bytes)
+        emb2 = face_recognition.get_embeddings_from_bytes(self.other_image_bytes)
+        batch = face_recognition.get_embeddings_from_batch([self.image_bytes, self.other_image_bytes])
+
+        self.assertEqual([str(emb) for emb in batch], [str(emb1), str(emb2)])
+        self.assertEqual(len(emb1.get_embedding_np()), 128)
+        self.assertAlmostEqual(math.sqrt(sum(value ** 2 for value in emb1.get_embedding_np())), 1.0, places=5)
+
+        FACEREC.NUMPY_AVAILABLE = False
+        distances = face_recognition.get_embeddings_distances(emb1, [emb1, emb2])
+
+        self.assertAlmostEqual(distances[0], 0.0)
+        self.assertGreater(distances[1], 0.5)
+
+    def test_porn_classification(self):
+        """
+        Tests that the fake scores are deterministic and between 0 and 1.
+        """
+        porn_classification = PornClassification(backend=self.backend, cache=False)
+        self.addCleanup(porn_classification.close)
+
+        score = porn_classification.get_score(self.image_bytes)
+
+        self.assertTrue(0 <= score <= 1)
+        self.assertEqual(porn_classification.get_score(self.image_bytes), score)
+        self.assertEqual(len(porn_classification.get_score_segmented(self.image_bytes, 200, 200)), 12)
+
+    def test_face_bundle(self):
+        """
+        Tests that a bundle runs end to end without the remote service.
+        """
+        face_detection = FaceDetection(backend=self.backend, cache=False)
+        face_bundle = FaceBundle(face_detection, FaceRecognition(backend=self.backend, batch_API_URL="", cache=False))
+        self.addCleanup(face_bundle.close)
+
+        bounding_boxes, embeddings = face_bundle.get_faces_from_bytes(self.image_bytes)
+
+        self.assertEqual(len(embeddings), len(bounding_boxes))
+
+    def test_latency(self):
+        """
+        Tests that local backends delay the requests as configured.
+        """
+        backend = LocalBackend({"http://localhost/echo": lambda method, data, params, files: {"echo": data}},
+                               latency=0.05)
+        wrapper = APIWrapper("http://localhost/echo", backend=backend, cache=False, coalesce=False)
+
+        start = time.time()
+        result = wrapper._request("PUT", data=b"content", is_binary=True)
+
+        self.assertGreaterEqual(time.time() - start, 0.05)
+        self.assertEqual(result, {"echo": b"content"})
+        self.assertEqual(backend.requests, 1)
+
+        with self.assertRaises(Exception):
+            APIWrapper("http://localhost/other", backend=backend)._request("GET")
+
+    def test_shared_backend(self):
+        """
+        Tests that the shared backend is used by the wrappers without a specific backend or session.
+        """
+        self.addCleanup(APIWrapper.configure_backend, None)
+
+        self.assertIsInstance(FaceDetection().backend, HTTPBackend)
+        APIWrapper.configure_backend(self.backend)
+
+        self.assertIs(FaceDetection().backend, self.backend)
+        self.assertIsInstance(FaceDetection(session=object()).backend, HTTPBackend)
+
+    def test_local_backends_are_isolated(self):
+        """
+        Tests that the answers of local backends are neither shared with other backends nor kept in the shared cache.
+        """
+        self.addCleanup(APIWrapper.configure_cache, enabled=False)
+        cache = APIWrapper.configure_cache()
+
+        wrappers = [APIWrapper("http://localhost/echo", backend=LocalBackend(
+            {"http://localhost/echo": lambda method, data, params, files, name=name: {"name": name}}, latency=0.1))
+            for name in ["first", "second"]]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(wrapper._request, "PUT", data=b"content", is_binary=True)
+                       for wrapper in wrappers]
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, [{"name": "first"}, {"name": "second"}])
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import random
 import unittest
-from vrpwrp.tools.boundingbox import BoundingBox
+from vrpwrp.tools.boundingbox import BoundingBox, BoundingBoxArray, NUMPY_LOADED, non_maximum_suppression, \
+    merge_boxes, parse_boxes
 
+if NUMPY_LOADED:
+    import numpy as np
 
 __author__ = 'Iván de Paz Centeno'
 
@@ -176,5 +180,157 @@ class TestBoundingBox(unittest.TestCase):
         box = BoundingBox(10, 10, 20, 20)
         self.assertEqual(box.get_area(), 400)
 
+    def test_from_strings(self):
+        """
+        Tests that many bounding boxes are parsed at once from the strings of the API.
+        """
+        strings = ["[10, 20, 30, 40]", "[-5,0,7, 8]", "[1, 2, 3, 4]"]
+
+        self.assertEqual(parse_boxes(strings), [[10, 20, 30, 40], [-5, 0, 7, 8], [1, 2, 3, 4]])
+        self.assertEqual(parse_boxes(["10, 20, 30, 40", "1, 2, 3, 4"]), [[10, 20, 30, 40], [1, 2, 3, 4]])
+        self.assertEqual(parse_boxes([]), [])
+        self.assertEqual([bbox.get_box() for bbox in BoundingBox.from_strings(strings)],
+                         [[10, 20, 30, 40], [-5, 0, 7, 8], [1, 2, 3, 4]])
+
+        invalid = [["[1, 2, a, 4]"], ["[1.5, 2, 3, 4]"], ["[1, 2, 3]"], ["[1, 2, 3, 4]", "[5, 6, 7, 8, 9]"]]
+
+        for invalid_strings in invalid:
+            with self.assertRaises(ValueError):
+                parse_boxes(invalid_strings)
+
+        if NUMPY_LOADED:
+            self.assertEqual(BoundingBoxArray.from_strings(strings).get_boxes().tolist(), parse_boxes(strings))
+
+
+class TestBoundingBoxArray(unittest.TestCase):
+    """
+    Unitary tests for the BoundingBoxArray class. Results are checked against the ones of BoundingBox.
+    """
+
+    def setUp(self):
+        """
+        Builds random boxes, some of them out of the bounds of a 300x300 image.
+        """
+        generator = random.Random(0)
+        self.boxes = [[generator.randint(-50, 320), generator.randint(-50, 320), generator.randint(0, 150),
+                       generator.randint(0, 150)] for _ in range(60)]
+
+    def test_conversion(self):
+        """
+        Tests the conversion from and to lists of BoundingBox.
+        """
+        if NUMPY_LOADED:
+            bboxes = [BoundingBox(*box) for box in self.boxes]
+            boxes = BoundingBoxArray.from_bounding_boxes(bboxes)
+
+            self.assertEqual(len(boxes), 60)
+            self.assertEqual([bbox.get_box() for bbox in boxes.to_bounding_boxes()], self.boxes)
+            self.assertEqual(boxes[3].get_box(), self.boxes[3])
+            self.assertEqual(len(boxes[10:20]), 10)
+            self.assertEqual(BoundingBoxArray().get_boxes().shape, (0, 4))
+
+    def test_area_and_center(self):
+        """
+        Tests the areas and centers of the boxes.
+        """
+        if NUMPY_LOADED:
+            boxes = BoundingBoxArray(self.boxes)
+
+            self.assertEqual(boxes.get_area().tolist(), [BoundingBox(*box).get_area() for box in self.boxes])
+            self.assertEqual(boxes.get_center().tolist(), [BoundingBox(*box).get_center() for box in self.boxes])
+
+    def test_expand_and_fit_in_size(self):
+        """
+        Tests that the boxes are expanded and fit in a size like single boxes.
+        """
+        if NUMPY_LOADED:
+            boxes = BoundingBoxArray(self.boxes)
+            boxes.expand(0.3)
+            boxes.fit_in_size([300, 300])
+
+            expected = []
+
+            for box in self.boxes:
+                bbox = BoundingBox(*box)
+                bbox.expand(0.3)
+                bbox.fit_in_size([300, 300])
+                expected.append(bbox.get_box())
+
+            self.assertEqual(boxes.to_dict(), expected)
+
+    def test_intersections_and_iou(self):
+        """
+        Tests the pairwise intersections and IoU of the boxes.
+        """
+        if NUMPY_LOADED:
+            boxes = BoundingBoxArray(self.boxes[:30])
+            others = BoundingBoxArray(self.boxes[30:])
+
+            intersections = boxes.get_intersections(others)
+            areas = boxes.get_intersection_areas(others)
+            iou = boxes.get_iou(others)
+
+            self.assertEqual(intersections.shape, (30, 30, 4))
+
+            for i, box in enumerate(self.boxes[:30]):
+                for j, other in enumerate(self.boxes[30:]):
+                    intersection = BoundingBox(*box).intersect_with(BoundingBox(*other))
+                    union = BoundingBox(*box).get_area() + BoundingBox(*other).get_area() - intersection.get_area()
+
+                    self.assertEqual(intersections[i, j].tolist(), intersection.get_box())
+                    self.assertEqual(areas[i, j], intersection.get_area())
+                    self.assertAlmostEqual(iou[i, j], intersection.get_area() / union if union > 0 else 0.0)
+
+            self.assertEqual(BoundingBoxArray(self.boxes).get_iou().shape, (60, 60))
+
+    def test_non_maximum_suppression(self):
+        """
+        Tests that only the box with the highest score of each group of overlapping boxes is kept.
+        """
+        if NUMPY_LOADED:
+            bboxes = [BoundingBox(0, 0, 10, 10), BoundingBox(1, 1, 10, 10), BoundingBox(50, 50, 5, 5)]
+
+            self.assertEqual(non_maximum_suppression(bboxes).tolist(), [0, 2])
+            self.assertEqual(non_maximum_suppression(bboxes, [0.5, 0.9, 0.1]).tolist(), [1, 2])
+            self.assertEqual(non_maximum_suppression(bboxes, iou_threshold=0.9).tolist(), [0, 1, 2])
+            self.assertEqual(len(non_maximum_suppression([])), 0)
+
+    def test_non_maximum_suppression_matches_greedy(self):
+        """
+        Tests the suppression of many boxes against a plain greedy implementation.
+        """
+        if NUMPY_LOADED:
+            generator = np.random.RandomState(0)
+            boxes = np.concatenate((generator.randint(0, 500, (1000, 2)), generator.randint(10, 60, (1000, 2))), axis=1)
+            scores = generator.rand(1000)
+
+            iou = BoundingBoxArray(boxes).get_iou()
+            removed = np.zeros(1000, dtype=bool)
+            expected = []
+
+            for index in np.argsort(-scores):
+                if not removed[index]:
+                    expected.append(index)
+                    removed |= iou[index] > 0.3
+
+            self.assertEqual(non_maximum_suppression(boxes, scores, 0.3).tolist(), expected)
+
+    def test_merge_boxes(self):
+        """
+        Tests that overlapping boxes are merged into their weighted average.
+        """
+        if NUMPY_LOADED:
+            bboxes = [BoundingBox(0, 0, 10, 10), BoundingBox(2, 2, 10, 10), BoundingBox(50, 50, 5, 5)]
+
+            merged, scores = merge_boxes(bboxes, [0.75, 0.25, 0.5], iou_threshold=0.4)
+
+            self.assertEqual(merged.to_dict(), [[0, 0, 10, 10], [50, 50, 5, 5]])
+            self.assertEqual(scores.tolist(), [0.75, 0.5])
+
+            merged, _ = merge_boxes(BoundingBoxArray.from_bounding_boxes(bboxes, float), iou_threshold=0.4)
+
+            self.assertEqual(merged.to_dict()[0], [1.0, 1.0, 10.0, 10.0])
+
+
 if __name__ == '__main__':
     unittest.main()
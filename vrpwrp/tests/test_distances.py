@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except:
+    NUMPY_AVAILABLE = False
+
+import unittest
+import vrpwrp.tools.embedding as EMB
+from vrpwrp.tools import distances
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestDistances(unittest.TestCase):
+    """
+    Unit tests for the batched distances
+    """
+
+    def setUp(self):
+        """
+        Builds a random gallery and some probes.
+        """
+        if NUMPY_AVAILABLE:
+            random = np.random.RandomState(0)
+            self.gallery = random.randn(1000, 128)
+            self.probes = random.randn(5, 128)
+
+    def test_stack_embeddings(self):
+        """
+        Tests that embeddings objects are stacked into a contiguous matrix.
+        """
+        if NUMPY_AVAILABLE:
+            self.addCleanup(setattr, EMB, "NUMPY_LOADED", EMB.NUMPY_LOADED)
+            EMB.NUMPY_LOADED = True
+            embeddings = [EMB.Embedding(row) for row in self.gallery[:10]]
+
+            matrix = distances.stack_embeddings(embeddings, dtype=np.float32)
+
+            self.assertEqual(matrix.shape, (10, 128))
+            self.assertEqual(matrix.dtype, np.float32)
+            self.assertTrue(matrix.flags['C_CONTIGUOUS'])
+            self.assertTrue(distances.stack_embeddings(self.gallery) is self.gallery)
+        else:
+            self.assertTrue(True)
+
+    def test_embeddings_distances(self):
+        """
+        Tests that the batched distances match the distances of the Embedding objects, even when chunked.
+        """
+        if NUMPY_AVAILABLE:
+            self.addCleanup(setattr, EMB, "NUMPY_LOADED", EMB.NUMPY_LOADED)
+            EMB.NUMPY_LOADED = True
+            probe = EMB.Embedding(self.probes[0])
+            expected = [probe - EMB.Embedding(row) for row in self.gallery]
+
+            result = distances.embeddings_distances(probe, self.gallery, chunk_size=64)
+            self.assertTrue(np.allclose(result, expected))
+
+            result = distances.embeddings_distances(probe, self.gallery, dtype=np.float32, chunk_size=64)
+            self.assertEqual(result.dtype, np.float32)
+            self.assertTrue(np.allclose(result, expected, atol=1e-4))
+        else:
+            self.assertTrue(True)
+
+    def test_embeddings_distance_matrix(self):
+        """
+        Tests that the distance matrix has a row of distances per probe.
+        """
+        if NUMPY_AVAILABLE:
+            result = distances.embeddings_distance_matrix(self.probes, self.gallery, chunk_size=300)
+
+            self.assertEqual(result.shape, (5, 1000))
+
+            for probe, row in zip(self.probes, result):
+                self.assertTrue(np.allclose(row, distances.embeddings_distances(probe, self.gallery)))
+
+            self.assertTrue(np.allclose(distances.embeddings_distance_matrix(self.gallery[:3], self.gallery[:3]).diagonal(),
+                                        0, atol=1e-6))
+        else:
+            self.assertTrue(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
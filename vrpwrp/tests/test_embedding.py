@@ -123,5 +123,105 @@ class TestEmbedding(unittest.TestCase):
         emb_deserialized = EMB.Embedding.from_dict(serialization)
         self.assertEqual(str(emb1), str(emb_deserialized))
 
+    def test_embedding_bytes_conversion(self):
+        """
+        Tests whether embeddings are serializable and deserializable in binary and base64 formats.
+        """
+        self.addCleanup(setattr, EMB, "NUMPY_LOADED", EMB.NUMPY_LOADED)
+
+        for numpy_loaded in [True, False] if NUMPY_AVAILABLE else [False]:
+            EMB.NUMPY_LOADED = numpy_loaded
+            emb1 = EMB.Embedding([0.5, -0.25, 0.125, 2.0])
+
+            serialization = emb1.to_bytes()
+            self.assertEqual(len(serialization), 16)
+            self.assertEqual(str(EMB.Embedding.from_bytes(serialization)), str(emb1))
+
+            serialization = emb1.to_base64()
+            self.assertTrue(type(serialization) is str)
+            self.assertEqual(str(EMB.Embedding.from_base64(serialization)), str(emb1))
+
+    def test_embeddings_pack_many(self):
+        """
+        Tests whether many embeddings are packed into a single buffer and unpacked back.
+        """
+        self.addCleanup(setattr, EMB, "NUMPY_LOADED", EMB.NUMPY_LOADED)
+
+        for numpy_loaded in [True, False] if NUMPY_AVAILABLE else [False]:
+            EMB.NUMPY_LOADED = numpy_loaded
+            embeddings = [EMB.Embedding([float(i), 0.5, -0.25]) for i in range(100)]
+
+            buffer = EMB.Embedding.pack_many(embeddings)
+            self.assertEqual(len(buffer), 8 + 100 * 3 * 4)
+
+            unpacked = EMB.Embedding.unpack_many(buffer)
+            self.assertEqual([str(emb) for emb in unpacked], [str(emb) for emb in embeddings])
+
+        self.assertEqual(EMB.Embedding.unpack_many(EMB.Embedding.pack_many([])), [])
+
+    def test_embeddings_from_strings(self):
+        """
+        Tests whether many embeddings are parsed at once from their strings, as they would be one by one.
+        """
+        self.addCleanup(setattr, EMB, "NUMPY_LOADED", EMB.NUMPY_LOADED)
+        strings = ["[{} 0.5 -0.25\n 1e-05]".format(float(i)) for i in range(10)]
+
+        for numpy_loaded in [True, False] if NUMPY_AVAILABLE else [False]:
+            EMB.NUMPY_LOADED = numpy_loaded
+
+            embeddings = EMB.Embedding.from_strings(strings)
+            self.assertEqual([str(emb) for emb in embeddings], [str(EMB.Embedding(string)) for string in strings])
+
+        self.assertEqual(EMB.Embedding.from_strings([]), [])
+
+        if NUMPY_AVAILABLE:
+            EMB.NUMPY_LOADED = True
+            embeddings = EMB.Embedding.from_strings(["[1 2 3]", "[4 5 6 7 8]", "[ 9 10 ]"])
+            self.assertEqual([emb.get_embedding_np().tolist() for emb in embeddings],
+                             [[1, 2, 3], [4, 5, 6, 7, 8], [9, 10]])
+
+            # Sizes that add up to a multiple of the count, and values that are NaN, are still kept per string.
+            embeddings = EMB.Embedding.from_strings(["[1 2]", "[3 4 5 6]", "[7 8 9]"])
+            self.assertEqual([len(emb.get_embedding_np()) for emb in embeddings], [2, 4, 3])
+
+            embeddings = EMB.Embedding.from_strings(["[nan 1]", "[2 3]"])
+            self.assertEqual(embeddings[1].get_embedding_np().tolist(), [2, 3])
+            self.assertTrue(np.isnan(embeddings[0].get_embedding_np()[0]))
+
+            with self.assertRaises(ValueError):
+                EMB.Embedding.from_strings(["[1 2]", "[3 x]"])
+
+    def test_embedding_dict_conversion_with_numpy(self):
+        """
+        Tests that the dictionary representation keeps the full precision of long embeddings.
+        """
+        self.addCleanup(setattr, EMB, "NUMPY_LOADED", EMB.NUMPY_LOADED)
+
+        if NUMPY_AVAILABLE:
+            EMB.NUMPY_LOADED = True
+            emb1 = EMB.Embedding(np.random.RandomState(0).randn(2048))
+
+            emb_deserialized = EMB.Embedding.from_dict(emb1.to_dict())
+            self.assertTrue(np.array_equal(emb1.get_embedding_np(), emb_deserialized.get_embedding_np()))
+        else:
+            self.assertTrue(True)
+
+    def test_face_recognition_is_lazy(self):
+        """
+        Tests that the embeddings do not build a face recognition object until it is required, and share the default
+        one.
+        """
+        self.addCleanup(setattr, EMB, "_default_face_recognition", EMB._default_face_recognition)
+        EMB._default_face_recognition = None
+
+        emb1 = EMB.Embedding([2, 3, 4])
+        emb2 = EMB.Embedding([2, 3, 4])
+
+        self.assertIsNone(EMB._default_face_recognition)
+        self.assertFalse(hasattr(emb1, "__dict__"))
+        self.assertIs(emb1.face_recognition, emb2.face_recognition)
+        self.assertIsNotNone(EMB._default_face_recognition)
+
+
 if __name__ == '__main__':
     unittest.main()
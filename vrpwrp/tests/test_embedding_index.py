@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except:
+    NUMPY_AVAILABLE = False
+
+import unittest
+import vrpwrp.tools.embedding as EMB
+from vrpwrp.tools import distances
+from vrpwrp.tools.embedding_index import EmbeddingIndex
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestEmbeddingIndex(unittest.TestCase):
+    """
+    Unit tests for the class EmbeddingIndex
+    """
+
+    def setUp(self):
+        """
+        Builds a random gallery with a label per embedding.
+        """
+        if NUMPY_AVAILABLE:
+            random = np.random.RandomState(0)
+            self.gallery = random.randn(500, 128) / np.sqrt(128)
+            self.labels = ["subject{}".format(i) for i in range(500)]
+
+    def test_search(self):
+        """
+        Tests that the index finds the k nearest embeddings, sorted by distance.
+        """
+        if NUMPY_AVAILABLE:
+            self.addCleanup(setattr, EMB, "NUMPY_LOADED", EMB.NUMPY_LOADED)
+            EMB.NUMPY_LOADED = True
+            index = EmbeddingIndex(initial_capacity=16)
+            index.add_many(self.gallery[:400], self.labels[:400])
+
+            for row, label in zip(self.gallery[400:], self.labels[400:]):
+                index.add(EMB.Embedding(row), label)
+
+            self.assertEqual(len(index), 500)
+
+            probe = self.gallery[42] + 0.01
+            expected = distances.embeddings_distances(probe, self.gallery)
+            result = index.search(EMB.Embedding(probe), k=5)
+
+            self.assertEqual([label for label, _ in result], [self.labels[i] for i in np.argsort(expected)[:5]])
+            self.assertEqual(result[0][0], "subject42")
+            self.assertTrue(np.allclose([distance for _, distance in result], np.sort(expected)[:5], atol=1e-5))
+        else:
+            self.assertTrue(True)
+
+    def test_search_radius(self):
+        """
+        Tests that the index finds all the embeddings within a distance.
+        """
+        if NUMPY_AVAILABLE:
+            index = EmbeddingIndex()
+            index.add_many(self.gallery, self.labels)
+
+            expected = distances.embeddings_distances(self.gallery[0], self.gallery)
+            result = index.search_radius(self.gallery[0], threshold=1.2)
+
+            self.assertEqual(len(result), int(np.sum(expected <= 1.2)))
+            self.assertEqual(result[0][0], "subject0")
+            self.assertAlmostEqual(result[0][1], 0.0, places=2)
+        else:
+            self.assertTrue(True)
+
+    def test_remove(self):
+        """
+        Tests that removed labels are not found anymore and the rest of the index is kept.
+        """
+        if NUMPY_AVAILABLE:
+            index = EmbeddingIndex()
+            index.add_many(self.gallery[:10], ["a", "b", "a", "c", "d", "e", "f", "g", "h", "a"])
+
+            self.assertEqual(index.remove("a"), 3)
+            self.assertEqual(index.remove("a"), 0)
+            self.assertEqual(len(index), 7)
+            self.assertNotIn("a", index.get_labels())
+
+            for row, label in [(1, "b"), (3, "c"), (8, "h")]:
+                self.assertEqual(index.search(self.gallery[row], k=1)[0][0], label)
+        else:
+            self.assertTrue(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
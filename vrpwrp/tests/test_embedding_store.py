@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except:
+    NUMPY_AVAILABLE = False
+
+import os
+import shutil
+import tempfile
+import unittest
+import vrpwrp.tools.embedding as EMB
+from vrpwrp.tools.embedding_store import EmbeddingStore
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    """
+    Unit tests for the class EmbeddingStore
+    """
+
+    def setUp(self):
+        """
+        Creates a temporary folder for the store and a random gallery.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "gallery.emb")
+
+        if NUMPY_AVAILABLE:
+            self.gallery = np.random.RandomState(0).randn(100, 128).astype(np.float32)
+
+    def tearDown(self):
+        """
+        Removes the temporary folder.
+        """
+        shutil.rmtree(self.folder)
+
+    def test_append_and_reopen(self):
+        """
+        Tests that the embeddings appended are memory-mapped when the store is opened again.
+        """
+        if NUMPY_AVAILABLE:
+            self.addCleanup(setattr, EMB, "NUMPY_LOADED", EMB.NUMPY_LOADED)
+            EMB.NUMPY_LOADED = True
+            store = EmbeddingStore(self.path, dimensions=128, mode="a")
+            store.append_many(self.gallery[:99], ["id{}".format(i) for i in range(99)])
+            store.append(EMB.Embedding(self.gallery[99]), "id99")
+
+            self.assertEqual(len(store), 100)
+
+            store = EmbeddingStore(self.path)
+
+            self.assertEqual(len(store), 100)
+            self.assertTrue(isinstance(store.get_vectors(), np.memmap))
+            self.assertTrue(np.array_equal(store.get_vectors(), self.gallery))
+            self.assertEqual(store.get_ids()[42], "id42")
+            self.assertTrue(np.array_equal(store.get("id42").get_embedding_np(), self.gallery[42]))
+
+            with self.assertRaises(Exception):
+                store.append(self.gallery[0], "read-only")
+        else:
+            self.assertTrue(True)
+
+    def test_search(self):
+        """
+        Tests that the store finds the nearest embeddings scanning the mapped file.
+        """
+        if NUMPY_AVAILABLE:
+            store = EmbeddingStore(self.path, dimensions=128, mode="a")
+            store.append_many(self.gallery, range(100))
+
+            result = store.search(self.gallery[7], k=3, chunk_size=16)
+
+            self.assertEqual(len(result), 3)
+            self.assertEqual(result[0], ("7", 0.0))
+            self.assertEqual(len(store.distances(self.gallery[7])), 100)
+        else:
+            self.assertTrue(True)
+
+    def test_refresh(self):
+        """
+        Tests that a reader sees the embeddings appended by a writer after refreshing.
+        """
+        if NUMPY_AVAILABLE:
+            writer = EmbeddingStore(self.path, dimensions=128, mode="a")
+            reader = EmbeddingStore(self.path)
+
+            writer.append_many(self.gallery[:10], range(10))
+            self.assertEqual(len(reader), 0)
+
+            reader.refresh()
+            self.assertEqual(len(reader), 10)
+
+            with self.assertRaises(Exception):
+                EmbeddingStore(self.path, dimensions=64)
+        else:
+            self.assertTrue(True)
+
+    def test_interrupted_append(self):
+        """
+        Tests that the embeddings appended after an interrupted append stay aligned with their ids.
+        """
+        if NUMPY_AVAILABLE:
+            store = EmbeddingStore(self.path, dimensions=128, mode="a")
+            store.append_many(self.gallery[:3], range(3))
+
+            # A vector without id, and an id without vector nor line break.
+            with open(self.path, "ab") as f:
+                f.write(self.gallery[3].tobytes())
+
+            with open(self.path + ".ids", "a", encoding="UTF-8") as f:
+                f.write("orphan")
+
+            store = EmbeddingStore(self.path, mode="a")
+            self.assertEqual(len(store), 3)
+
+            store.append_many(self.gallery[4:6], ["4", "5"])
+            store = EmbeddingStore(self.path)
+
+            self.assertEqual(store.get_ids(), ["0", "1", "2", "4", "5"])
+            self.assertTrue(np.array_equal(store.get_vectors()[3:], self.gallery[4:6]))
+            self.assertEqual(os.path.getsize(self.path), 64 + 5 * 128 * 4)
+        else:
+            self.assertTrue(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from vrpwrp.tests.fakes import FakeFaceDetection, FakeFaceRecognition
+from vrpwrp.wrappers.face_bundle import FaceBundle
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestFaceBundle(unittest.TestCase):
+    """
+    Unit tests for the class FaceBundle
+    """
+
+    def setUp(self):
+        """
+        Sets up the testing subject!
+        """
+        self.subject = "vrpwrp/samples/subject2_2.jpg"
+        self.boxes = [[0, 0, width, 20] for width in range(10, 60, 5)]
+
+    def test_process_file_parallel_keeps_order(self):
+        """
+        Tests that the embeddings are returned in the order of the bounding boxes when requested in parallel.
+        """
+        face_recognition = FakeFaceRecognition(delay=1.0)
+        face_bundle = FaceBundle(FakeFaceDetection(self.boxes), face_recognition, workers=4)
+
+        embeddings = face_bundle.process_file(self.subject)
+        face_bundle.close()
+
+        self.assertEqual(embeddings, [box[2] for box in self.boxes])
+        self.assertGreater(face_recognition.max_in_flight, 1)
+        self.assertLessEqual(face_recognition.max_in_flight, 4)
+
+    def test_process_file_serial(self):
+        """
+        Tests that the embeddings can be requested one after another.
+        """
+        face_recognition = FakeFaceRecognition()
+        face_bundle = FaceBundle(FakeFaceDetection(self.boxes), face_recognition, workers=1)
+
+        embeddings = face_bundle.process_file(self.subject)
+
+        self.assertEqual(embeddings, [box[2] for box in self.boxes])
+        self.assertEqual(face_recognition.max_in_flight, 1)
+
+    def test_process_file_crop_encoding(self):
+        """
+        Tests that the faces are uploaded in the configured format and size.
+        """
+        face_recognition = FakeFaceRecognition()
+        uploads = []
+        get_embeddings_from_bytes = face_recognition.get_embeddings_from_bytes
+
+        def record_upload(image_bytes):
+            uploads.append(image_bytes)
+            return get_embeddings_from_bytes(image_bytes)
+
+        face_recognition.get_embeddings_from_bytes = record_upload
+        face_bundle = FaceBundle(FakeFaceDetection([[0, 0, 400, 200]]), face_recognition, crop_format="JPEG",
+                                 crop_quality=80, crop_max_side=160)
+
+        embeddings = face_bundle.process_file(self.subject)
+
+        self.assertEqual(embeddings, [160])
+        self.assertTrue(uploads[0].startswith(b"\xff\xd8"))
+
+    def test_process_many_ordered(self):
+        """
+        Tests that a batch can be processed keeping the order of the uris, with failures reported per item.
+        """
+        face_bundle = FaceBundle(FakeFaceDetection(self.boxes[:2]), FakeFaceRecognition(), workers=2)
+        uris = [self.subject, "vrpwrp/samples/missing.jpg", self.subject, self.subject]
+
+        results = list(face_bundle.process_many(uris, ordered=True, max_pending=2))
+
+        self.assertEqual([result[0] for result in results], uris)
+        self.assertEqual(results[0][1], [10, 15])
+        self.assertIsNone(results[0][2])
+        self.assertIsNone(results[1][1])
+        self.assertTrue(isinstance(results[1][2], IOError))
+        self.assertEqual(results[3][1], [10, 15])
+
+    def test_process_many_directory(self):
+        """
+        Tests that all the files of a directory are processed.
+        """
+        face_bundle = FaceBundle(FakeFaceDetection(self.boxes[:1]), FakeFaceRecognition(), workers=3)
+
+        results = list(face_bundle.process_many("vrpwrp/samples"))
+
+        self.assertEqual(len(results), 7)
+        self.assertTrue(all(error is None for _, _, error in results))
+
+    def test_process_many_single_uri(self):
+        """
+        Tests that a single path is processed as one image, not as a sequence of characters.
+        """
+        face_bundle = FaceBundle(FakeFaceDetection(self.boxes[:1]), FakeFaceRecognition(), workers=2)
+
+        results = list(face_bundle.process_many(self.subject))
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0], self.subject)
+        self.assertIsNone(results[0][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
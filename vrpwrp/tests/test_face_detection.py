@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import unittest
+from vrpwrp.helpers import image_helper
+from vrpwrp.tests.fakes import FakeSession
 from vrpwrp.wrappers.face_detection import FaceDetection
 
 __author__ = 'Iván de Paz Centeno'
@@ -19,6 +21,51 @@ class TestFaceDetection(unittest.TestCase):
         bounding_boxes = face_detection.analyze_file("vrpwrp/samples/subject3_3.jpg")
         self.assertEqual(len(bounding_boxes), 1)
 
+    def test_detect_faces_downscaled(self):
+        """
+        Tests that big images are downscaled before upload and the bounding boxes mapped back to the original size.
+        """
+        session = FakeSession({'bounding_boxes': ["[10, 5, 20, 30]"]})
+        face_detection = FaceDetection("http://localhost/detect", max_side=200, session=session)
+
+        bounding_boxes = face_detection.analyze_file("vrpwrp/samples/subject2_2.jpg")
+
+        self.assertEqual(image_helper.get_image_size(session.uploads[0]), (200, 112))
+        self.assertEqual(bounding_boxes[0].get_box(), [40, 20, 80, 121])
+
+        image = image_helper.get_file_image("vrpwrp/samples/subject2_2.jpg")
+        bounding_boxes = FaceDetection("http://localhost/detect", max_pixels=800 * 450 // 16,
+                                       session=session).analyze_pil(image)
+
+        self.assertEqual(image_helper.get_image_size(session.uploads[1]), (200, 112))
+        self.assertEqual(bounding_boxes[0].get_box(), [40, 20, 80, 121])
+
+    def test_detect_faces_downscaled_rgba(self):
+        """
+        Tests that images with transparency can be downscaled and uploaded as JPEG.
+        """
+        session = FakeSession({'bounding_boxes': ["[10, 5, 20, 30]"]})
+        face_detection = FaceDetection("http://localhost/detect", max_side=200, session=session)
+        image = image_helper.get_file_image("vrpwrp/samples/subject2_2.jpg").convert("RGBA")
+
+        bounding_boxes = face_detection.analyze_pil(image)
+
+        self.assertTrue(session.uploads[0].startswith(b"\xff\xd8"))
+        self.assertEqual(bounding_boxes[0].get_box(), [40, 20, 80, 121])
+
+    def test_detect_faces_not_downscaled(self):
+        """
+        Tests that images within the limits are uploaded as they are.
+        """
+        session = FakeSession({'bounding_boxes': ["[10, 5, 20, 30]"]})
+        face_detection = FaceDetection("http://localhost/detect", max_side=1000, session=session)
+        image_bytes = image_helper.get_file_binary_content("vrpwrp/samples/subject2_2.jpg")
+
+        bounding_boxes = face_detection.analyze_bytes(image_bytes)
+
+        self.assertIs(session.uploads[0], image_bytes)
+        self.assertEqual(bounding_boxes[0].get_box(), [10, 5, 20, 30])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import pickle
+import time
 import unittest
 import vrpwrp.tools.embedding as EMB
 import vrpwrp.wrappers.face_recognition as FACEREC
+from vrpwrp.tests.fakes import FakeSession
 
 try:
     import numpy as np
@@ -17,6 +20,26 @@ __author__ = 'Iván de Paz Centeno'
 Embedding = EMB.Embedding
 FaceRecognition = FACEREC.FaceRecognition
 
+
+class EmbeddingSession(FakeSession):
+    """
+    Session that answers the batch requests with an embedding per image, and the single requests with an embedding
+    of the size of the image. The batch answer can be overridden to emulate an endpoint without batching support.
+    """
+    def __init__(self, batch_answer=None):
+        super().__init__()
+        self.batch_answer = batch_answer
+
+    def answer(self, method, url, data=None, files=None, **kwargs):
+        if files is not None:
+            if self.batch_answer is not None:
+                return self.batch_answer
+
+            return {'embeddings_data': [{'embedding': "[{} 0]".format(len(content))} for _, (_, content, _) in files]}
+
+        return {'embedding_data': {'embedding': "[{} 0]".format(len(data))}}
+
+
 class TestFaceRecognition(unittest.TestCase):
     """
     Unit tests for the class FaceRecognition
@@ -62,6 +85,68 @@ class TestFaceRecognition(unittest.TestCase):
         distances = face_recognition.get_embeddings_distances(emb1, embs_who)
         self.assertTrue(len(distances) == len(embs_who))
 
+    def test_get_embeddings_from_batch(self):
+        """
+        Tests that a batch of images is embedded in a single request, keeping the order.
+        """
+        session = EmbeddingSession()
+        face_recognition = FaceRecognition("http://localhost/embed", batch_API_URL="http://localhost/batch",
+                                           session=session)
+
+        embeddings = face_recognition.get_embeddings_from_batch([b"a" * size for size in range(1, 11)])
+
+        self.assertEqual(session.urls, ["http://localhost/batch"])
+        self.assertEqual([float(str(embedding).strip("[]").split()[0]) for embedding in embeddings],
+                         list(range(1, 11)))
+
+    def test_get_embeddings_from_batch_fallback(self):
+        """
+        Tests that single requests are sent when the batch endpoint does not support batching.
+        """
+        session = EmbeddingSession(batch_answer={'message': 'Not found'})
+        face_recognition = FaceRecognition("http://localhost/embed", batch_API_URL="http://localhost/batch",
+                                           session=session, workers=4)
+
+        embeddings = face_recognition.get_embeddings_from_batch([b"a" * size for size in range(1, 11)])
+        embeddings += face_recognition.get_embeddings_from_batch([b"a", b"b"])
+
+        self.assertEqual(len(embeddings), 12)
+        self.assertEqual(session.urls.count("http://localhost/batch"), 1)
+        self.assertEqual(session.urls.count("http://localhost/embed"), 12)
+
+    def test_get_embeddings_from_batch_retries_after_cooldown(self):
+        """
+        Tests that the batch endpoint is tried again once the cooldown after a failed batch request has passed.
+        """
+        session = EmbeddingSession(batch_answer={'message': 'Service unavailable'})
+        face_recognition = FaceRecognition("http://localhost/embed", batch_API_URL="http://localhost/batch",
+                                           session=session, workers=4, batch_cooldown=0.05)
+
+        face_recognition.get_embeddings_from_batch([b"a", b"b"])
+        face_recognition.get_embeddings_from_batch([b"a", b"b"])
+        self.assertEqual(session.urls.count("http://localhost/batch"), 1)
+
+        session.batch_answer = None
+        time.sleep(0.1)
+
+        embeddings = face_recognition.get_embeddings_from_batch([b"a", b"bb"])
+        self.assertEqual(session.urls.count("http://localhost/batch"), 2)
+        self.assertEqual(len(embeddings), 2)
+
+    def test_pickle_embeddings(self):
+        """
+        Tests that the embeddings can be pickled along with their wrapper, after its thread pool is used.
+        """
+        face_recognition = FaceRecognition("http://localhost/embed", batch_API_URL="", workers=2)
+        face_recognition._get_executor()
+        embeddings = [Embedding("[{} 0]".format(value), face_recognition) for value in range(2)]
+
+        restored = pickle.loads(pickle.dumps(embeddings))
+
+        self.assertEqual([str(embedding) for embedding in restored], [str(embedding) for embedding in embeddings])
+        self.assertEqual(restored[0].face_recognition.API_URL, "http://localhost/embed")
+        self.assertIsNotNone(restored[0].face_recognition._get_executor())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import unittest
+from PIL import Image
+from vrpwrp.helpers import image_helper, video_helper
+from vrpwrp.tests.fakes import FakeFaceDetection, FakeFaceRecognition
+from vrpwrp.wrappers.face_bundle import FaceBundle
+from vrpwrp.wrappers.frame_pipeline import FramePipeline
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestFramePipeline(unittest.TestCase):
+    """
+    Unit tests for the class FramePipeline
+    """
+
+    def setUp(self):
+        """
+        Builds a pipeline over fake face detection and recognition.
+        """
+        self.face_detection = FakeFaceDetection()
+        self.face_bundle = FaceBundle(self.face_detection, FakeFaceRecognition(), workers=1)
+
+    def test_image_sequence(self):
+        """
+        Tests that the files of an image sequence are sampled, uploaded as they are and yielded in order.
+        """
+        pipeline = FramePipeline(self.face_bundle, workers=4, look_ahead=4)
+
+        results = list(pipeline.process("vrpwrp/samples", step=2))
+
+        self.assertEqual([frame_number for frame_number, _, _, _ in results], [0, 2, 4, 6])
+        self.assertTrue(all(error is None for _, _, _, error in results))
+        self.assertEqual([embeddings for _, _, embeddings, _ in results], [[10]] * 4)
+        self.assertIn(image_helper.get_file_binary_content("vrpwrp/samples/subject1_1.jpg"),
+                      self.face_detection.uploads)
+
+    def test_pil_frames(self):
+        """
+        Tests that decoded frames are encoded as configured, also with transparency, and that failures are reported per
+        frame.
+        """
+        frames = [Image.new("RGB", (64, 48)), b"broken", Image.new("RGBA", (64, 48))]
+        pipeline = FramePipeline(self.face_bundle, workers=2, frame_format="JPEG", compute_embeddings=False)
+
+        results = list(pipeline.process(frames))
+
+        self.assertEqual([frame_number for frame_number, _, _, _ in results], [0, 1, 2])
+        self.assertEqual(type(results[1][3]), OSError)
+        self.assertIsNone(results[0][2])
+        self.assertIsNone(results[2][3])
+        self.assertEqual(Image.open(io.BytesIO(self.face_detection.uploads[0])).format, "JPEG")
+
+    def test_look_ahead_is_bounded(self):
+        """
+        Tests that the frames are not read further than the look ahead.
+        """
+        read = []
+
+        def frames():
+            for frame_number in range(50):
+                read.append(frame_number)
+                yield Image.new("RGB", (32, 32))
+
+        pipeline = FramePipeline(self.face_bundle, workers=2, look_ahead=5, compute_embeddings=False)
+
+        for frame_number, _, _, _ in pipeline.process(frames()):
+            self.assertLessEqual(len(read), frame_number + 5 + 1)
+
+    def test_video_requires_opencv(self):
+        """
+        Tests that decoding a video without OpenCV is reported.
+        """
+        if not video_helper.CV2_LOADED:
+            with self.assertRaises(Exception):
+                next(video_helper.iterate_video_frames("video.mp4"))
+
+
+if __name__ == '__main__':
+    unittest.main()
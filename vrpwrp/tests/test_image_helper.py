@@ -82,6 +82,40 @@ class TestImageHelper(unittest.TestCase):
 
         self.assertEqual(image.size, (800, 450))
 
+    def test_encode_image(self):
+        """
+        Tests that the image helper can encode PIL images in several formats, optionally downscaled.
+        """
+        image = image_helper.get_file_image(self.subject)
+
+        for image_format in ["PNG", "JPEG", "PPM"]:
+            with Image.open(io.BytesIO(image_helper.encode_image(image, image_format))) as encoded:
+                self.assertEqual(encoded.format, image_format)
+                self.assertEqual(encoded.size, (800, 450))
+
+        low_quality = image_helper.encode_image(image, "JPEG", quality=20)
+        self.assertLess(len(low_quality), len(image_helper.encode_image(image, "JPEG", quality=90)))
+
+        downscaled = image_helper.get_image(image_helper.encode_image(image, "JPEG", max_side=160))
+        self.assertEqual(downscaled.size, (160, 90))
+
+        self.assertIs(image_helper.downscale(image, 1000), image)
+
+    def test_lazy_image(self):
+        """
+        Tests that the lazy image is decoded only once, when required.
+        """
+        content = image_helper.get_file_binary_content(self.subject)
+        lazy_image = image_helper.LazyImage(content)
+
+        self.assertFalse(lazy_image.is_decoded())
+
+        image = lazy_image.get_image()
+
+        self.assertTrue(lazy_image.is_decoded())
+        self.assertEqual(image.size, (800, 450))
+        self.assertIs(lazy_image.get_image(), image)
+
     def test_crop_by_bbox(self):
         """
         Tests that the image helper can crop an image successfully by a bounding box.
@@ -132,6 +166,113 @@ class TestImageHelper(unittest.TestCase):
         for size, segment in sizes:
             self.assertEqual(size, segment.size)
 
+    def test_encode_image_modes(self):
+        """
+        Tests that images with transparency or a palette are encoded as RGB in the formats that can't store them.
+        """
+        for mode in ["RGBA", "LA", "P"]:
+            image = Image.new(mode, (40, 30))
+
+            for image_format in ["JPEG", "PPM"]:
+                encoded = Image.open(io.BytesIO(image_helper.encode_image(image, image_format, max_side=20)))
+
+                self.assertEqual(encoded.format, image_format)
+                self.assertEqual(encoded.size, (20, 15))
+
+        self.assertEqual(Image.open(io.BytesIO(image_helper.encode_image(Image.new("RGBA", (4, 4))))).mode, "RGBA")
+
+    def test_get_scale(self):
+        """
+        Tests that the scale factor fits the images into the limits given.
+        """
+        self.assertEqual(image_helper.get_scale((800, 450)), 1.0)
+        self.assertEqual(image_helper.get_scale((800, 450), max_side=1000), 1.0)
+        self.assertEqual(image_helper.get_scale((800, 450), max_side=400), 0.5)
+        self.assertAlmostEqual(image_helper.get_scale((800, 450), max_pixels=200 * 112.5), 0.25)
+        self.assertAlmostEqual(image_helper.get_scale((800, 450), max_side=400, max_pixels=200 * 112.5), 0.25)
+
+    def test_get_image_draft(self):
+        """
+        Tests that JPEG images can be decoded at reduced size.
+        """
+        with open(self.subject, "rb") as f:
+            image_bytes = f.read()
+
+        self.assertEqual(image_helper.get_image_size(image_bytes), (800, 450))
+        self.assertEqual(image_helper.get_image(image_bytes, draft_size=(200, 112)).size, (200, 113))
+
+    def test_segments_bounding_boxes_overlap(self):
+        """
+        Tests that overlapping segments cover the whole image.
+        """
+        bounding_boxes = list(image_helper.get_segments_bounding_boxes((800, 450), 300, 300, overlap=100))
+
+        self.assertEqual([bbox.get_box() for bbox in bounding_boxes[:4]],
+                         [[0, 0, 300, 300], [200, 0, 300, 300], [400, 0, 300, 300], [600, 0, 200, 300]])
+        self.assertEqual(bounding_boxes[-1].get_box(), [600, 200, 200, 250])
+        self.assertEqual(len(list(image_helper.get_segments_bounding_boxes((800, 450), 200, 200))), 12)
+
+        with self.assertRaises(ValueError):
+            list(image_helper.get_segments_bounding_boxes((800, 450), 300, 200, overlap=-1))
+
+        # Overlaps are limited to half the size of the segments.
+        expected = [bbox.get_box() for bbox in image_helper.get_segments_bounding_boxes((800, 450), 300, 200,
+                                                                                         overlap=100)]
+
+        for overlap in [200, 300]:
+            self.assertEqual([bbox.get_box() for bbox in image_helper.get_segments_bounding_boxes((800, 450), 300, 200,
+                                                                                                  overlap=overlap)],
+                             expected)
+
+    def test_get_tiles(self):
+        """
+        Tests that the tiles describe the same segments as segment_image, both from PIL images and numpy arrays.
+        """
+        with Image.open(self.subject) as im:
+            image = im.convert("RGB")
+
+        tiles = list(image_helper.get_tiles(image, 200, 200))
+
+        self.assertEqual(len(tiles), 12)
+        self.assertEqual(tiles[11].get_bounding_box().get_box(), [600, 400, 200, 50])
+        self.assertEqual([tile.get_image().size for tile in tiles],
+                         [segment.size for segment in image_helper.segment_image(image, 200, 200)])
+
+        if image_helper.NUMPY_LOADED:
+            import numpy as np
+            array = np.asarray(image)
+            tile = list(image_helper.get_tiles(array, 200, 200))[5]
+
+            self.assertTrue(np.shares_memory(tile.get_array(), array))
+            self.assertEqual(tile.get_array().shape, (200, 200, 3))
+            self.assertTrue(np.array_equal(tile.get_array(), tiles[5].get_array()))
+            self.assertEqual(image_helper.get_image(tile.encode()).size, (200, 200))
+
+    def test_get_tile_array_without_numpy(self):
+        """
+        Tests that the arrays of the tiles fail clearly without numpy, while their images are still available.
+        """
+        self.addCleanup(setattr, image_helper, "NUMPY_LOADED", image_helper.NUMPY_LOADED)
+        image_helper.NUMPY_LOADED = False
+
+        tile = next(image_helper.get_tiles(Image.new("RGB", (400, 300)), 200, 200))
+
+        self.assertEqual(tile.get_image().size, (200, 200))
+
+        with self.assertRaises(Exception):
+            tile.get_array()
+
+    def test_get_preview(self):
+        """
+        Tests that the previews fit in the given size.
+        """
+        with open(self.subject, "rb") as f:
+            image_bytes = f.read()
+
+        self.assertEqual(image_helper.get_preview(image_bytes, 200).size[0], 200)
+        self.assertEqual(image_helper.get_preview(image_bytes, 150).size, (150, 85))
+        self.assertEqual(image_helper.get_preview(image_bytes, 1000).size, (800, 450))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
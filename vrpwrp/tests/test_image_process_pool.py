@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import vrpwrp.helpers.image_process_pool as POOL
+from vrpwrp.helpers import image_helper
+from vrpwrp.helpers.image_process_pool import ImageProcessPool
+from vrpwrp.tests.fakes import FakeFaceDetection, FakeFaceRecognition, FakeSession, build_score_answers
+from vrpwrp.tools.boundingbox import BoundingBox
+from vrpwrp.wrappers.face_bundle import FaceBundle
+from vrpwrp.wrappers.porn_classification import PornClassification
+
+__author__ = 'Iván de Paz Centeno'
+
+
+@unittest.skipUnless(POOL.SHARED_MEMORY_LOADED, "Python 3.8 or newer is required for the ImageProcessPool.")
+class TestImageProcessPool(unittest.TestCase):
+    """
+    Unit tests for the class ImageProcessPool
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = ImageProcessPool(workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def setUp(self):
+        """
+        Loads the sample image, of 800x600.
+        """
+        self.image_bytes = image_helper.get_file_binary_content("vrpwrp/samples/subject2_2.jpg")
+        self.pil_image = image_helper.get_image(self.image_bytes)
+        self.boxes = [BoundingBox(10, 20, 100, 50), BoundingBox(700, 500, 150, 150)]
+
+    def test_decode(self):
+        """
+        Tests that images are decoded into shared memory with the same pixels.
+        """
+        with self.pool.decode(self.image_bytes) as shared_image:
+            self.assertEqual(shared_image.size, self.pil_image.size)
+            self.assertEqual(shared_image.get_image().tobytes(), self.pil_image.tobytes())
+
+    def test_crop_and_encode(self):
+        """
+        Tests that the regions are cropped and encoded as in the calling thread.
+        """
+        expected = [image_helper.encode_image(image_helper.crop_by_bbox(self.pil_image, bbox)) for bbox in self.boxes]
+
+        self.assertEqual(self.pool.crop_and_encode(self.image_bytes, self.boxes), expected)
+
+        with self.pool.decode(self.image_bytes) as shared_image:
+            self.assertEqual(self.pool.encode_regions(shared_image, self.boxes), expected)
+
+    def test_preview(self):
+        """
+        Tests that previews are built in the workers.
+        """
+        preview = image_helper.get_image(self.pool.get_preview(self.image_bytes, 200))
+
+        self.assertEqual(preview.size[0], 200)
+
+    def test_errors_are_raised(self):
+        """
+        Tests that failures of the workers are raised in the caller.
+        """
+        with self.assertRaises(Exception):
+            self.pool.crop_and_encode(b"not an image", self.boxes)
+
+    def test_face_bundle(self):
+        """
+        Tests that the bundle gets the same embeddings with the process pool.
+        """
+        boxes = [[0, 0, width, 20] for width in range(10, 60, 10)]
+        face_bundle = FaceBundle(FakeFaceDetection(boxes), FakeFaceRecognition(), workers=1, process_pool=self.pool)
+
+        self.assertEqual(face_bundle.process_bytes(self.image_bytes), [10, 20, 30, 40, 50])
+
+    def test_porn_classification(self):
+        """
+        Tests that the segments are scored with the process pool.
+        """
+        session = FakeSession(answers=build_score_answers([0.1, 0.2, 0.9]))
+        porn_classification = PornClassification("http://localhost/porn", workers=4, process_pool=self.pool,
+                                                 session=session, cache=False, coalesce=False)
+        self.addCleanup(porn_classification.close)
+
+        results = porn_classification.get_segments_scores(self.image_bytes, 200, 200)
+
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all(error is None for _, _, error in results))
+        self.assertEqual(sorted(score for _, score, _ in results), [0.1] * 4 + [0.2] * 4 + [0.9] * 4)
+
+
+class TestImageProcessPoolSupport(unittest.TestCase):
+    """
+    Unit tests for the ImageProcessPool on Pythons without shared memory.
+    """
+
+    def test_pool_requires_shared_memory(self):
+        """
+        Tests that the wrappers work without the pool, and that requesting it fails clearly.
+        """
+        self.addCleanup(setattr, POOL, "SHARED_MEMORY_LOADED", POOL.SHARED_MEMORY_LOADED)
+        POOL.SHARED_MEMORY_LOADED = False
+
+        boxes = [[0, 0, 10, 20]]
+        image_bytes = image_helper.get_file_binary_content("vrpwrp/samples/subject2_2.jpg")
+        face_bundle = FaceBundle(FakeFaceDetection(boxes), FakeFaceRecognition(), workers=1, process_pool=None)
+
+        self.assertEqual(face_bundle.process_bytes(image_bytes), [10])
+
+        with self.assertRaises(Exception):
+            ImageProcessPool(workers=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
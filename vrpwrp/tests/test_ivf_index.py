@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except:
+    NUMPY_AVAILABLE = False
+
+import unittest
+from vrpwrp.tools.ivf_index import IVFEmbeddingIndex, benchmark
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestIVFEmbeddingIndex(unittest.TestCase):
+    """
+    Unit tests for the class IVFEmbeddingIndex
+    """
+
+    def setUp(self):
+        """
+        Builds a clustered random gallery with a label per embedding.
+        """
+        if NUMPY_AVAILABLE:
+            random = np.random.RandomState(0)
+            centers = random.randn(50, 64)
+            self.gallery = centers[random.randint(0, 50, 3000)] + 0.2 * random.randn(3000, 64)
+            self.queries = self.gallery[:20] + 0.05 * random.randn(20, 64)
+
+    def test_untrained_search_is_exact(self):
+        """
+        Tests that the index searches exhaustively until it is trained.
+        """
+        if NUMPY_AVAILABLE:
+            index = IVFEmbeddingIndex(n_lists=32, n_probe=1)
+            index.add_many(self.gallery, list(range(3000)))
+
+            self.assertFalse(index.is_trained())
+            self.assertEqual(index.search(self.queries[0], k=1)[0][0], 0)
+        else:
+            self.assertTrue(True)
+
+    def test_recall(self):
+        """
+        Tests that the recall grows with the visited partitions and is total when all of them are visited.
+        """
+        if NUMPY_AVAILABLE:
+            index = IVFEmbeddingIndex(n_lists=32, n_probe=4)
+            index.add_many(self.gallery, list(range(3000)))
+            index.train()
+
+            self.assertTrue(index.is_trained())
+            self.assertEqual(benchmark(index, self.queries, k=10, n_probe=32)['recall'], 1.0)
+
+            report = benchmark(index, self.queries, k=10)
+            self.assertGreater(report['recall'], 0.8)
+            self.assertIn('exact_time', report)
+            self.assertIn('approximate_time', report)
+        else:
+            self.assertTrue(True)
+
+    def test_add_and_remove_after_training(self):
+        """
+        Tests that embeddings added or moved after training are found in their partitions.
+        """
+        if NUMPY_AVAILABLE:
+            index = IVFEmbeddingIndex(n_lists=16, n_probe=2, initial_capacity=8)
+            index.train(sample=self.gallery)
+            index.add_many(self.gallery[:1000], list(range(1000)))
+
+            self.assertEqual(index.remove(0), 1)
+            index.add(self.gallery[2000], "new")
+
+            self.assertEqual(index.search(self.gallery[2000], k=1)[0][0], "new")
+            self.assertEqual(index.search(self.gallery[999], k=1)[0][0], 999)
+            self.assertEqual(index.search_radius(self.gallery[5], threshold=1e-3)[0][0], 5)
+        else:
+            self.assertTrue(True)
+
+    def test_invalid_n_probe(self):
+        """
+        Tests that searches visiting no partitions are rejected.
+        """
+        if NUMPY_AVAILABLE:
+            with self.assertRaises(ValueError):
+                IVFEmbeddingIndex(n_lists=16, n_probe=0)
+
+            index = IVFEmbeddingIndex(n_lists=16, n_probe=2)
+            index.train(sample=self.gallery)
+            index.add_many(self.gallery[:100], list(range(100)))
+
+            with self.assertRaises(ValueError):
+                index.search(self.queries[0], k=1, n_probe=0)
+
+            with self.assertRaises(ValueError):
+                index.search_radius(self.queries[0], n_probe=-1)
+        else:
+            self.assertTrue(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
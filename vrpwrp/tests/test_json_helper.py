@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+from vrpwrp.config import config
+from vrpwrp.helpers import json_helper
+from vrpwrp.tests.fakes import FakeResponse
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestJsonHelper(unittest.TestCase):
+    """
+    Unit tests for the json_helper module
+    """
+
+    def setUp(self):
+        self.addCleanup(setattr, config, "FAST_JSON", config.FAST_JSON)
+        self.document = {"bounding_boxes": ["[10, 20, 30, 40]"], "score": 0.5, "name": "cara"}
+
+    def test_loads_and_dumps(self):
+        """
+        Tests that documents are serialized and parsed back, with and without the fast backend.
+        """
+        for fast_json in [True, False]:
+            config.FAST_JSON = fast_json
+
+            self.assertEqual(json_helper.loads(json_helper.dumps(self.document)), self.document)
+            self.assertEqual(json_helper.loads(json.dumps(self.document).encode("UTF-8")), self.document)
+            self.assertEqual(str(json_helper.loads('{"value": NaN}')["value"]), "nan")
+
+            with self.assertRaises(ValueError):
+                json_helper.loads("[1, 2")
+
+    def test_parse_response(self):
+        """
+        Tests that the raw body of the responses is parsed directly, and by requests when it is not UTF-8.
+        """
+        response = FakeResponse(content=json.dumps(self.document).encode("UTF-8"))
+        self.assertEqual(json_helper.parse_response(response), self.document)
+        self.assertEqual(response.json_calls, 0 if json_helper.ORJSON_LOADED else 1)
+
+        response = FakeResponse(content='{"name": "ca\xf1a"}'.encode("latin-1"))
+        self.assertEqual(json_helper.parse_response(response), {"name": "ca\xf1a"})
+        self.assertEqual(response.json_calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
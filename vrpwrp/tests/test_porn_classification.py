@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from vrpwrp.helpers import image_helper
+from vrpwrp.tests.fakes import FakeSession, build_score_answers
+from vrpwrp.wrappers.porn_classification import PornClassification
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestPornClassification(unittest.TestCase):
+    """
+    Unit tests for the class PornClassification
+    """
+
+    def setUp(self):
+        """
+        Loads the sample image, which is cut into 12 segments of 200x200.
+        """
+        self.image_bytes = image_helper.get_file_binary_content("vrpwrp/samples/subject2_2.jpg")
+
+    def _build(self, session, workers=4):
+        porn_classification = PornClassification("http://localhost/porn", workers=workers, session=session,
+                                                 cache=False, coalesce=False)
+        self.addCleanup(porn_classification.close)
+        return porn_classification
+
+    def test_get_score_segmented(self):
+        """
+        Tests that all the segments are scored, in order.
+        """
+        session = FakeSession(answers=build_score_answers([0.125]))
+        porn_classification = self._build(session)
+
+        results = porn_classification.get_segments_scores(self.image_bytes, 200, 200)
+
+        self.assertEqual(len(session.requests), 12)
+        self.assertEqual([bbox.get_box() for bbox, _, _ in results[:5]],
+                         [[0, 0, 200, 200], [200, 0, 200, 200], [400, 0, 200, 200], [600, 0, 200, 200],
+                          [0, 200, 200, 200]])
+        self.assertEqual(porn_classification.get_score_segmented(self.image_bytes, 200, 200), [0.125] * 12)
+
+    def test_errors_per_segment(self):
+        """
+        Tests that a failed segment does not stop the rest.
+        """
+        session = FakeSession(answers=build_score_answers([0.25, IOError("unreachable"), 0.25]))
+        porn_classification = self._build(session, workers=1)
+
+        results = porn_classification.get_segments_scores(self.image_bytes, 200, 200)
+
+        self.assertEqual(len(results), 12)
+        self.assertEqual(sum(error is not None for _, _, error in results), 4)
+        self.assertTrue(all(type(error) is OSError for _, score, error in results if score is None))
+        self.assertEqual(len(porn_classification.get_score_segmented(self.image_bytes, 200, 200)), 8)
+
+    def test_is_porn_stops_early(self):
+        """
+        Tests that the remaining segments are cancelled once one of them is over the threshold.
+        """
+        session = FakeSession(answers=build_score_answers([0.9]), delay=0.01)
+        porn_classification = self._build(session, workers=2)
+
+        results = porn_classification.get_segments_scores(self.image_bytes, 200, 200, stop_threshold=0.5)
+
+        self.assertLess(len(session.requests), 12)
+        self.assertLess(len(results), 12)
+
+        session = FakeSession(answers=build_score_answers([0.9]), delay=0.01)
+        self.assertTrue(self._build(session, workers=2).is_porn(self.image_bytes))
+
+        session = FakeSession(answers=build_score_answers([0.1]))
+        self.assertFalse(self._build(session).is_porn(self.image_bytes))
+
+
+    def test_adaptive_decided_by_coarse_pass(self):
+        """
+        Tests that images with a clear score in the downscaled pass are decided with a single request.
+        """
+        session = FakeSession(answers=build_score_answers([0.05]))
+        porn_classification = self._build(session)
+
+        self.assertEqual(porn_classification.get_score_adaptive(self.image_bytes, coarse_side=200), 0.05)
+        self.assertEqual(len(session.requests), 1)
+
+        session = FakeSession(answers=build_score_answers([0.95]))
+        self.assertTrue(self._build(session).is_porn(self.image_bytes, adaptive=True))
+        self.assertEqual(len(session.requests), 1)
+
+    def test_adaptive_refines_uncertain(self):
+        """
+        Tests that images with an uncertain score in the downscaled pass are refined into overlapping segments.
+        """
+        session = FakeSession(answers=build_score_answers([0.5] + [0.3] * 100))
+        porn_classification = self._build(session)
+
+        score = porn_classification.get_score_adaptive(self.image_bytes, coarse_side=200, segments_width=300,
+                                                       segments_height=300, overlap=100)
+
+        self.assertEqual(score, 0.3)
+        self.assertEqual(len(session.requests), 1 + 8)
+
+    def test_adaptive_refinement_stops_early(self):
+        """
+        Tests that the refinement stops once a segment is over the uncertain band.
+        """
+        session = FakeSession(answers=build_score_answers([0.5, 0.3, 0.9] + [0.3] * 100))
+        porn_classification = self._build(session, workers=1)
+
+        score = porn_classification.get_score_adaptive(self.image_bytes, coarse_side=200, segments_width=200,
+                                                       segments_height=200, overlap=0)
+
+        self.assertEqual(score, 0.9)
+        self.assertLess(len(session.requests), 1 + 12)
+
+    def test_adaptive_uses_threshold(self):
+        """
+        Tests that the threshold of the caller widens the uncertain band and stops the refinement, also with segments
+        smaller than the default overlap.
+        """
+        session = FakeSession(answers=build_score_answers([0.85] + [0.3] * 100))
+        porn_classification = self._build(session)
+
+        score = porn_classification.get_score_adaptive(self.image_bytes, coarse_side=200, segments_width=128,
+                                                       segments_height=128, stop_threshold=0.9)
+
+        self.assertEqual(score, 0.3)
+        self.assertGreater(len(session.requests), 1)
+
+        session = FakeSession(answers=build_score_answers([0.5, 0.3, 0.6] + [0.3] * 100))
+        porn_classification = self._build(session, workers=1)
+
+        score = porn_classification.get_score_adaptive(self.image_bytes, coarse_side=200, segments_width=200,
+                                                       segments_height=200, overlap=0, stop_threshold=0.5)
+
+        self.assertEqual(score, 0.6)
+        self.assertLess(len(session.requests), 1 + 12)
+
+    def test_adaptive_falls_back_to_coarse_score(self):
+        """
+        Tests that the score of the downscaled pass is returned if no segment could be scored.
+        """
+        session = FakeSession(answers=build_score_answers([0.5] + [IOError("Unreachable")] * 100))
+        porn_classification = self._build(session)
+
+        score = porn_classification.get_score_adaptive(self.image_bytes, coarse_side=200, segments_width=300,
+                                                       segments_height=300, overlap=100)
+
+        self.assertEqual(score, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from vrpwrp.helpers.result_cache import ResultCache, SqliteCacheStorage, get_cache_key
+from vrpwrp.tests.fakes import FakeSession
+from vrpwrp.wrappers.APIWrapper import APIWrapper
+from vrpwrp.wrappers.face_detection import FaceDetection
+from vrpwrp.wrappers.face_recognition import FaceRecognition
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestResultCache(unittest.TestCase):
+    """
+    Unit tests for the class ResultCache
+    """
+
+    def setUp(self):
+        """
+        Creates a temporary folder for the on-disk tier.
+        """
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Removes the temporary folder.
+        """
+        shutil.rmtree(self.folder)
+
+    def test_cache_key(self):
+        """
+        Tests that the keys depend on the content and the endpoint.
+        """
+        key = get_cache_key("PUT", "http://localhost/detect", b"image")
+
+        self.assertEqual(key, get_cache_key("put", "http://localhost/detect", b"image"))
+        self.assertNotEqual(key, get_cache_key("PUT", "http://localhost/detect", b"image2"))
+        self.assertNotEqual(key, get_cache_key("PUT", "http://localhost/embed", b"image"))
+
+    def test_lru_eviction(self):
+        """
+        Tests that the least recently used results are evicted first, and that hits and misses are counted.
+        """
+        cache = ResultCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.get_stats(), {"hits": 3, "misses": 1, "storage_hits": 0, "size": 2})
+
+    def test_ttl(self):
+        """
+        Tests that expired results are not served.
+        """
+        cache = ResultCache(ttl=0.05)
+        cache.set("a", 1)
+
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_sqlite_storage(self):
+        """
+        Tests that the results persisted on disk are served by a new cache.
+        """
+        path = os.path.join(self.folder, "cache.sqlite")
+
+        cache = ResultCache(storage=SqliteCacheStorage(path))
+        cache.set("a", {"bounding_boxes": ["[1, 2, 3, 4]"]})
+        cache.storage.close()
+
+        cache = ResultCache(storage=SqliteCacheStorage(path))
+
+        self.assertEqual(cache.get("a"), {"bounding_boxes": ["[1, 2, 3, 4]"]})
+        self.assertEqual(cache.get("a"), {"bounding_boxes": ["[1, 2, 3, 4]"]})
+        self.assertEqual(cache.get_stats()["storage_hits"], 1)
+        cache.storage.close()
+
+    def test_sqlite_storage_keeps_expiration(self):
+        """
+        Tests that the results served by the storage keep the expiration they were stored with.
+        """
+        path = os.path.join(self.folder, "cache.sqlite")
+
+        cache = ResultCache(ttl=0.2, storage=SqliteCacheStorage(path))
+        cache.set("a", 1)
+        cache.close()
+        time.sleep(0.1)
+
+        cache = ResultCache(ttl=0.2, storage=SqliteCacheStorage(path))
+        self.addCleanup(cache.close)
+
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.15)
+        self.assertIsNone(cache.get("a"))
+
+    def test_wrappers_use_cache(self):
+        """
+        Tests that repeated content is served by the cache without any request.
+        """
+        cache = ResultCache()
+        session = FakeSession({'bounding_boxes': ["[1, 2, 3, 4]"]})
+        face_detection = FaceDetection("http://localhost/detect", session=session, cache=cache)
+
+        for _ in range(3):
+            bounding_boxes = face_detection.analyze_bytes(b"image")
+
+        self.assertEqual(bounding_boxes[0].get_box(), [1, 2, 3, 4])
+        self.assertEqual(len(session.requests), 1)
+
+        face_detection.analyze_bytes(b"image2")
+        self.assertEqual(len(session.requests), 2)
+
+        # Same content, different endpoint.
+        session = FakeSession({'embedding_data': {'embedding': "[0.5 0.25]"}})
+        face_recognition = FaceRecognition("http://localhost/embed", session=session, cache=cache)
+        face_recognition.get_embeddings_from_bytes(b"image")
+        face_recognition.get_embeddings_from_bytes(b"image")
+
+        self.assertEqual(len(session.requests), 1)
+        self.assertEqual(cache.get_stats()["hits"], 3)
+
+    def test_failed_responses_not_cached(self):
+        """
+        Tests that the responses of failed requests are not cached.
+        """
+        cache = ResultCache()
+        session = FakeSession({'error': "busy"}, ok=False)
+        face_detection = FaceDetection("http://localhost/detect", session=session, cache=cache)
+
+        for _ in range(2):
+            with self.assertRaises(KeyError):
+                face_detection.analyze_bytes(b"image")
+
+        self.assertEqual(len(session.requests), 2)
+
+    def test_shared_cache(self):
+        """
+        Tests that the shared cache is used by the wrappers unless disabled for one of them.
+        """
+        self.addCleanup(APIWrapper.configure_cache, enabled=False)
+        cache = APIWrapper.configure_cache(max_entries=10)
+
+        self.assertIs(FaceDetection().cache, cache)
+        self.assertIs(FaceRecognition().cache, cache)
+        self.assertIsNone(FaceDetection(cache=False).cache)
+
+        APIWrapper.configure_cache(enabled=False)
+        self.assertIsNone(FaceDetection().cache)
+
+    def test_configure_cache_closes_storage(self):
+        """
+        Tests that the storage of the replaced shared cache is closed.
+        """
+        self.addCleanup(APIWrapper.configure_cache, enabled=False)
+        cache = APIWrapper.configure_cache(path=os.path.join(self.folder, "cache.sqlite"))
+
+        APIWrapper.configure_cache(enabled=False)
+
+        with self.assertRaises(sqlite3.ProgrammingError):
+            cache.storage.get("a")
+
+
+if __name__ == '__main__':
+    unittest.main()
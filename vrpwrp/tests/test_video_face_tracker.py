@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from PIL import Image
+from vrpwrp.tests.fakes import FakeFaceDetection, FakeFaceRecognition
+from vrpwrp.wrappers.video_face_tracker import VideoFaceTracker
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class MovingFaceDetection(FakeFaceDetection):
+    """
+    Face detection that finds a face moving 2 pixels to the right per frame, and records the frames of its calls.
+    """
+    def __init__(self):
+        super().__init__()
+        self.frame_number = 0
+        self.calls = []
+
+    def get_boxes(self):
+        self.calls.append(self.frame_number)
+        return [[10 + 2 * self.frame_number, 10, 40, 40], [150, 100, 30, 30]]
+
+
+class TestVideoFaceTracker(unittest.TestCase):
+    """
+    Unit tests for the class VideoFaceTracker
+    """
+
+    def _run(self, tracker, face_detection, frames):
+        results = []
+
+        for frame_number, frame in enumerate(frames):
+            face_detection.frame_number = frame_number
+            results.append(tracker.process_frame(frame))
+
+        return results
+
+    def test_detects_only_keyframes(self):
+        """
+        Tests that faces are detected every keyframe interval, followed in between and embedded once per track.
+        """
+        face_detection = MovingFaceDetection()
+        face_recognition = FakeFaceRecognition()
+        tracker = VideoFaceTracker(face_detection, face_recognition, keyframe_interval=10)
+        frames = [Image.new("RGB", (320, 240), (100, 100, 100))] * 30
+
+        results = self._run(tracker, face_detection, frames)
+
+        self.assertEqual(face_detection.calls, [0, 10, 20])
+        self.assertEqual(face_recognition.calls, 2)
+        self.assertEqual(tracker.get_stats(), {"frames": 30, "detection_calls": 3, "embedding_calls": 1,
+                                               "embeddings": 2, "tracks": 2})
+
+        # The moving face keeps its track and embedding, and is moved between keyframes.
+        self.assertTrue(all([track_id for track_id, _, _ in result] == [0, 1] for result in results))
+        self.assertEqual(len(set(result[0][2] for result in results)), 1)
+        self.assertEqual(results[15][0][1].get_box(), [40, 10, 40, 40])
+        self.assertEqual(results[20][0][1].get_box(), [50, 10, 40, 40])
+
+    def test_scene_change(self):
+        """
+        Tests that the faces are detected again, as new tracks, when the scene changes.
+        """
+        face_detection = MovingFaceDetection()
+        face_recognition = FakeFaceRecognition()
+        tracker = VideoFaceTracker(face_detection, face_recognition, keyframe_interval=100)
+        frames = [Image.new("RGB", (320, 240), (20, 20, 20))] * 5 + [Image.new("RGB", (320, 240), (220, 220, 220))] * 5
+
+        results = self._run(tracker, face_detection, frames)
+
+        self.assertEqual(face_detection.calls, [0, 5])
+        self.assertEqual([track_id for track_id, _, _ in results[9]], [2, 3])
+        self.assertEqual(face_recognition.calls, 4)
+
+    def test_without_embeddings(self):
+        """
+        Tests that the tracker can follow the faces without face recognition.
+        """
+        face_detection = MovingFaceDetection()
+        tracker = VideoFaceTracker(face_detection, compute_embeddings=False, keyframe_interval=5)
+
+        results = self._run(tracker, face_detection, [Image.new("RGB", (320, 240))] * 6)
+
+        self.assertEqual(face_detection.calls, [0, 5])
+        self.assertTrue(all(embedding is None for _, _, embedding in results[5]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import json
+from itertools import chain
+from vrpwrp.helpers import json_helper
+
+# Numpy is required for the BoundingBoxArray.
+try:
+    import numpy as np
+    NUMPY_LOADED = True
+except Exception as ex:
+    NUMPY_LOADED = False
 
 __author__ = 'Iván de Paz Centeno'
 
@@ -226,4 +235,391 @@ class BoundingBox(object):
 
         result = cls(x, y, width, height)
 
-        return result
\ No newline at end of file
+        return result
+
+    @classmethod
+    def from_strings(cls, bounding_box_strings):
+        """
+        Creates many instances of bounding boxes at once. See parse_boxes().
+        :param bounding_box_strings: list of strings of the format "[x, y, width, height]".
+        :return: list of instances of boundingbox, in the same order as the strings.
+        """
+        return [cls(*box) for box in parse_boxes(bounding_box_strings)]
+
+
+class BoundingBoxArray(object):
+    """
+    Collection of bounding boxes backed by a (N, 4) numpy array of [x, y, width, height] rows. It offers the same
+    operations as BoundingBox, computed for all the boxes at once, plus pairwise intersections and IoU matrices.
+    """
+
+    def __init__(self, boxes=None, dtype=None):
+        """
+        Builds a collection of bounding boxes.
+
+        :param boxes: (N, 4) array or list of [x, y, width, height] rows. By default, an empty collection.
+        :param dtype: numpy type of the coordinates. By default the type of the boxes given, or int64 if empty.
+        """
+        if not NUMPY_LOADED:
+            raise Exception("Numpy is required for the BoundingBoxArray.")
+
+        if boxes is None or len(boxes) == 0:
+            boxes = np.empty((0, 4), dtype=np.int64 if dtype is None else dtype)
+
+        self.boxes = np.array(boxes, dtype=dtype).reshape(-1, 4)
+
+    @classmethod
+    def from_bounding_boxes(cls, bounding_boxes, dtype=None):
+        """
+        Creates a collection from a list of BoundingBox objects.
+
+        :param bounding_boxes: list of BoundingBox objects.
+        :param dtype: numpy type of the coordinates. By default int64.
+        :return: BoundingBoxArray object.
+        """
+        return cls([bbox.get_box() for bbox in bounding_boxes], np.int64 if dtype is None else dtype)
+
+    @classmethod
+    def from_strings(cls, bounding_box_strings, dtype=None):
+        """
+        Creates a collection from the string representations of the boxes, as returned by the API. See parse_boxes().
+
+        :param bounding_box_strings: list of strings of the format "[x, y, width, height]".
+        :param dtype: numpy type of the coordinates. By default int64.
+        :return: BoundingBoxArray object.
+        """
+        return cls(parse_boxes(bounding_box_strings), np.int64 if dtype is None else dtype)
+
+    def to_bounding_boxes(self):
+        """
+        :return: list of BoundingBox objects, one per row.
+        """
+        return [BoundingBox(*box) for box in self.boxes.tolist()]
+
+    def get_boxes(self):
+        """
+        :return: the (N, 4) numpy array of [x, y, width, height] rows.
+        """
+        return self.boxes
+
+    def __len__(self):
+        """
+        :return: number of boxes of the collection.
+        """
+        return len(self.boxes)
+
+    def __getitem__(self, index):
+        """
+        :param index: position of a box, or a slice, list of positions or boolean mask to select several.
+        :return: BoundingBox for a single position, BoundingBoxArray otherwise.
+        """
+        if isinstance(index, (int, np.integer)):
+            return BoundingBox(*self.boxes[index].tolist())
+
+        return BoundingBoxArray(self.boxes[index])
+
+    def get_corners(self):
+        """
+        Computes the top-left and bottom-right corners of the boxes.
+        :return: (N, 4) array of [x1, y1, x2, y2] rows.
+        """
+        corners = self.boxes.copy()
+        corners[:, 2:] += corners[:, :2]
+        return corners
+
+    def get_area(self):
+        """
+        Computes the area of the boxes.
+        :return: 1D array with the area of each box.
+        """
+        return self.boxes[:, 2] * self.boxes[:, 3]
+
+    def get_center(self):
+        """
+        Computes the center of the boxes, truncated to integers like in BoundingBox.
+        :return: (N, 2) array of [x, y] centers.
+        """
+        return (self.boxes[:, :2] + self.boxes[:, 2:] / 2).astype(np.int64)
+
+    def expand(self, proportion=0.2):
+        """
+        Expands the area of all the boxes in a given proportion, like BoundingBox.expand().
+
+        WARNING: The boxes may end up out of bounds. Call fit_in_size with the boundings to adapt them.
+        :param proportion:
+        """
+        growth = np.trunc(self.boxes[:, 2:] * proportion / 2).astype(self.boxes.dtype)
+        self.boxes[:, :2] -= growth
+        self.boxes[:, 2:] += growth * 2
+
+    def fit_in_size(self, size_limit):
+        """
+        Adapts the size of the boxes in order to avoid exceeding the bounds specified in size_limit, like
+        BoundingBox.fit_in_size().
+
+        :param size_limit: bound limits. For example [300, 400] for a maximum width of 300 and 400 for maximum height.
+        """
+        for position, size in ((0, 2), (1, 3)):
+            limit = size_limit[position]
+            start = self.boxes[:, position]
+            length = self.boxes[:, size]
+
+            negative = start < 0
+            length[negative] += start[negative]
+            start[negative] = 0
+
+            invalid = start >= limit
+            start[invalid] = 0
+            length[invalid] = 0
+
+            exceeding = start + length >= limit
+            length[exceeding] = limit - start[exceeding]
+
+    def _pairwise_corners(self, other):
+        if other is None:
+            other = self
+
+        corners = self.get_corners()
+        other_corners = other.get_corners()
+
+        first = np.maximum(corners[:, np.newaxis, :2], other_corners[np.newaxis, :, :2])
+        last = np.minimum(corners[:, np.newaxis, 2:], other_corners[np.newaxis, :, 2:])
+
+        return first, last, other
+
+    def get_intersections(self, other=None):
+        """
+        Builds the intersection box of each box of this collection with each box of another one, like
+        BoundingBox.intersect_with().
+
+        :param other: BoundingBoxArray to intersect with. By default, this same collection.
+        :return: (N, M, 4) array of [x, y, width, height] intersection boxes. Boxes that do not intersect get an
+        all-zeros box.
+        """
+        first, last, _ = self._pairwise_corners(other)
+
+        intersections = np.concatenate((first, last - first), axis=2)
+        intersections[np.any(last <= first, axis=2)] = 0
+
+        return intersections
+
+    def get_intersection_areas(self, other=None):
+        """
+        Computes the area of the intersection of each box of this collection with each box of another one.
+
+        :param other: BoundingBoxArray to intersect with. By default, this same collection.
+        :return: (N, M) array of areas.
+        """
+        first, last, _ = self._pairwise_corners(other)
+        sizes = np.maximum(last - first, 0)
+
+        return sizes[:, :, 0] * sizes[:, :, 1]
+
+    def get_iou(self, other=None):
+        """
+        Computes the intersection over union of each box of this collection with each box of another one.
+
+        :param other: BoundingBoxArray to compare with. By default, this same collection.
+        :return: (N, M) float array of values between 0 and 1.
+        """
+        if other is None:
+            other = self
+
+        intersections = self.get_intersection_areas(other).astype(np.float64)
+        unions = self.get_area()[:, np.newaxis] + other.get_area()[np.newaxis, :] - intersections
+
+        return np.divide(intersections, unions, out=np.zeros_like(intersections), where=unions > 0)
+
+    def to_dict(self):
+        """
+        :return: JSON-Compatible representation of the boxes.
+        """
+        return self.boxes.tolist()
+
+    def __str__(self):
+        """
+        :return: string representation of the boxes.
+        """
+        return json.dumps(self.to_dict())
+
+    def __repr__(self):
+        """
+        :return: representation string to display in console directly, rather than "BoundingBoxArray object".
+        """
+        return "BoundingBoxArray: {}".format(self.to_dict())
+
+
+def parse_boxes(bounding_box_strings):
+    """
+    Parses the string representations of many boxes at once. All of them are joined into a single JSON array, which is
+    parsed in one go (by orjson, if available), instead of splitting and converting each element of each box.
+
+    :param bounding_box_strings: list of strings of the format "[x, y, width, height]".
+    :return: list of lists [x, y, width, height], in the same order as the strings. A ValueError is raised if any of
+    them is not made of 4 integers.
+    """
+    try:
+        boxes = json_helper.loads("[" + ",".join(bounding_box_strings) + "]")
+
+        # Every box must be a list of 4 integers, as the API sends them.
+        if len(boxes) == 0 or (len(boxes) == len(bounding_box_strings) and set(map(type, boxes)) == {list} and
+                               set(map(len, boxes)) == {4} and set(map(type, chain.from_iterable(boxes))) == {int}):
+            return boxes
+
+    except ValueError:
+        pass
+
+    # Not valid JSON (like boxes without brackets) or not boxes of 4 integers: parsed one by one.
+    boxes = [[int(element) for element in bbox.replace("[", "").replace("]", "").split(",")]
+             for bbox in bounding_box_strings]
+
+    if any(len(box) != 4 for box in boxes):
+        raise ValueError("The bounding boxes must have 4 elements: x, y, width and height.")
+
+    return boxes
+
+
+def _as_bounding_box_array(boxes):
+    """
+    Converts a list of BoundingBox objects, or an (N, 4) array, into a BoundingBoxArray.
+    """
+    if isinstance(boxes, BoundingBoxArray):
+        return boxes
+
+    if len(boxes) > 0 and isinstance(boxes[0], BoundingBox):
+        return BoundingBoxArray.from_bounding_boxes(boxes)
+
+    return BoundingBoxArray(boxes)
+
+
+def _overlapping_pairs(corners, iou_threshold, chunk_size=256):
+    """
+    Finds the pairs of boxes whose intersection over union is over the threshold. Boxes are swept sorted by their left
+    side, so that each chunk of boxes is only compared with the ones that may reach it horizontally.
+
+    :param corners: (N, 4) float array of [x1, y1, x2, y2] rows.
+    :return: tuple of two 1D arrays (first, second) with the indexes of each overlapping pair, in both orders.
+    """
+    order = np.argsort(corners[:, 0], kind="stable")
+    x1, y1, x2, y2 = corners[order].T
+    areas = (x2 - x1) * (y2 - y1)
+    max_width = np.max(x2 - x1) if len(order) > 0 else 0
+
+    first = []
+    second = []
+
+    for start in range(0, len(order), chunk_size):
+        rows = slice(start, start + chunk_size)
+        low = np.searchsorted(x1, x1[start] - max_width, side="left")
+        high = np.searchsorted(x1, np.max(x2[rows]), side="left")
+        columns = slice(low, high)
+
+        widths = np.minimum.outer(x2[rows], x2[columns]) - np.maximum.outer(x1[rows], x1[columns])
+        heights = np.minimum.outer(y2[rows], y2[columns]) - np.maximum.outer(y1[rows], y1[columns])
+        intersections = np.maximum(widths, 0) * np.maximum(heights, 0)
+        unions = areas[rows, np.newaxis] + areas[np.newaxis, columns] - intersections
+
+        # Same as intersections / unions > iou_threshold, without dividing by empty unions.
+        pair_rows, pair_columns = np.nonzero(intersections > iou_threshold * unions)
+        first.append(order[pair_rows + start])
+        second.append(order[pair_columns + low])
+
+    if len(first) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    return np.concatenate(first), np.concatenate(second)
+
+
+def _clusters(boxes, scores, iou_threshold):
+    """
+    Greedy clustering of the boxes: the box with the highest score takes all the remaining boxes that overlap it over
+    the threshold, and so on.
+
+    :return: tuple (1D array with the index of the box with the highest score of each cluster, 1D array with the
+    cluster of each box).
+    """
+    count = len(boxes)
+    order = np.argsort(-scores, kind="stable")
+    positions = np.empty(count, dtype=np.int64)
+    positions[order] = np.arange(count)
+
+    first, second = _overlapping_pairs(boxes.get_corners().astype(np.float64), iou_threshold)
+    first = positions[first]
+    second = positions[second]
+
+    # Only the boxes after each one in score order can be taken by it.
+    after = second > first
+    first = first[after]
+    second = second[after]
+
+    sorting = np.argsort(first, kind="stable")
+    first = first[sorting]
+    second = second[sorting]
+    bounds = np.searchsorted(first, np.arange(count + 1)).tolist()
+
+    labels = np.full(count, -1, dtype=np.int64)
+    leaders = []
+
+    for position in range(count):
+        if labels[position] >= 0:
+            continue
+
+        labels[position] = len(leaders)
+
+        if bounds[position] != bounds[position + 1]:
+            members = second[bounds[position]:bounds[position + 1]]
+            labels[members[labels[members] < 0]] = len(leaders)
+
+        leaders.append(position)
+
+    return order[np.array(leaders, dtype=np.int64)], labels[positions]
+
+
+def non_maximum_suppression(boxes, scores=None, iou_threshold=0.5):
+    """
+    Removes the duplicated detections of the same object, for example from overlapping segments or several scales.
+    Of each group of boxes that overlap over the threshold, only the one with the highest score is kept.
+
+    :param boxes: list of BoundingBox objects, BoundingBoxArray or (N, 4) array of [x, y, width, height] rows.
+    :param scores: confidence of each box. By default the area of the boxes, so that the biggest box is kept.
+    :param iou_threshold: intersection over union over which two boxes are considered the same object.
+    :return: 1D array with the indexes of the boxes kept, from the highest score to the lowest.
+    """
+    boxes = _as_bounding_box_array(boxes)
+    scores = boxes.get_area() if scores is None else np.asarray(scores)
+
+    leaders, _ = _clusters(boxes, scores, iou_threshold)
+
+    return leaders
+
+
+def merge_boxes(boxes, scores=None, iou_threshold=0.5):
+    """
+    Merges the duplicated detections of the same object into a single box. Each group of boxes that overlap over the
+    threshold is replaced by the average of its corners, weighted by the scores.
+
+    :param boxes: list of BoundingBox objects, BoundingBoxArray or (N, 4) array of [x, y, width, height] rows.
+    :param scores: confidence of each box. By default all the boxes weigh the same.
+    :param iou_threshold: intersection over union over which two boxes are considered the same object.
+    :return: tuple (BoundingBoxArray of the merged boxes, 1D array with the highest score of each group), from the
+    highest score to the lowest. Integer coordinates are rounded.
+    """
+    boxes = _as_bounding_box_array(boxes)
+    scores = np.ones(len(boxes)) if scores is None else np.asarray(scores, dtype=np.float64)
+    corners = boxes.get_corners().astype(np.float64)
+
+    leaders, labels = _clusters(boxes, scores, iou_threshold)
+
+    weights = np.bincount(labels, weights=scores, minlength=len(leaders))
+    merged = corners[leaders]
+
+    for coordinate in range(4):
+        sums = np.bincount(labels, weights=scores * corners[:, coordinate], minlength=len(leaders))
+        np.divide(sums, weights, out=merged[:, coordinate], where=weights > 0)
+
+    merged[:, 2:] -= merged[:, :2]
+
+    if np.issubdtype(boxes.get_boxes().dtype, np.integer):
+        merged = np.round(merged)
+
+    return BoundingBoxArray(merged, boxes.get_boxes().dtype), scores[leaders]
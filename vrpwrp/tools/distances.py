@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Numpy is required for the batched distances.
+try:
+    import numpy as np
+    NUMPY_LOADED = True
+except Exception as ex:
+    NUMPY_LOADED = False
+
+__author__ = 'Iván de Paz Centeno'
+
+# Number of gallery rows processed at once. Caps the temporary memory to chunk_size * dimensions values.
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def stack_embeddings(embeddings, dtype=None):
+    """
+    Stacks embeddings into a contiguous matrix, one embedding per row.
+
+    :param embeddings: list of Embedding objects or numpy vectors, or a 2D numpy array.
+    :param dtype: numpy type of the matrix, for example numpy.float32. By default the type of the embeddings is kept.
+    :return: contiguous 2D numpy array. It is not copied if the given array is already contiguous and of that dtype.
+    """
+    if isinstance(embeddings, np.ndarray):
+        matrix = embeddings
+    elif len(embeddings) == 0:
+        matrix = np.empty((0, 0))
+    else:
+        matrix = np.stack([emb.get_embedding_np() if hasattr(emb, "get_embedding_np") else np.asarray(emb)
+                           for emb in embeddings])
+
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+
+    return np.ascontiguousarray(matrix, dtype=dtype)
+
+
+def _as_vector(embedding, dtype=None):
+    if hasattr(embedding, "get_embedding_np"):
+        embedding = embedding.get_embedding_np()
+
+    return np.asarray(embedding, dtype=dtype).ravel()
+
+
+def embeddings_distances(probe, gallery, dtype=None, chunk_size=None):
+    """
+    Computes the L2 distances between an embedding and every embedding of a gallery in a vectorized way.
+
+    :param probe: Embedding object or numpy vector to compare.
+    :param gallery: list of Embedding objects or 2D numpy array with an embedding per row.
+    :param dtype: numpy type for the computation, for example numpy.float32 to halve the memory and time.
+    :param chunk_size: number of gallery rows processed at once, to cap the memory used.
+    :return: 1D numpy array with the distance to each of the embeddings of the gallery.
+    """
+    if chunk_size is None:
+        chunk_size = DEFAULT_CHUNK_SIZE
+
+    gallery = stack_embeddings(gallery, dtype)
+    probe = _as_vector(probe, gallery.dtype)
+
+    result = np.empty(len(gallery), dtype=gallery.dtype)
+
+    for start in range(0, len(gallery), chunk_size):
+        difference = gallery[start:start + chunk_size] - probe
+        result[start:start + chunk_size] = np.sqrt(np.einsum("ij,ij->i", difference, difference))
+
+    return result
+
+
+def embeddings_distance_matrix(probes, gallery, dtype=None, chunk_size=None):
+    """
+    Computes the L2 distances between each one of the probes and each one of the embeddings of a gallery.
+    Distances are computed as sqrt(|p|^2 + |g|^2 - 2 p.g), so that most of the work is a single matrix product.
+
+    :param probes: list of Embedding objects or 2D numpy array with an embedding per row.
+    :param gallery: list of Embedding objects or 2D numpy array with an embedding per row.
+    :param dtype: numpy type for the computation, for example numpy.float32 to halve the memory and time.
+    :param chunk_size: number of gallery rows processed at once, to cap the memory used.
+    :return: 2D numpy array of shape (number of probes, number of gallery embeddings).
+    """
+    if chunk_size is None:
+        chunk_size = DEFAULT_CHUNK_SIZE
+
+    gallery = stack_embeddings(gallery, dtype)
+    probes = stack_embeddings(probes, gallery.dtype)
+
+    probes_norms = np.einsum("ij,ij->i", probes, probes)[:, np.newaxis]
+    result = np.empty((len(probes), len(gallery)), dtype=gallery.dtype)
+
+    for start in range(0, len(gallery), chunk_size):
+        chunk = gallery[start:start + chunk_size]
+        squared = probes_norms + np.einsum("ij,ij->i", chunk, chunk) - 2 * np.dot(probes, chunk.T)
+        np.maximum(squared, 0, out=squared)
+        result[:, start:start + chunk_size] = np.sqrt(squared)
+
+    return result
@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import array
+import base64
+import struct
+import sys
+import threading
+
 # Numpy can be used to speed up comparison of embeddings.
 try:
     import numpy as np
@@ -10,12 +16,32 @@ except Exception as ex:
 
 __author__ = 'Iván de Paz Centeno'
 
+_default_face_recognition = None
+_default_face_recognition_lock = threading.Lock()
+
+
+def get_default_face_recognition():
+    """
+    Retrieves the face recognition object shared by the embeddings that were not given one. It is only built the first
+    time it is required, which is when a distance is computed without numpy.
+    :return: face recognition object.
+    """
+    global _default_face_recognition
+
+    with _default_face_recognition_lock:
+        if _default_face_recognition is None:
+            from vrpwrp.wrappers.face_recognition import FaceRecognition
+            _default_face_recognition = FaceRecognition()
+
+    return _default_face_recognition
+
 
 class Embedding(object):
     """
     Represents the embeddings for a face.
     It is a set of float numbers that identifies a face.
     """
+    __slots__ = ("np_embedding", "_face_recognition")
 
     def __init__(self, np_embedding, face_recognition=None):
         """
@@ -23,14 +49,14 @@ class Embedding(object):
 
         :param np_embedding: numpy array, list or string representing the numpy array of the embeddings.
         :param face_recognition: face recognition object to use when no numpy library is available. If not specified, it
-        is going to use the default one.
+        is going to use the default one, shared by all the embeddings.
         :return:
         """
         emb_type = type(np_embedding)
 
         if emb_type is str:
             if NUMPY_LOADED:
-                self.np_embedding = np.fromstring(np_embedding.replace("[","").replace("]", ""), sep=" ")
+                self.np_embedding = np.array(np_embedding.replace("[", " ").replace("]", " ").split(), dtype=float)
             else:
                 self.np_embedding = np_embedding
 
@@ -45,11 +71,21 @@ class Embedding(object):
         else:
             raise Exception("The NP-Embeddings must be a numpy array, a list of floats or a string representation.")
 
-        if face_recognition is None:
-            from vrpwrp.wrappers.face_recognition import FaceRecognition
-            face_recognition = FaceRecognition()
+        self._face_recognition = face_recognition
+
+    @property
+    def face_recognition(self):
+        """
+        :return: the face recognition object of this embedding, or the default one if it was not given any.
+        """
+        if self._face_recognition is None:
+            return get_default_face_recognition()
+
+        return self._face_recognition
 
-        self.face_recognition = face_recognition
+    @face_recognition.setter
+    def face_recognition(self, face_recognition):
+        self._face_recognition = face_recognition
 
     @classmethod
     def from_dict(cls, dict_rep, face_recognition=None):
@@ -60,6 +96,129 @@ class Embedding(object):
         """
         return cls(dict_rep['embedding'], face_recognition)
 
+    @classmethod
+    def from_strings(cls, embeddings_strings, face_recognition=None):
+        """
+        Builds many embeddings of the same size from their string representations at once. With numpy, all the
+        strings are converted in a single pass into a contiguous matrix, whose rows back the embeddings.
+        :param embeddings_strings: list of string representations of the embeddings, as returned by the API.
+        :param face_recognition: face recognition object to use when no numpy library is available.
+        :return: list of embedding objects, in the same order as the strings.
+        """
+        count = len(embeddings_strings)
+
+        if NUMPY_LOADED and count > 0 and all(type(string) is str for string in embeddings_strings):
+            # A NaN between the strings marks where each one ends, so that strings of different sizes are detected
+            # without splitting them one by one. Those are parsed one by one, instead of being reshaped into wrong
+            # vectors.
+            text = " nan ".join(embeddings_strings).replace("[", " ").replace("]", " ")
+
+            try:
+                values = np.fromstring(text, sep=" ")
+            except ValueError:
+                values = None
+
+            if values is not None and (values.size + 1) % count == 0:
+                dimensions = (values.size + 1) // count - 1
+                rows = np.append(values, np.nan).reshape(count, dimensions + 1)
+
+                if np.isnan(rows[:, dimensions]).all() and np.isnan(rows).sum() == count:
+                    return [cls(row, face_recognition) for row in np.ascontiguousarray(rows[:, :dimensions])]
+
+        return [cls(string, face_recognition) for string in embeddings_strings]
+
+    @classmethod
+    def from_bytes(cls, embedding_bytes, face_recognition=None):
+        """
+        Builds the embedding from its binary representation.
+        :param embedding_bytes: bytes of the embedding as little-endian float32 values, as given by to_bytes().
+        :param face_recognition: face recognition object to use when no numpy library is available.
+        :return: embedding object.
+        """
+        if NUMPY_LOADED:
+            values = np.frombuffer(embedding_bytes, dtype="<f4")
+        else:
+            values = array.array("f", embedding_bytes)
+
+            if sys.byteorder != "little":
+                values.byteswap()
+
+            values = values.tolist()
+
+        return cls(values, face_recognition)
+
+    def to_bytes(self):
+        """
+        Crafts a binary representation of this embedding, much more compact and faster to parse than the string one.
+        :return: bytes of the embedding as little-endian float32 values.
+        """
+        if NUMPY_LOADED and type(self.np_embedding) is np.ndarray:
+            return np.asarray(self.np_embedding, dtype="<f4").tobytes()
+
+        values = array.array("f", [float(value) for value in str(self.np_embedding).strip("[] ").split()])
+
+        if sys.byteorder != "little":
+            values.byteswap()
+
+        return values.tobytes()
+
+    @classmethod
+    def from_base64(cls, embedding_base64, face_recognition=None):
+        """
+        Builds the embedding from its base64 representation.
+        :param embedding_base64: base64 string of the embedding, as given by to_base64().
+        :param face_recognition: face recognition object to use when no numpy library is available.
+        :return: embedding object.
+        """
+        return cls.from_bytes(base64.b64decode(embedding_base64), face_recognition)
+
+    def to_base64(self):
+        """
+        Crafts a base64 representation of this embedding, suitable for text fields.
+        :return: base64 string of the binary representation of the embedding.
+        """
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @staticmethod
+    def pack_many(embeddings):
+        """
+        Packs several embeddings of the same size into a single contiguous buffer.
+        :param embeddings: list of embedding objects.
+        :return: bytes with a header (number of embeddings and dimensions, as little-endian uint32) followed by the
+        embeddings as little-endian float32 values, one after another.
+        """
+        if NUMPY_LOADED and all(type(emb.np_embedding) is np.ndarray for emb in embeddings):
+            if len(embeddings) > 0:
+                matrix = np.stack([emb.np_embedding for emb in embeddings]).astype("<f4")
+            else:
+                matrix = np.empty((0, 0), dtype="<f4")
+
+            return struct.pack("<II", *matrix.shape) + matrix.tobytes()
+
+        embeddings_bytes = [emb.to_bytes() for emb in embeddings]
+        dimensions = len(embeddings_bytes[0]) // 4 if embeddings_bytes else 0
+
+        return struct.pack("<II", len(embeddings_bytes), dimensions) + b"".join(embeddings_bytes)
+
+    @classmethod
+    def unpack_many(cls, buffer, face_recognition=None):
+        """
+        Unpacks the embeddings packed with pack_many(). With numpy, each embedding is a view on the buffer.
+        :param buffer: bytes-like object with the packed embeddings.
+        :param face_recognition: face recognition object to use when no numpy library is available.
+        :return: list of embedding objects.
+        """
+        count, dimensions = struct.unpack_from("<II", buffer)
+        header_size = struct.calcsize("<II")
+
+        if NUMPY_LOADED:
+            matrix = np.frombuffer(buffer, dtype="<f4", count=count * dimensions, offset=header_size)
+            return [cls(row, face_recognition) for row in matrix.reshape(count, dimensions)]
+
+        row_size = dimensions * 4
+        return [cls.from_bytes(bytes(buffer[header_size + i * row_size:header_size + (i + 1) * row_size]),
+                               face_recognition) for i in range(count)]
+
     def __sub__(self, other):
         """
         Subtracts other embedding to this embedding.
@@ -86,7 +245,14 @@ class Embedding(object):
         Crafts a dictionary representation of this embedding.
         :return: dict representation of the embedding.
         """
-        return {"embedding": str(self.np_embedding)}
+        if NUMPY_LOADED and type(self.np_embedding) is np.ndarray:
+            # Full precision and no summarization, so that it can be parsed back without loss.
+            embedding = np.array2string(self.np_embedding, threshold=sys.maxsize, max_line_width=sys.maxsize,
+                                        floatmode="unique")
+        else:
+            embedding = str(self.np_embedding)
+
+        return {"embedding": embedding}
 
     def __str__(self):
         """
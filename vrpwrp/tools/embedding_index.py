@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Numpy is required for the index.
+try:
+    import numpy as np
+    NUMPY_LOADED = True
+except Exception as ex:
+    NUMPY_LOADED = False
+
+from vrpwrp.tools.distances import stack_embeddings
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class EmbeddingIndex(object):
+    """
+    In-memory index of labeled embeddings, to find the nearest faces of a given one.
+
+    Embeddings are kept in a contiguous matrix, together with their squared norms, so that the distances to all of
+    them are computed with a single matrix-vector product. Several embeddings may share the same label.
+    """
+
+    def __init__(self, dtype=None, initial_capacity=1024):
+        """
+        Initializer of the index.
+
+        :param dtype: numpy type of the stored embeddings. By default numpy.float32.
+        :param initial_capacity: number of embeddings that fit before growing the storage.
+        """
+        if not NUMPY_LOADED:
+            raise Exception("Numpy is required for the EmbeddingIndex.")
+
+        if dtype is None:
+            dtype = np.float32
+
+        self.dtype = dtype
+        self.initial_capacity = initial_capacity
+        self._matrix = None
+        self._norms = None
+        self._labels = []
+        self._rows_by_label = {}
+
+    def __len__(self):
+        """
+        :return: number of embeddings in the index.
+        """
+        return len(self._labels)
+
+    def get_labels(self):
+        """
+        :return: list of the labels of the embeddings, in the order of the rows of the matrix.
+        """
+        return list(self._labels)
+
+    def get_matrix(self):
+        """
+        :return: view of the matrix of embeddings, one per row.
+        """
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=self.dtype)
+
+        return self._matrix[:len(self)]
+
+    def _reserve(self, count, dimensions):
+        """
+        Ensures that count more embeddings fit in the storage, doubling its capacity when needed.
+        """
+        if self._matrix is None:
+            capacity = max(self.initial_capacity, count)
+            self._matrix = np.empty((capacity, dimensions), dtype=self.dtype)
+            self._norms = np.empty(capacity, dtype=self.dtype)
+
+        elif dimensions != self._matrix.shape[1]:
+            raise Exception("The embeddings must have {} dimensions, not {}.".format(self._matrix.shape[1],
+                                                                                    dimensions))
+
+        required = len(self) + count
+
+        if required > len(self._matrix):
+            capacity = max(required, len(self._matrix) * 2)
+
+            matrix = np.empty((capacity, dimensions), dtype=self.dtype)
+            matrix[:len(self)] = self._matrix[:len(self)]
+
+            norms = np.empty(capacity, dtype=self.dtype)
+            norms[:len(self)] = self._norms[:len(self)]
+
+            self._matrix = matrix
+            self._norms = norms
+
+    def add(self, embedding, label):
+        """
+        Adds an embedding to the index.
+
+        :param embedding: Embedding object or numpy vector.
+        :param label: label of the embedding, for example the identity of the face.
+        """
+        self.add_many([embedding], [label])
+
+    def add_many(self, embeddings, labels):
+        """
+        Adds several embeddings to the index at once.
+
+        :param embeddings: list of Embedding objects or 2D numpy array with an embedding per row.
+        :param labels: list of labels, one per embedding.
+        """
+        matrix = stack_embeddings(embeddings, self.dtype)
+
+        if len(matrix) != len(labels):
+            raise Exception("There must be a label for each embedding.")
+
+        if len(matrix) == 0:
+            return
+
+        self._reserve(len(matrix), matrix.shape[1])
+
+        start = len(self)
+        self._matrix[start:start + len(matrix)] = matrix
+        self._norms[start:start + len(matrix)] = np.einsum("ij,ij->i", matrix, matrix)
+
+        for row, label in enumerate(labels, start):
+            self._labels.append(label)
+            self._rows_by_label.setdefault(label, []).append(row)
+
+    def remove(self, label):
+        """
+        Removes all the embeddings of a label. Each removed row is filled with the last one of the matrix.
+
+        :param label: label of the embeddings to remove.
+        :return: number of embeddings removed.
+        """
+        rows = self._rows_by_label.pop(label, [])
+
+        for row in sorted(rows, reverse=True):
+            last = len(self) - 1
+
+            if row != last:
+                self._move_row(last, row)
+
+            self._labels.pop()
+
+        return len(rows)
+
+    def _move_row(self, source, destination):
+        """
+        Moves an embedding of the index from a row of the matrix to another one.
+        """
+        label = self._labels[source]
+        self._matrix[destination] = self._matrix[source]
+        self._norms[destination] = self._norms[source]
+        self._labels[destination] = label
+
+        label_rows = self._rows_by_label[label]
+        label_rows[label_rows.index(source)] = destination
+
+    def _as_probe(self, embedding):
+        """
+        Converts an embedding into a numpy vector of the type of the index.
+        """
+        if hasattr(embedding, "get_embedding_np"):
+            embedding = embedding.get_embedding_np()
+
+        return np.asarray(embedding, dtype=self.dtype).ravel()
+
+    def _squared_distances(self, probe, rows=None):
+        """
+        Computes the squared distances from a probe vector to the embeddings of the given rows, or to all of them.
+        """
+        if rows is None:
+            matrix = self._matrix[:len(self)]
+            norms = self._norms[:len(self)]
+        else:
+            matrix = self._matrix[rows]
+            norms = self._norms[rows]
+
+        squared = norms - 2 * matrix.dot(probe) + probe.dot(probe)
+        np.maximum(squared, 0, out=squared)
+
+        return squared
+
+    def _results(self, squared, selected, rows=None):
+        """
+        Builds the list of (label, distance) of the selected positions of the squared distances.
+        """
+        if rows is not None:
+            return [(self._labels[rows[position]], float(np.sqrt(squared[position]))) for position in selected]
+
+        return [(self._labels[position], float(np.sqrt(squared[position]))) for position in selected]
+
+    def _search_k(self, probe, k, rows=None):
+        """
+        Finds the k nearest embeddings of a probe vector among the given rows, or among all of them.
+        """
+        if len(self) == 0 or k < 1 or (rows is not None and len(rows) == 0):
+            return []
+
+        squared = self._squared_distances(probe, rows)
+        k = min(k, len(squared))
+
+        selected = np.argpartition(squared, k - 1)[:k]
+        selected = selected[np.argsort(squared[selected])]
+
+        return self._results(squared, selected, rows)
+
+    def _search_radius(self, probe, threshold, rows=None):
+        """
+        Finds the embeddings within a distance of a probe vector among the given rows, or among all of them.
+        """
+        if len(self) == 0 or (rows is not None and len(rows) == 0):
+            return []
+
+        squared = self._squared_distances(probe, rows)
+
+        selected = np.flatnonzero(squared <= threshold * threshold)
+        selected = selected[np.argsort(squared[selected])]
+
+        return self._results(squared, selected, rows)
+
+    def search(self, embedding, k=1):
+        """
+        Finds the k nearest embeddings of the index.
+
+        :param embedding: Embedding object or numpy vector to look for.
+        :param k: number of neighbours to retrieve.
+        :return: list of tuples (label, distance), from the nearest to the farthest.
+        """
+        return self._search_k(self._as_probe(embedding), k)
+
+    def search_radius(self, embedding, threshold=1.0):
+        """
+        Finds all the embeddings of the index within a distance.
+
+        :param embedding: Embedding object or numpy vector to look for.
+        :param threshold: maximum distance. By default 1.0, over which faces are likely to be from different persons.
+        :return: list of tuples (label, distance), from the nearest to the farthest.
+        """
+        return self._search_radius(self._as_probe(embedding), threshold)
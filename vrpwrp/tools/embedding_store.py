@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+
+# Numpy is required for the store.
+try:
+    import numpy as np
+    NUMPY_LOADED = True
+except Exception as ex:
+    NUMPY_LOADED = False
+
+from vrpwrp.tools.distances import stack_embeddings, embeddings_distances
+from vrpwrp.tools.embedding import Embedding
+
+__author__ = 'Iván de Paz Centeno'
+
+MAGIC = b"VRPWRPEM"
+VERSION = 1
+HEADER_FORMAT = "<8sII"
+HEADER_SIZE = 64
+
+
+class EmbeddingStore(object):
+    """
+    Persistent store of embeddings, backed by a binary file of float32 vectors that is memory-mapped for reading.
+
+    The vectors are kept in the file at the given path, after a fixed header, and their ids in a sidecar text file
+    (path + ".ids"), one per line. Lookups and distance scans work directly on the mapped pages, so several processes
+    can share the same store without loading it into RAM or parsing it.
+    """
+
+    def __init__(self, path, dimensions=None, mode="r"):
+        """
+        Opens an embedding store.
+
+        :param path: path to the vectors file.
+        :param dimensions: number of dimensions of the embeddings. Only required to create a new store.
+        :param mode: "r" to open an existing store read-only, "a" to append to it (creating it if needed).
+        """
+        if not NUMPY_LOADED:
+            raise Exception("Numpy is required for the EmbeddingStore.")
+
+        if mode not in ("r", "a"):
+            raise Exception("The mode of the store must be either 'r' or 'a'.")
+
+        self.path = path
+        self.ids_path = path + ".ids"
+        self.mode = mode
+
+        if not os.path.exists(path):
+            if mode == "r":
+                raise IOError("The embedding store {} does not exist.".format(path))
+
+            if dimensions is None:
+                raise Exception("The dimensions are required to create a new embedding store.")
+
+            with open(path, "wb") as f:
+                f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, dimensions).ljust(HEADER_SIZE, b"\0"))
+
+            open(self.ids_path, "w").close()
+
+        with open(path, "rb") as f:
+            magic, version, stored_dimensions = struct.unpack(HEADER_FORMAT,
+                                                              f.read(struct.calcsize(HEADER_FORMAT)))
+
+        if magic != MAGIC:
+            raise Exception("{} is not an embedding store.".format(path))
+
+        if dimensions is not None and dimensions != stored_dimensions:
+            raise Exception("The embedding store has {} dimensions, not {}.".format(stored_dimensions, dimensions))
+
+        self.dimensions = stored_dimensions
+        self._vectors = None
+        self._ids = None
+        self._rows_by_id = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Maps again the files of the store, to see the embeddings appended since it was opened (for example, by
+        another process). An interrupted append may leave a vector without id or the other way around: only the
+        embeddings with both are seen, and a writable store truncates the files to them.
+        """
+        row_size = self.dimensions * 4
+        count = (os.path.getsize(self.path) - HEADER_SIZE) // row_size
+
+        with open(self.ids_path, "rb") as f:
+            lines = f.read().split(b"\n")
+
+        # The last element is either empty or an id whose line break was never written.
+        ids = [line.decode("UTF-8").rstrip("\r") for line in lines[:-1]]
+        count = min(count, len(ids))
+
+        self._ids = ids[:count]
+        self._ids_size = sum(len(line) + 1 for line in lines[:count])
+        self._rows_by_id = None
+
+        if self.mode == "a":
+            self._truncate()
+
+        self._map_vectors()
+
+    def _truncate(self):
+        """
+        Truncates the files of the store to the embeddings that have both a vector and an id.
+        """
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER_SIZE + len(self._ids) * self.dimensions * 4)
+
+        with open(self.ids_path, "r+b") as f:
+            f.truncate(self._ids_size)
+
+    def _map_vectors(self):
+        """
+        Maps the vectors file for the current number of ids.
+        """
+        if len(self._ids) > 0:
+            self._vectors = np.memmap(self.path, dtype="<f4", mode="r", offset=HEADER_SIZE,
+                                      shape=(len(self._ids), self.dimensions))
+        else:
+            self._vectors = np.empty((0, self.dimensions), dtype="<f4")
+
+    def __len__(self):
+        """
+        :return: number of embeddings in the store.
+        """
+        return len(self._ids)
+
+    def append(self, embedding, embedding_id):
+        """
+        Appends an embedding to the store.
+
+        :param embedding: Embedding object or numpy vector.
+        :param embedding_id: id of the embedding. It is stored as a string, and must not contain line breaks.
+        """
+        self.append_many([embedding], [embedding_id])
+
+    def append_many(self, embeddings, embeddings_ids):
+        """
+        Appends several embeddings to the store at once.
+
+        :param embeddings: list of Embedding objects or 2D numpy array with an embedding per row.
+        :param embeddings_ids: list of ids, one per embedding. They are stored as strings, and must not contain line
+        breaks.
+        """
+        if self.mode != "a":
+            raise Exception("The embedding store is opened read-only.")
+
+        matrix = stack_embeddings(embeddings, "<f4")
+        embeddings_ids = [str(embedding_id) for embedding_id in embeddings_ids]
+
+        if len(matrix) != len(embeddings_ids):
+            raise Exception("There must be an id for each embedding.")
+
+        if len(matrix) == 0:
+            return
+
+        if matrix.shape[1] != self.dimensions:
+            raise Exception("The embeddings must have {} dimensions, not {}.".format(self.dimensions,
+                                                                                    matrix.shape[1]))
+
+        if any("\n" in embedding_id or "\r" in embedding_id for embedding_id in embeddings_ids):
+            raise Exception("The ids of the embeddings must not contain line breaks.")
+
+        ids_bytes = "".join(embedding_id + "\n" for embedding_id in embeddings_ids).encode("UTF-8")
+
+        # Written right after the last complete embedding, over anything left by an interrupted append.
+        with open(self.path, "r+b") as f:
+            f.seek(HEADER_SIZE + len(self._ids) * self.dimensions * 4)
+            f.write(matrix.tobytes())
+            f.truncate()
+
+        with open(self.ids_path, "r+b") as f:
+            f.seek(self._ids_size)
+            f.write(ids_bytes)
+            f.truncate()
+
+        self._ids_size += len(ids_bytes)
+
+        if self._rows_by_id is not None:
+            self._rows_by_id.update((embedding_id, row) for row, embedding_id in enumerate(embeddings_ids, len(self)))
+
+        self._ids.extend(embeddings_ids)
+        self._map_vectors()
+
+    def get_vectors(self):
+        """
+        :return: memory-mapped 2D float32 array with an embedding per row.
+        """
+        return self._vectors
+
+    def get_ids(self):
+        """
+        :return: list of the ids of the embeddings, in the order of the rows.
+        """
+        return list(self._ids)
+
+    def get(self, embedding_id):
+        """
+        Looks up an embedding by its id. If the id is repeated, the last embedding appended is returned.
+
+        :param embedding_id: id of the embedding.
+        :return: Embedding object, whose vector is read from the mapped file.
+        """
+        if self._rows_by_id is None:
+            self._rows_by_id = {stored_id: row for row, stored_id in enumerate(self._ids)}
+
+        return Embedding(np.asarray(self._vectors[self._rows_by_id[str(embedding_id)]]))
+
+    def distances(self, embedding, chunk_size=None):
+        """
+        Computes the distances from an embedding to all the embeddings of the store, scanning the mapped file chunk
+        by chunk.
+
+        :param embedding: Embedding object or numpy vector.
+        :param chunk_size: number of rows read at once.
+        :return: 1D numpy array with the distance to each embedding of the store.
+        """
+        return embeddings_distances(embedding, self._vectors, chunk_size=chunk_size)
+
+    def search(self, embedding, k=1, chunk_size=None):
+        """
+        Finds the k nearest embeddings of the store.
+
+        :param embedding: Embedding object or numpy vector to look for.
+        :param k: number of neighbours to retrieve.
+        :param chunk_size: number of rows read at once.
+        :return: list of tuples (id, distance), from the nearest to the farthest.
+        """
+        if len(self) == 0:
+            return []
+
+        distances = self.distances(embedding, chunk_size)
+        k = min(k, len(distances))
+
+        rows = np.argpartition(distances, k - 1)[:k]
+        rows = rows[np.argsort(distances[rows])]
+
+        return [(self._ids[row], float(distances[row])) for row in rows]
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+
+# Numpy is required for the index.
+try:
+    import numpy as np
+    NUMPY_LOADED = True
+except Exception as ex:
+    NUMPY_LOADED = False
+
+from vrpwrp.tools.distances import stack_embeddings
+from vrpwrp.tools.embedding_index import EmbeddingIndex
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class IVFEmbeddingIndex(EmbeddingIndex):
+    """
+    Approximate version of the EmbeddingIndex, for galleries too big for an exhaustive search.
+
+    The embeddings are partitioned with k-means into n_lists inverted lists. A search only computes the distances to
+    the embeddings of the n_probe lists whose centroids are nearest to the probe. Increasing n_probe increases the
+    recall at the cost of speed; n_probe equal to n_lists is an exact search.
+
+    Until train() is called, the index behaves as an exact EmbeddingIndex.
+    """
+
+    def __init__(self, n_lists=256, n_probe=8, dtype=None, initial_capacity=1024):
+        """
+        Initializer of the index.
+
+        :param n_lists: number of partitions of the embeddings. A good value is around sqrt(number of embeddings).
+        :param n_probe: default number of partitions visited by each search.
+        :param dtype: numpy type of the stored embeddings. By default numpy.float32.
+        :param initial_capacity: number of embeddings that fit before growing the storage.
+        """
+        if n_probe < 1:
+            raise ValueError("The index must visit at least 1 partition per search, not {}.".format(n_probe))
+
+        super().__init__(dtype, initial_capacity)
+
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self._centroids = None
+        self._assignments = None
+        self._inverted_lists = None
+
+    def is_trained(self):
+        """
+        :return: True if the partitions of the index are built.
+        """
+        return self._centroids is not None
+
+    def _nearest_centroids(self, matrix, centroids=None, chunk_size=16384):
+        """
+        Computes the index of the nearest centroid for each row of a matrix.
+        """
+        if centroids is None:
+            centroids = self._centroids
+
+        centroids_norms = np.einsum("ij,ij->i", centroids, centroids)
+        result = np.empty(len(matrix), dtype=np.int64)
+
+        for start in range(0, len(matrix), chunk_size):
+            scores = centroids_norms - 2 * np.dot(matrix[start:start + chunk_size], centroids.T)
+            result[start:start + chunk_size] = np.argmin(scores, axis=1)
+
+        return result
+
+    def train(self, sample=None, iterations=10, max_sample_size=None, random_seed=0):
+        """
+        Builds the partitions of the index with k-means and assigns every embedding of the index to one of them.
+        Embeddings added afterwards are assigned on insertion.
+
+        :param sample: embeddings to train with. By default, the embeddings of the index.
+        :param iterations: number of k-means iterations.
+        :param max_sample_size: maximum number of embeddings used to train. By default, 256 per partition.
+        :param random_seed: seed for the initialization of the centroids.
+        """
+        if sample is None:
+            sample = self.get_matrix()
+        else:
+            sample = stack_embeddings(sample, self.dtype)
+
+        if max_sample_size is None:
+            max_sample_size = self.n_lists * 256
+
+        if len(sample) < self.n_lists:
+            raise Exception("At least {} embeddings are required to train the index.".format(self.n_lists))
+
+        random = np.random.RandomState(random_seed)
+
+        if len(sample) > max_sample_size:
+            sample = sample[random.choice(len(sample), max_sample_size, replace=False)]
+
+        centroids = sample[random.choice(len(sample), self.n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = self._nearest_centroids(sample, centroids)
+
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            non_empty = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[non_empty]
+
+            centroids[non_empty] = np.add.reduceat(sample[order], starts, axis=0) / counts[non_empty, np.newaxis]
+
+            empty = np.flatnonzero(counts == 0)
+            centroids[empty] = sample[random.choice(len(sample), len(empty), replace=False)]
+
+        self._centroids = centroids
+
+        if self._matrix is not None:
+            self._assignments = np.zeros(len(self._matrix), dtype=np.int64)
+            self._assignments[:len(self)] = self._nearest_centroids(self.get_matrix())
+
+        self._inverted_lists = None
+
+    def _reserve(self, count, dimensions):
+        super()._reserve(count, dimensions)
+
+        if self.is_trained():
+            if self._assignments is None:
+                self._assignments = np.zeros(len(self._matrix), dtype=np.int64)
+
+            elif len(self._assignments) < len(self._matrix):
+                assignments = np.zeros(len(self._matrix), dtype=np.int64)
+                assignments[:len(self)] = self._assignments[:len(self)]
+                self._assignments = assignments
+
+    def add_many(self, embeddings, labels):
+        start = len(self)
+        super().add_many(embeddings, labels)
+
+        if self.is_trained() and len(self) > start:
+            self._assignments[start:len(self)] = self._nearest_centroids(self._matrix[start:len(self)])
+            self._inverted_lists = None
+
+    def remove(self, label):
+        count = super().remove(label)
+
+        if count > 0:
+            self._inverted_lists = None
+
+        return count
+
+    def _move_row(self, source, destination):
+        super()._move_row(source, destination)
+
+        if self.is_trained():
+            self._assignments[destination] = self._assignments[source]
+
+    def _get_inverted_lists(self):
+        """
+        Retrieves the rows of the index sorted by partition, together with the position where each partition starts.
+        It is rebuilt lazily after the index is modified.
+        """
+        if self._inverted_lists is None:
+            assignments = self._assignments[:len(self)]
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(self.n_lists + 1))
+            self._inverted_lists = (order, bounds)
+
+        return self._inverted_lists
+
+    def _candidate_rows(self, probe, n_probe=None):
+        """
+        Retrieves the rows of the partitions nearest to the probe, or None to visit all of them.
+        """
+        if n_probe is None:
+            n_probe = self.n_probe
+
+        if n_probe < 1:
+            raise ValueError("A search must visit at least 1 partition, not {}.".format(n_probe))
+
+        if not self.is_trained() or n_probe >= self.n_lists:
+            return None
+
+        centroids_scores = np.einsum("ij,ij->i", self._centroids, self._centroids) - 2 * self._centroids.dot(probe)
+        lists = np.argpartition(centroids_scores, n_probe - 1)[:n_probe]
+
+        order, bounds = self._get_inverted_lists()
+
+        return np.concatenate([order[bounds[partition]:bounds[partition + 1]] for partition in lists])
+
+    def search(self, embedding, k=1, n_probe=None):
+        """
+        Finds the approximate k nearest embeddings of the index.
+
+        :param embedding: Embedding object or numpy vector to look for.
+        :param k: number of neighbours to retrieve.
+        :param n_probe: number of partitions to visit. By default, the n_probe of the index.
+        :return: list of tuples (label, distance), from the nearest to the farthest.
+        """
+        probe = self._as_probe(embedding)
+        return self._search_k(probe, k, self._candidate_rows(probe, n_probe))
+
+    def search_radius(self, embedding, threshold=1.0, n_probe=None):
+        """
+        Finds the embeddings of the index within a distance, among the visited partitions.
+
+        :param embedding: Embedding object or numpy vector to look for.
+        :param threshold: maximum distance. By default 1.0, over which faces are likely to be from different persons.
+        :param n_probe: number of partitions to visit. By default, the n_probe of the index.
+        :return: list of tuples (label, distance), from the nearest to the farthest.
+        """
+        probe = self._as_probe(embedding)
+        return self._search_radius(probe, threshold, self._candidate_rows(probe, n_probe))
+
+
+def benchmark(index, queries, k=10, n_probe=None):
+    """
+    Measures the recall@k of the approximate search of an index against the exact search, and the time of both.
+
+    :param index: trained IVFEmbeddingIndex. Labels are expected to be unique.
+    :param queries: list of Embedding objects or 2D numpy array with an embedding per row.
+    :param k: number of neighbours retrieved by each search.
+    :param n_probe: number of partitions to visit. By default, the n_probe of the index.
+    :return: dictionary with the "recall" (fraction of the exact k nearest found by the approximate search) and the
+    mean "exact_time" and "approximate_time" per query, in seconds.
+    """
+    queries = stack_embeddings(queries, index.dtype)
+
+    start = time.perf_counter()
+    exact_results = [EmbeddingIndex.search(index, query, k) for query in queries]
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    approximate_results = [index.search(query, k, n_probe) for query in queries]
+    approximate_time = time.perf_counter() - start
+
+    found = 0
+    expected = 0
+
+    for exact, approximate in zip(exact_results, approximate_results):
+        exact_labels = set(label for label, _ in exact)
+        found += len(exact_labels.intersection(label for label, _ in approximate))
+        expected += len(exact_labels)
+
+    return {
+        "recall": found / max(expected, 1),
+        "exact_time": exact_time / max(len(queries), 1),
+        "approximate_time": approximate_time / max(len(queries), 1),
+    }
@@ -1,27 +1,309 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from vrpwrp.config import config
+from vrpwrp.helpers.result_cache import ResultCache, SqliteCacheStorage, get_cache_key
+from vrpwrp.helpers.single_flight import SingleFlight
+from vrpwrp.wrappers.backends import HTTPBackend
 
 __author__ = 'Iván de Paz Centeno'
 
 
+def build_session(pool_connections=None, pool_maxsize=None, max_retries=None, backoff_factor=None, keep_alive=None,
+                  pool_block=None):
+    """
+    Builds a requests session backed by a pool of keep-alive connections. Every parameter not specified is taken from
+    the config module.
+
+    :param pool_connections: number of different hosts to keep a pool for.
+    :param pool_maxsize: maximum number of connections kept alive per host. Should match the number of workers.
+    :param max_retries: number of retries for failed connections and 502/503/504 responses.
+    :param backoff_factor: factor for the exponential sleep between retries.
+    :param keep_alive: True to reuse the connections between requests, False to close them after each one.
+    :param pool_block: True to block when the pool of a host is exhausted instead of opening extra connections.
+    :return: requests session object.
+    """
+    if pool_connections is None:
+        pool_connections = config.POOL_CONNECTIONS
+
+    if pool_maxsize is None:
+        pool_maxsize = config.POOL_MAXSIZE
+
+    if max_retries is None:
+        max_retries = config.MAX_RETRIES
+
+    if backoff_factor is None:
+        backoff_factor = config.BACKOFF_FACTOR
+
+    if keep_alive is None:
+        keep_alive = config.KEEP_ALIVE
+
+    if pool_block is None:
+        pool_block = config.POOL_BLOCK
+
+    retries = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                    raise_on_status=False)
+
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries,
+                          pool_block=pool_block)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    return session
+
+
+def build_cache(max_entries=None, ttl=None, path=None):
+    """
+    Builds a cache of results. Every parameter not specified is taken from the config module.
+
+    :param max_entries: maximum number of results kept in memory.
+    :param ttl: seconds a result is valid for. None to keep them until evicted.
+    :param path: path to a sqlite database to persist the results on disk. None to keep them only in memory.
+    :return: ResultCache object.
+    """
+    if max_entries is None:
+        max_entries = config.RESULT_CACHE_MAX_ENTRIES
+
+    if ttl is None:
+        ttl = config.RESULT_CACHE_TTL
+
+    if path is None:
+        path = config.RESULT_CACHE_PATH
+
+    storage = None if path is None else SqliteCacheStorage(path)
+
+    return ResultCache(max_entries, ttl, storage)
+
+
 class APIWrapper(object):
+    """
+    Base class for the API-REST wrappers. Unless a session is specified, all the wrappers share the same pool of
+    keep-alive connections, which can be tuned with configure_pool().
+
+    Results of requests that upload content (images) can be cached by a hash of the content and the endpoint, so that
+    repeated content is served without any network cost. The cache shared by all the wrappers is enabled in the
+    config or with configure_cache().
+
+    Concurrent identical requests (same method, URL and payload) are coalesced: only one of them is sent, and all of
+    them receive its result.
+
+    Requests are answered by a backend: the REST API over HTTP by default, or an in-process one (a local model or a
+    FakeBackend) given to a wrapper or set for all of them with configure_backend().
+    """
+    _shared_session = None
+    _shared_session_lock = threading.Lock()
+    _shared_cache = None
+    _shared_cache_configured = False
+    _shared_backend = None
+    _in_flight = SingleFlight()
+
+    def __init__(self, API_URL, session=None, timeout=None, cache=None, coalesce=None, backend=None):
+        """
+        Initializer of the API wrapper.
+
+        :param API_URL: URL of the API endpoint.
+        :param session: requests session to use. By default it is going to use the shared connection pool.
+        :param timeout: (connect, read) timeouts of the requests, in seconds. By default it is taken from config.
+        :param cache: ResultCache to use. By default it is going to use the shared one, if enabled. False to disable
+        the cache for this wrapper.
+        :param coalesce: True to share a single request among concurrent identical ones. By default it is taken from
+        config.
+        :param backend: Backend that answers the requests. By default it is going to use the shared one if configured,
+        or the HTTP API otherwise. Wrappers with a local backend do not use the shared cache.
+        """
+        if timeout is None:
+            timeout = config.REQUEST_TIMEOUT
+
+        if coalesce is None:
+            coalesce = config.COALESCE_REQUESTS
 
-    def __init__(self, API_URL):
         self.API_URL = API_URL
+        self.timeout = timeout
+        self.coalesce = coalesce
+        self._session = session
+        self._cache = cache
+        self._backend = backend
+        self._http_backend = HTTPBackend(session)
+
+    @classmethod
+    def get_shared_session(cls):
+        """
+        Retrieves the session shared by all the wrappers, building it the first time.
+        :return: requests session object.
+        """
+        with APIWrapper._shared_session_lock:
+            if APIWrapper._shared_session is None:
+                APIWrapper._shared_session = build_session()
+
+            session = APIWrapper._shared_session
+
+        return session
+
+    @classmethod
+    def configure_pool(cls, **kwargs):
+        """
+        Replaces the shared connection pool by a new one with the given settings. Wrappers created without a specific
+        session start using the new pool from their next request.
+
+        :param kwargs: settings of the pool, as accepted by build_session().
+        :return: the new shared requests session.
+        """
+        session = build_session(**kwargs)
+
+        with APIWrapper._shared_session_lock:
+            old_session = APIWrapper._shared_session
+            APIWrapper._shared_session = session
+
+        if old_session is not None:
+            old_session.close()
 
-    def _request(self, method, params=None, data=None, is_binary=False):
-        methods = {
-            'GET': requests.get,
-            'PUT': requests.put
-        }
+        return session
+
+    @property
+    def session(self):
+        """
+        :return: the requests session used by this wrapper.
+        """
+        if self._session is None:
+            return self.get_shared_session()
+
+        return self._session
+
+    @classmethod
+    def get_shared_cache(cls):
+        """
+        Retrieves the cache of results shared by all the wrappers, building it the first time if it is enabled in the
+        config.
+        :return: ResultCache object, or None if the shared cache is disabled.
+        """
+        with APIWrapper._shared_session_lock:
+            if not APIWrapper._shared_cache_configured:
+                APIWrapper._shared_cache = build_cache() if config.RESULT_CACHE_ENABLED else None
+                APIWrapper._shared_cache_configured = True
+
+            cache = APIWrapper._shared_cache
+
+        return cache
+
+    @classmethod
+    def configure_cache(cls, enabled=True, **kwargs):
+        """
+        Replaces the shared cache of results by a new one with the given settings. Wrappers created without a specific
+        cache start using the new one from their next request.
+
+        :param enabled: False to disable the shared cache.
+        :param kwargs: settings of the cache, as accepted by build_cache().
+        :return: the new shared ResultCache, or None if it is disabled.
+        """
+        cache = build_cache(**kwargs) if enabled else None
+
+        with APIWrapper._shared_session_lock:
+            old_cache = APIWrapper._shared_cache
+            APIWrapper._shared_cache = cache
+            APIWrapper._shared_cache_configured = True
+
+        if old_cache is not None:
+            old_cache.close()
+
+        return cache
+
+    @property
+    def cache(self):
+        """
+        :return: the ResultCache used by this wrapper, or None if results are not cached.
+        """
+        if self._cache is None:
+            return self.get_shared_cache()
+
+        if self._cache is False:
+            return None
+
+        return self._cache
+
+    @classmethod
+    def configure_backend(cls, backend=None):
+        """
+        Sets the backend shared by the wrappers created without a specific backend or session, from their next
+        request. For example, a FakeBackend to run without the remote service.
+
+        :param backend: Backend object, or None to go back to the HTTP API.
+        :return: the previous shared backend, or None.
+        """
+        with APIWrapper._shared_session_lock:
+            old_backend = APIWrapper._shared_backend
+            APIWrapper._shared_backend = backend
+
+        return old_backend
+
+    @property
+    def backend(self):
+        """
+        :return: the Backend used by this wrapper.
+        """
+        if self._backend is not None:
+            return self._backend
+
+        if self._session is None and APIWrapper._shared_backend is not None:
+            return APIWrapper._shared_backend
+
+        return self._http_backend
+
+    def _request(self, method, params=None, data=None, is_binary=False, files=None, url=None):
+        if url is None:
+            url = self.API_URL
 
         if not is_binary and data is not None:
-            data = data
             headers = {'content-type': 'application/json'}
         else:
             headers = {}
 
-        response = methods[method](self.API_URL, params=params, data=data, headers=headers)
-        return response.json()
+        backend = self.backend
+        is_http = isinstance(backend, HTTPBackend)
+
+        # Only the uploads of content are cached; they are the ones likely to be repeated. The shared cache only
+        # holds answers of the API: the ones of local backends are not mixed with them.
+        cache = self.cache if is_binary and data is not None and files is None else None
+
+        if not is_http and self._cache is None:
+            cache = None
+
+        key = None
+
+        if cache is not None or (self.coalesce and files is None):
+            key = get_cache_key(method, url, b"" if data is None else data, params)
+
+        if cache is not None:
+            result = cache.get(key)
+
+            if result is not None:
+                return result
+
+        if self.coalesce and key is not None:
+            # Requests to different local backends are never shared, even for the same URL and payload.
+            flight_key = key if is_http else (id(backend), key)
+
+            return self._in_flight.do(flight_key, self._send, backend, method, url, params, data, files, headers,
+                                      cache, key)
+
+        return self._send(backend, method, url, params, data, files, headers, cache, key)
+
+    def _send(self, backend, method, url, params, data, files, headers, cache=None, cache_key=None):
+        """
+        Sends a request to a backend, caching its parsed result if a cache is given and the request succeeds.
+        """
+        result, ok = backend.request(method, url, params=params, data=data, files=files, headers=headers,
+                                     timeout=self.timeout)
+
+        if cache is not None and ok:
+            cache.set(cache_key, result)
+
+        return result
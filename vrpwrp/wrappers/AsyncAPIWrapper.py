@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import functools
+import threading
+from vrpwrp.config import config
+from vrpwrp.helpers import json_helper
+from vrpwrp.helpers.result_cache import get_cache_key
+from vrpwrp.wrappers.APIWrapper import APIWrapper
+
+# aiohttp allows to keep many requests in flight from a single thread.
+try:
+    import aiohttp
+    AIOHTTP_LOADED = True
+except Exception as ex:
+    AIOHTTP_LOADED = False
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class AsyncConnectionPool(object):
+    """
+    Pool of keep-alive connections for the asyncio wrappers, with a bound on the number of requests in flight.
+
+    It uses aiohttp when it is available. Otherwise, the requests are sent through the shared requests session of the
+    APIWrapper in the default executor of the event loop.
+    """
+
+    def __init__(self, max_concurrency=None, pool_maxsize=None, timeout=None, session=None):
+        """
+        Initializer of the pool.
+
+        :param max_concurrency: maximum number of requests in flight. By default it is taken from config.
+        :param pool_maxsize: maximum number of connections kept alive per host. By default, max_concurrency.
+        :param timeout: (connect, read) timeouts of the requests, in seconds. By default it is taken from config.
+        :param session: requests session to use instead of aiohttp. Requests are run in the default executor.
+        """
+        if max_concurrency is None:
+            max_concurrency = config.ASYNC_MAX_CONCURRENCY
+
+        if pool_maxsize is None:
+            pool_maxsize = max_concurrency
+
+        if timeout is None:
+            timeout = config.REQUEST_TIMEOUT
+
+        self.max_concurrency = max_concurrency
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self._session = session
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+
+    async def _bind_loop(self):
+        """
+        Binds the pool to the running event loop. The client and the concurrency limit are rebuilt when the pool is
+        used from a different loop, closing the client of the previous one.
+        :return: the running event loop.
+        """
+        loop = asyncio.get_event_loop()
+
+        if loop is not self._loop:
+            client = self._client
+            self._loop = loop
+            self._client = None
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            if client is not None:
+                try:
+                    await client.close()
+                except RuntimeError:
+                    # The previous loop is already closed, and its connections with it.
+                    pass
+
+        return loop
+
+    def _get_client(self):
+        """
+        Retrieves the aiohttp client of the running loop, building it the first time.
+        :return: aiohttp client session.
+        """
+        if self._client is None or self._client.closed:
+            if type(self.timeout) is tuple:
+                timeout = aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+            else:
+                timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.pool_maxsize)
+            self._client = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+        return self._client
+
+    def _uses_aiohttp(self):
+        return AIOHTTP_LOADED and self._session is None
+
+    async def request(self, method, url, params=None, data=None, headers=None):
+        """
+        Sends a request and parses its JSON response.
+
+        :param method: HTTP method of the request.
+        :param url: URL of the request.
+        :param params: query parameters of the request.
+        :param data: body of the request.
+        :param headers: headers of the request.
+        :return: tuple (parsed JSON response, True if the request succeeded).
+        """
+        loop = await self._bind_loop()
+
+        async with self._semaphore:
+            if self._uses_aiohttp():
+                async with self._get_client().request(method, url, params=params, data=data,
+                                                      headers=headers) as response:
+                    return await response.json(content_type=None, loads=json_helper.loads), response.status < 400
+
+            session = self._session if self._session is not None else APIWrapper.get_shared_session()
+            response = await loop.run_in_executor(None, functools.partial(session.request, method, url,
+                                                                          params=params, data=data,
+                                                                          headers=headers, timeout=self.timeout))
+            return json_helper.parse_response(response), getattr(response, "ok", True)
+
+    async def read_url(self, url):
+        """
+        Downloads the content of a URL.
+
+        :param url: URL of the resource.
+        :return: bytes of the resource.
+        """
+        loop = await self._bind_loop()
+
+        async with self._semaphore:
+            if self._uses_aiohttp():
+                async with self._get_client().get(url) as response:
+                    return await response.read()
+
+            session = self._session if self._session is not None else APIWrapper.get_shared_session()
+            response = await loop.run_in_executor(None, functools.partial(session.request, "GET", url,
+                                                                          timeout=self.timeout))
+            return response.content
+
+    async def close(self):
+        """
+        Closes the connections of the pool.
+        """
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class AsyncAPIWrapper(object):
+    """
+    Base class for the asyncio API-REST wrappers. Unless a pool is specified, all the wrappers share the same
+    AsyncConnectionPool, which can be tuned with configure_pool(). They also share the cache of results of the
+    APIWrapper.
+    """
+    _shared_pool = None
+    _shared_pool_lock = threading.Lock()
+
+    def __init__(self, API_URL, pool=None, cache=None):
+        """
+        Initializer of the asyncio API wrapper.
+
+        :param API_URL: URL of the API endpoint.
+        :param pool: AsyncConnectionPool to use. By default it is going to use the shared one.
+        :param cache: ResultCache to use. By default it is going to use the shared one of the APIWrapper, if enabled.
+        False to disable the cache for this wrapper.
+        """
+        self.API_URL = API_URL
+        self._pool = pool
+        self._cache = cache
+
+    @classmethod
+    def get_shared_pool(cls):
+        """
+        Retrieves the pool shared by all the asyncio wrappers, building it the first time.
+        :return: AsyncConnectionPool object.
+        """
+        with AsyncAPIWrapper._shared_pool_lock:
+            if AsyncAPIWrapper._shared_pool is None:
+                AsyncAPIWrapper._shared_pool = AsyncConnectionPool()
+
+            pool = AsyncAPIWrapper._shared_pool
+
+        return pool
+
+    @classmethod
+    def configure_pool(cls, **kwargs):
+        """
+        Replaces the shared pool by a new one with the given settings. The previous pool should be closed by the
+        caller from its event loop if it was already in use.
+
+        :param kwargs: settings of the pool, as accepted by AsyncConnectionPool.
+        :return: the new shared AsyncConnectionPool.
+        """
+        pool = AsyncConnectionPool(**kwargs)
+
+        with AsyncAPIWrapper._shared_pool_lock:
+            AsyncAPIWrapper._shared_pool = pool
+
+        return pool
+
+    @property
+    def pool(self):
+        """
+        :return: the AsyncConnectionPool used by this wrapper.
+        """
+        if self._pool is None:
+            return self.get_shared_pool()
+
+        return self._pool
+
+    @property
+    def cache(self):
+        """
+        :return: the ResultCache used by this wrapper, or None if results are not cached.
+        """
+        if self._cache is None:
+            return APIWrapper.get_shared_cache()
+
+        if self._cache is False:
+            return None
+
+        return self._cache
+
+    async def _request(self, method, params=None, data=None, is_binary=False):
+        if not is_binary and data is not None:
+            headers = {'content-type': 'application/json'}
+        else:
+            headers = {}
+
+        cache = self.cache if is_binary and data is not None else None
+
+        if cache is not None:
+            cache_key = get_cache_key(method, self.API_URL, data, params)
+            result = cache.get(cache_key)
+
+            if result is not None:
+                return result
+
+        result, ok = await self.pool.request(method, self.API_URL, params=params, data=data, headers=headers)
+
+        if cache is not None and ok:
+            cache.set(cache_key, result)
+
+        return result
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from vrpwrp.helpers import image_helper
+from vrpwrp.config import config
+from vrpwrp.wrappers.AsyncAPIWrapper import AsyncAPIWrapper
+from vrpwrp.wrappers.face_detection import FaceDetection
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class AsyncFaceDetection(AsyncAPIWrapper):
+    """
+    Asyncio version of the FaceDetection wrapper. Its methods are coroutines that return the same bounding boxes.
+    """
+    def __init__(self, API_URL=None, **kwargs):
+        """
+        API URL for the Face detection algorithm.
+        :param API_URL: URL for the face detection algorithm. By default it is going to use the public one.
+        :param kwargs: connection options for the AsyncAPIWrapper (pool, cache).
+        :return:
+        """
+        if API_URL is None:
+            API_URL = config.FACE_DETECTION_API
+
+        super().__init__(API_URL, **kwargs)
+
+    async def analyze_bytes(self, image_bytes):
+        """
+        Analyzes an incoming set of raw bytes corresponding to an image file and returns the bounding boxes detected.
+
+        :param image_bytes: array of bytes of an image.
+        :return: list of bounding boxes detected inside the image.
+        """
+        response = await self._request("PUT", data=image_bytes, is_binary=True)
+        return FaceDetection._parse_bounding_boxes(response)
+
+    async def analyze_file(self, filename):
+        """
+        Analyzes a file image and returns the bounding boxes detected.
+
+        :param filename: URI pointing to the filename to analyze..
+        :return: list of bounding boxes detected inside the image.
+        """
+        image_bytes = image_helper.get_file_binary_content(filename)
+        return await self.analyze_bytes(image_bytes)
+
+    async def analyze_url(self, url):
+        """
+        Downloads a URL resource and analyzes its content with @analyze_bytes()..
+
+        :param url: url pointing to an image.
+        :return: list of bounding boxes detected inside the image.
+        """
+        image_bytes = await self.pool.read_url(url)
+        return await self.analyze_bytes(image_bytes)
+
+    async def analyze_pil(self, pillow_image):
+        """
+        Analyzes the content of a Pillow image and returns the detected bounding boxes..
+
+        :param pillow_image: pillow object representing an image..
+        :return: list of bounding boxes detected inside the image.
+        """
+        image_bytes = image_helper.to_byte_array(pillow_image)
+        return await self.analyze_bytes(image_bytes)
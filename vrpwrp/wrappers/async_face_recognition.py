@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from vrpwrp.helpers import image_helper, json_helper
+from vrpwrp.config import config
+from vrpwrp.wrappers import face_recognition
+from vrpwrp.wrappers.AsyncAPIWrapper import AsyncAPIWrapper
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class AsyncFaceRecognition(AsyncAPIWrapper):
+    """
+    Asyncio version of the FaceRecognition wrapper. Its methods are coroutines that return the same embeddings.
+    """
+    def __init__(self, API_URL=None, **kwargs):
+        """
+        API URL for the Face recognition algorithm.
+        :param API_URL: URL for the face recognition algorithm. By default it is going to use the public one.
+        :param kwargs: connection options for the AsyncAPIWrapper (pool, cache).
+        :return:
+        """
+        if API_URL is None:
+            API_URL = config.FACE_RECOGNITION_API
+
+        super().__init__(API_URL, **kwargs)
+
+        # Embeddings are bound to a blocking wrapper, used when numpy is not available.
+        self.face_recognition = face_recognition.FaceRecognition(API_URL)
+
+    async def get_embeddings_from_bytes(self, image_bytes):
+        """
+        Retrieves the face embedding for the given raw array of bytes of an image file.
+
+        :param image_bytes: array of bytes of the image to process.
+        :return: embedding object representing the image of the face.
+        """
+        response = await self._request("GET", data=image_bytes, is_binary=True)
+        return self.face_recognition._parse_embedding(response)
+
+    async def get_embeddings_from_file(self, filename):
+        """
+        Analyzes a file image and returns the embeddings of the face.
+
+        :param filename: URI pointing to the filename to analyze..
+        :return: embedding object representing the image of the face.
+        """
+        image_bytes = image_helper.get_file_binary_content(filename)
+        return await self.get_embeddings_from_bytes(image_bytes)
+
+    async def get_embeddings_from_url(self, url):
+        """
+        Retrieves the face embedding for the image hosted in the given url.
+
+        :param url: url pointing to an image.
+        :return: embedding object representing the image of the face.
+        """
+        image_bytes = await self.pool.read_url(url)
+        return await self.get_embeddings_from_bytes(image_bytes)
+
+    async def get_embeddings_from_pil(self, pillow_image):
+        """
+        Retrieves the face embedding for the given pillow image.
+
+        :param pillow_image: pillow image to process..
+        :return: embedding object representing the image of the face.
+        """
+        image_bytes = image_helper.to_byte_array(pillow_image)
+        return await self.get_embeddings_from_bytes(image_bytes)
+
+    async def get_embeddings_distances(self, embedding_who, embeddings_list):
+        """
+        Computes the distances between an embedding and a list of embeddings. Only when numpy is not available the
+        distances are requested to the API.
+        :param embedding_who: embedding that wants to be compared.
+        :param embeddings_list: the list of embeddings to compare to.
+        :return: an array of the distances between the embedding_who and each of the embeddings in the embeddings_list.
+        """
+        if face_recognition.NUMPY_AVAILABLE:
+            return self.face_recognition.get_embeddings_distances(embedding_who, embeddings_list)
+
+        data = {'who': str(embedding_who), 'subjects': [str(embedding) for embedding in embeddings_list]}
+        values = (await self._request("PUT", data=json_helper.dumps(data)))['distances']
+        return [float(val) for val in values]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+from vrpwrp.config import config
+from vrpwrp.helpers import image_helper
+from vrpwrp.wrappers.AsyncAPIWrapper import AsyncAPIWrapper
+from vrpwrp.wrappers.porn_classification import PornClassification
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class AsyncPornClassification(AsyncAPIWrapper):
+    """
+    Asyncio version of the PornClassification wrapper. Its methods are coroutines that return the same scores. Images
+    are decoded and their segments encoded in the default executor of the event loop.
+    """
+    def __init__(self, API_URL=None, workers=None, **kwargs):
+        """
+        API URL for the Porn classification algorithm.
+        :param API_URL: URL for the porn classification algorithm. By default it is taken from config.
+        :param workers: maximum number of segments of an image encoded and scored at the same time. By default it is
+        taken from config.
+        :param kwargs: connection options for the AsyncAPIWrapper (pool, cache).
+        :return:
+        """
+        if API_URL is None:
+            API_URL = config.PORN_CLASSIFICATION_API
+
+        if workers is None:
+            workers = config.PORN_CLASSIFICATION_WORKERS
+
+        super().__init__(API_URL, **kwargs)
+
+        self.workers = workers
+
+    async def get_score(self, image_bytes):
+        try:
+            porn_score = PornClassification._parse_score(await self._request("PUT", data=image_bytes, is_binary=True))
+        except Exception:
+            porn_score = 0.0
+
+        return porn_score
+
+    async def _score_segment(self, tile, index, semaphore):
+        """
+        Encodes and scores a segment of an image.
+        :return: tuple (index, bounding_box, score, error).
+        """
+        async with semaphore:
+            try:
+                segment_bytes = await asyncio.get_event_loop().run_in_executor(None, tile.encode)
+                score = PornClassification._parse_score(await self._request("PUT", data=segment_bytes,
+                                                                            is_binary=True))
+                return index, tile.get_bounding_box(), score, None
+
+            except Exception as ex:
+                return index, tile.get_bounding_box(), None, ex
+
+    async def get_segments_scores(self, image_bytes, segments_width=1024, segments_height=1024, stop_threshold=None,
+                                  overlap=0):
+        """
+        Scores every segment of an image, with up to `workers` segments at the same time.
+
+        :param image_bytes: array of bytes of an image.
+        :param segments_width: the width of the segments.
+        :param segments_height: the height of the segments.
+        :param stop_threshold: if specified, the segments not scored yet are cancelled as soon as one segment scores
+        this or more.
+        :param overlap: number of pixels shared by contiguous segments.
+        :return: list of tuples (bounding_box, score, error), in the order of the segments. On failure, score is None
+        and error holds the exception. Cancelled segments are not included.
+        """
+        image = await asyncio.get_event_loop().run_in_executor(None, image_helper.get_image, image_bytes)
+        semaphore = asyncio.Semaphore(self.workers)
+        tiles = image_helper.get_tiles(image, segments_width, segments_height, overlap=overlap)
+
+        pending = set(asyncio.ensure_future(self._score_segment(tile, index, semaphore))
+                      for index, tile in enumerate(tiles))
+        results = []
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                results.extend(task.result() for task in done)
+
+                if stop_threshold is not None and any(score is not None and score >= stop_threshold
+                                                      for _, _, score, _ in results):
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        results.sort(key=lambda result: result[0])
+
+        return [(bounding_box, score, error) for _, bounding_box, score, error in results]
+
+    async def get_score_segmented(self, image_bytes, segments_width=1024, segments_height=1024):
+        """
+        Scores every segment of an image.
+
+        :param image_bytes: array of bytes of an image.
+        :param segments_width: the width of the segments.
+        :param segments_height: the height of the segments.
+        :return: list of the scores of the segments, in order. Segments that could not be scored are skipped.
+        """
+        results = await self.get_segments_scores(image_bytes, segments_width, segments_height)
+
+        return [score for _, score, error in results if error is None]
+
+    async def is_porn(self, image_bytes, threshold=0.5):
+        """
+        Checks whether any segment of an image is porn. Scoring stops as soon as one segment is over the threshold.
+
+        :param image_bytes: array of bytes of an image.
+        :param threshold: minimum score of a segment to consider the image porn.
+        :return: True if the image is considered porn.
+        """
+        results = await self.get_segments_scores(image_bytes, stop_threshold=threshold)
+
+        return any(error is None and score >= threshold for _, score, error in results)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import math
+import random
+import threading
+import time
+from vrpwrp.config import config
+from vrpwrp.helpers import image_helper, json_helper
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class Backend(object):
+    """
+    Interface of the backends that answer the requests of the wrappers. A backend receives the requests once they are
+    built (and after the cache and the coalescing of the wrappers), and returns their parsed JSON results.
+    """
+
+    def request(self, method, url, params=None, data=None, files=None, headers=None, timeout=None):
+        """
+        Answers a request.
+
+        :param method: HTTP method of the request.
+        :param url: URL of the endpoint.
+        :param params: query parameters of the request.
+        :param data: body of the request: bytes of an image or a JSON string.
+        :param files: multipart files of the request, as a list of (field, (filename, bytes, content type)).
+        :param headers: headers of the request.
+        :param timeout: (connect, read) timeouts of the request, in seconds.
+        :return: tuple (parsed JSON result, True if the request succeeded). Results of failed requests are not cached.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Releases the resources of the backend.
+        """
+        pass
+
+
+class HTTPBackend(Backend):
+    """
+    Backend that sends the requests to the REST API over HTTP.
+    """
+
+    def __init__(self, session=None):
+        """
+        Initializer of the backend.
+
+        :param session: requests session to use. By default it is going to use the shared connection pool of the
+        wrappers, even if it is replaced later.
+        """
+        self._session = session
+
+    @property
+    def session(self):
+        """
+        :return: the requests session used by this backend.
+        """
+        if self._session is None:
+            from vrpwrp.wrappers.APIWrapper import APIWrapper
+            return APIWrapper.get_shared_session()
+
+        return self._session
+
+    def request(self, method, url, params=None, data=None, files=None, headers=None, timeout=None):
+        response = self.session.request(method, url, params=params, data=data, files=files, headers=headers,
+                                        timeout=timeout)
+
+        return json_helper.parse_response(response), getattr(response, "ok", True)
+
+
+class LocalBackend(Backend):
+    """
+    Backend that answers the requests in-process, with a callable per endpoint, for example a local model. There is
+    no network nor serialization involved: the callables receive the raw payload and return the result directly.
+    """
+
+    def __init__(self, handlers, latency=0.0, jitter=0.0, seed=0):
+        """
+        Initializer of the backend.
+
+        :param handlers: dictionary of URL of the endpoint -> callable(method, data, params, files) that returns the
+        result of a request, with the same structure as the JSON response of the API.
+        :param latency: seconds each request is delayed, to emulate the round trip to a server.
+        :param jitter: maximum number of seconds randomly added to the latency of each request.
+        :param seed: seed of the random jitter, so that load tests are reproducible.
+        """
+        self.handlers = dict(handlers)
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _get_delay(self):
+        """
+        :return: seconds the next request is delayed.
+        """
+        with self._lock:
+            self.requests += 1
+
+            if self.jitter <= 0:
+                return self.latency
+
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def request(self, method, url, params=None, data=None, files=None, headers=None, timeout=None):
+        handler = self.handlers.get(url)
+
+        if handler is None:
+            raise Exception("There is no local handler for the endpoint {}.".format(url))
+
+        delay = self._get_delay()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return handler(method, data, params, files), True
+
+
+class FakeBackend(LocalBackend):
+    """
+    Deterministic stand-in of the REST API: face detection, face recognition and porn classification answers are
+    derived from a hash of the uploaded content, so the same image always gets the same faces, embeddings and scores.
+    It allows to run and benchmark the library without the remote service.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0, max_faces=3, dimensions=128, face_detection_url=None,
+                 face_recognition_url=None, face_recognition_batch_url=None, porn_classification_url=None):
+        """
+        Initializer of the fake backend.
+
+        :param latency: seconds each request is delayed, to emulate the round trip to a server.
+        :param jitter: maximum number of seconds randomly added to the latency of each request.
+        :param seed: seed of the fake answers and of the jitter.
+        :param max_faces: maximum number of faces detected in an image.
+        :param dimensions: number of dimensions of the embeddings.
+        :param face_detection_url: URL answered as the face detection. By default it is taken from config.
+        :param face_recognition_url: URL answered as the face recognition. By default it is taken from config.
+        :param face_recognition_batch_url: URL answered as the batch face recognition. By default it is taken from
+        config, if set.
+        :param porn_classification_url: URL answered as the porn classification. By default it is taken from config.
+        """
+        if face_detection_url is None:
+            face_detection_url = config.FACE_DETECTION_API
+
+        if face_recognition_url is None:
+            face_recognition_url = config.FACE_RECOGNITION_API
+
+        if face_recognition_batch_url is None:
+            face_recognition_batch_url = config.FACE_RECOGNITION_BATCH_API
+
+        if porn_classification_url is None:
+            porn_classification_url = config.PORN_CLASSIFICATION_API
+
+        handlers = {
+            face_detection_url: self.detect_faces,
+            face_recognition_url: self.recognize_face,
+            porn_classification_url: self.classify_porn,
+        }
+
+        if face_recognition_batch_url:
+            handlers[face_recognition_batch_url] = self.recognize_faces
+
+        super().__init__(handlers, latency, jitter, seed)
+
+        self.seed = seed
+        self.max_faces = max_faces
+        self.dimensions = dimensions
+
+    def _get_generator(self, content):
+        """
+        Builds the random generator of the answers for an uploaded content.
+        """
+        if type(content) is str:
+            content = content.encode("UTF-8")
+
+        digest = hashlib.sha256(content).digest()
+
+        return random.Random(int.from_bytes(digest[:8], "little") ^ self.seed)
+
+    def _get_embedding_string(self, image_bytes):
+        """
+        Builds the string of a unit-length embedding for the bytes of an image of a face.
+        """
+        generator = self._get_generator(image_bytes)
+        values = [generator.gauss(0, 1) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(value * value for value in values)) or 1.0
+
+        return "[" + " ".join("{:.8f}".format(value / norm) for value in values) + "]"
+
+    def detect_faces(self, method, data, params=None, files=None):
+        """
+        Answers a face detection request with up to max_faces square faces inside the image. Only the header of the
+        image is read.
+        """
+        width, height = image_helper.get_image_size(data)
+        generator = self._get_generator(data)
+        bounding_boxes = []
+
+        for _ in range(generator.randint(0, self.max_faces)):
+            side = max(1, int(min(width, height) * generator.uniform(0.1, 0.3)))
+            x = generator.randint(0, max(0, width - side))
+            y = generator.randint(0, max(0, height - side))
+            bounding_boxes.append("[{}, {}, {}, {}]".format(x, y, side, side))
+
+        return {'bounding_boxes': bounding_boxes}
+
+    def recognize_face(self, method, data, params=None, files=None):
+        """
+        Answers a face recognition request with the embedding of the face, or a distances request (a JSON body with
+        "who" and "subjects") with the L2 distances between the embeddings.
+        """
+        if method == "PUT":
+            request = json_helper.loads(data)
+            who = _parse_values(request['who'])
+
+            return {'distances': [math.sqrt(sum((a - b) ** 2 for a, b in zip(who, _parse_values(subject))))
+                                  for subject in request['subjects']]}
+
+        return {'embedding_data': {'embedding': self._get_embedding_string(data)}}
+
+    def recognize_faces(self, method, data, params=None, files=None):
+        """
+        Answers a batch face recognition request with the embeddings of the faces of the multipart files.
+        """
+        return {'embeddings_data': [{'embedding': self._get_embedding_string(image_bytes)}
+                                    for _, (_, image_bytes, _) in files]}
+
+    def classify_porn(self, method, data, params=None, files=None):
+        """
+        Answers a porn classification request with a score between 0 and 1.
+        """
+        return {'Image Result': {'Porn Score': "{:.6f}".format(self._get_generator(data).random())}}
+
+
+def _parse_values(embedding_string):
+    """
+    Parses the values of the string of an embedding.
+    """
+    return [float(value) for value in embedding_string.replace("[", " ").replace("]", " ").replace(",", " ").split()]
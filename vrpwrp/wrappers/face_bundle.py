@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.request import urlopen
+from vrpwrp.config import config
 from vrpwrp.helpers import image_helper
+from vrpwrp.helpers.image_process_pool import ImageProcessPool
 from vrpwrp.wrappers.face_detection import FaceDetection
 from vrpwrp.wrappers.face_recognition import FaceRecognition
 
@@ -10,31 +16,223 @@ __author__ = 'Iván de Paz Centeno'
 
 
 class FaceBundle(object):
+    """
+    Bundles the face detection and the face recognition: retrieves the embeddings of every face found in an image.
+    """
 
-    def __init__(self, face_detection=None, face_recognition=None):
+    def __init__(self, face_detection=None, face_recognition=None, workers=None, crop_format=None, crop_quality=None,
+                 crop_max_side=None, process_pool=None):
+        """
+        Initializer of the bundle.
+
+        :param face_detection: face detection object to use. If not specified, it is going to use the default one.
+        :param face_recognition: face recognition object to use. If not specified, it is going to use the default one.
+        :param workers: maximum number of face embeddings requested in parallel for a single image. A value of 1
+        requests them one after another. By default it is taken from config.
+        :param crop_format: format in which the faces are uploaded: "PNG", "JPEG" or "PPM". By default it is taken
+        from config.
+        :param crop_quality: quality of the JPEG compression of the faces. By default it is taken from config.
+        :param crop_max_side: if specified, faces are downscaled before upload so that none of their sides exceeds it,
+        for example to the input size of the face recognition model. By default it is taken from config.
+        :param process_pool: ImageProcessPool to decode, crop and encode the faces in, True to use the shared one, or
+        False to do it in the calling thread. By default it is taken from config.
+        """
         if face_detection is None:
             face_detection = FaceDetection()
 
         if face_recognition is None:
             face_recognition = FaceRecognition()
 
+        if workers is None:
+            workers = config.FACE_BUNDLE_WORKERS
+
+        if crop_format is None:
+            crop_format = config.FACE_BUNDLE_CROP_FORMAT
+
+        if crop_quality is None:
+            crop_quality = config.FACE_BUNDLE_CROP_QUALITY
+
+        if crop_max_side is None:
+            crop_max_side = config.FACE_BUNDLE_CROP_MAX_SIDE
+
+        if process_pool is None:
+            process_pool = config.IMAGE_PROCESS_POOL_ENABLED
+
+        if process_pool is True:
+            process_pool = ImageProcessPool.get_shared_pool()
+
         self.face_detection = face_detection
         self.face_recognition = face_recognition
+        self.workers = workers
+        self.crop_format = crop_format
+        self.crop_quality = crop_quality
+        self.crop_max_side = crop_max_side
+        self.process_pool = process_pool or None
+        self._executor = None
+        self._executor_lock = threading.Lock()
 
-    def process_file(self, uri):
-        image_bytes = image_helper.get_file_binary_content(uri)
+    def _get_executor(self):
+        """
+        Retrieves the thread pool for the embedding requests, building it the first time.
+        :return: ThreadPoolExecutor object.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        return self._executor
+
+    def _encode_crop(self, pil_image, bounding_box):
+        """
+        Crops a face from the image and encodes it for the upload, as configured in the bundle.
+        :param pil_image: PIL image to crop.
+        :param bounding_box: bounding box of the face.
+        :return: bytes of the encoded face.
+        """
+        return image_helper.encode_image(image_helper.crop_by_bbox(pil_image, bounding_box), self.crop_format,
+                                         self.crop_quality, self.crop_max_side)
+
+    def _get_embeddings(self, faces_bytes):
+        """
+        Retrieves the embeddings of the encoded faces as a batch, which is sent in a single request when the face
+        recognition supports it, or in parallel requests if more than one worker is allowed.
+        :param faces_bytes: list of the encoded faces.
+        :return: list of embeddings, in the same order as the faces.
+        """
+        if self.workers <= 1 or len(faces_bytes) <= 1:
+            return [self.face_recognition.get_embeddings_from_bytes(face_bytes) for face_bytes in faces_bytes]
+
+        return self.face_recognition.get_embeddings_from_batch(faces_bytes, executor=self._get_executor())
+
+    def get_faces_from_bytes(self, image_bytes):
+        """
+        Retrieves the bounding boxes and the embeddings of the faces found in the raw bytes of an image file. The image
+        is only decoded if there is any face to crop, in the process pool if the bundle has one.
+        :param image_bytes: array of bytes of an image.
+        :return: tuple (list of bounding boxes, list of numpy embeddings in the same order).
+        """
         bounding_boxes = self.face_detection.analyze_bytes(image_bytes)
-        image = image_helper.get_image(image_bytes)
-        cropped_images = [image_helper.crop_by_bbox(image, bb) for bb in bounding_boxes]
-        embeddings = [self.face_recognition.get_embedding_from_pil(cropped).get_embedding_np() for cropped in cropped_images]
 
-        return embeddings
+        if self.process_pool is not None and len(bounding_boxes) > 0:
+            faces_bytes = self.process_pool.crop_and_encode(image_bytes, bounding_boxes, self.crop_format,
+                                                            self.crop_quality, self.crop_max_side)
+        else:
+            image = image_helper.LazyImage(image_bytes)
+            faces_bytes = [self._encode_crop(image.get_image(), bb) for bb in bounding_boxes]
+
+        embeddings = [embedding.get_embedding_np() for embedding in self._get_embeddings(faces_bytes)]
+
+        return bounding_boxes, embeddings
+
+    def process_bytes(self, image_bytes):
+        """
+        Retrieves the embeddings of the faces found in the raw bytes of an image file. The image is only decoded if
+        there is any face to crop.
+        :param image_bytes: array of bytes of an image.
+        :return: list of numpy embeddings, in the same order as the detected bounding boxes.
+        """
+        return self.get_faces_from_bytes(image_bytes)[1]
+
+    def process_file(self, uri):
+        """
+        Retrieves the embeddings of the faces found in an image file.
+        :param uri: path to the image file.
+        :return: list of numpy embeddings, in the same order as the detected bounding boxes.
+        """
+        image_bytes = image_helper.get_file_binary_content(uri)
+        return self.process_bytes(image_bytes)
 
     def process_url(self, url):
+        """
+        Retrieves the embeddings of the faces found in the image hosted in the given url.
+        :param url: url pointing to an image.
+        :return: list of numpy embeddings, in the same order as the detected bounding boxes.
+        """
         image_bytes = urlopen(url).read()
-        bounding_boxes = self.face_detection.analyze_bytes(image_bytes)
-        image = image_helper.get_image(image_bytes)
-        cropped_images = [image_helper.crop_by_bbox(image, bb) for bb in bounding_boxes]
-        embeddings = [self.face_recognition.get_embedding_from_pil(cropped).get_embedding_np() for cropped in cropped_images]
+        return self.process_bytes(image_bytes)
+
+    def process_uri(self, uri):
+        """
+        Retrieves the embeddings of the faces found in an image, either a local file or an http(s) url.
+        :param uri: path to the image file or url pointing to an image.
+        :return: list of numpy embeddings, in the same order as the detected bounding boxes.
+        """
+        if uri.startswith("http://") or uri.startswith("https://"):
+            return self.process_url(uri)
+
+        return self.process_file(uri)
+
+    def _process_item(self, uri):
+        """
+        Processes an item of a batch, capturing its failure.
+        :param uri: path to the image file or url pointing to an image.
+        :return: tuple (uri, embeddings, error). Either embeddings or error is None.
+        """
+        try:
+            return uri, self.process_uri(uri), None
+        except Exception as ex:
+            return uri, None, ex
+
+    def process_many(self, uris, workers=None, ordered=False, max_pending=None):
+        """
+        Generator that processes a batch of images with a pool of workers. Each worker runs all the stages of an image
+        (reading, detection, cropping and embedding) and several images are in flight at the same time, so that while
+        some of them wait for the network others use the CPU. A failure in an image does not stop the batch.
+
+        :param uris: iterable of paths to image files or urls, or a single path or url, or the path to a directory of
+        image files.
+        :param workers: number of images processed at the same time. By default, the workers of the bundle.
+        :param ordered: True to yield the results in the same order as the uris, False to yield them as they finish.
+        :param max_pending: maximum number of images submitted and not yet yielded. By default, twice the workers.
+        :return: yields tuples (uri, embeddings, error). On failure, embeddings is None and error holds the exception.
+        """
+        if isinstance(uris, str):
+            if os.path.isdir(uris):
+                uris = [os.path.join(uris, filename) for filename in sorted(os.listdir(uris))
+                        if os.path.isfile(os.path.join(uris, filename))]
+            else:
+                uris = [uris]
+
+        if workers is None:
+            workers = self.workers
+
+        if max_pending is None:
+            max_pending = workers * 2
+
+        pending = deque()
+
+        def collect():
+            if ordered:
+                return [pending.popleft().result()]
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.remove(future)
+
+            return [future.result() for future in done]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for uri in uris:
+                    pending.append(executor.submit(self._process_item, uri))
+
+                    if len(pending) >= max_pending:
+                        for result in collect():
+                            yield result
+
+                while pending:
+                    for result in collect():
+                        yield result
+            finally:
+                for future in pending:
+                    future.cancel()
 
-        return embeddings
\ No newline at end of file
+    def close(self):
+        """
+        Releases the threads of the bundle.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
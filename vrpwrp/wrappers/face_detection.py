@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from urllib.request import urlopen
+from PIL import Image
 from vrpwrp.helpers import image_helper
 from vrpwrp.config import config
 from vrpwrp.tools.boundingbox import BoundingBox
@@ -14,16 +15,42 @@ class FaceDetection(APIWrapper):
     """
     Wrapper for FaceDetection API, from Iván de Paz Centeno API-REST service.
     """
-    def __init__(self, API_URL=None):
+    def __init__(self, API_URL=None, max_side=None, max_pixels=None, upload_format=None, upload_quality=None,
+                 **kwargs):
         """
         API URL for the Face detection algorithm.
         :param API_URL: URL for the face detection algorithm. By default it is going to use the public one.
+        :param max_side: if specified, bigger images are downscaled before upload so that none of their sides exceeds
+        it. The bounding boxes are mapped back to the original resolution. By default it is taken from config.
+        :param max_pixels: if specified, bigger images are downscaled before upload so that they do not have more
+        pixels than this. By default it is taken from config.
+        :param upload_format: format of the downscaled images uploaded: "JPEG", "PNG" or "PPM". By default it is taken
+        from config.
+        :param upload_quality: JPEG quality of the downscaled images uploaded. By default it is taken from config.
+        :param kwargs: connection options for the APIWrapper (session, timeout, cache, coalesce, backend).
         :return:
         """
         if API_URL is None:
             API_URL = config.FACE_DETECTION_API
 
-        super().__init__(API_URL)
+        if max_side is None:
+            max_side = config.FACE_DETECTION_MAX_SIDE
+
+        if max_pixels is None:
+            max_pixels = config.FACE_DETECTION_MAX_PIXELS
+
+        if upload_format is None:
+            upload_format = config.FACE_DETECTION_UPLOAD_FORMAT
+
+        if upload_quality is None:
+            upload_quality = config.FACE_DETECTION_UPLOAD_QUALITY
+
+        super().__init__(API_URL, **kwargs)
+
+        self.max_side = max_side
+        self.max_pixels = max_pixels
+        self.upload_format = upload_format
+        self.upload_quality = upload_quality
 
     def analyze_bytes(self, image_bytes):
         """
@@ -44,16 +71,47 @@ class FaceDetection(APIWrapper):
         :param image_bytes: array of bytes of an image.
         :return: list of bounding boxes detected inside the image.
         """
+        if self.max_side is not None or self.max_pixels is not None:
+            width, height = image_helper.get_image_size(image_bytes)
+            scale = image_helper.get_scale((width, height), self.max_side, self.max_pixels)
+
+            if scale < 1:
+                target_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+                image = image_helper.get_image(image_bytes, draft_size=target_size)
 
-        response = self._request("PUT", data=image_bytes, is_binary=True)['bounding_boxes']
+                if image.size != target_size:
+                    image = image.resize(target_size, Image.BILINEAR)
 
-        bounding_boxes = []
+                return self._analyze_downscaled(image, (width, height))
 
-        for bbox in response:
-            bbox_elements = [int(element) for element in bbox.replace("[","").replace("]", "").split(",")]
-            bounding_boxes.append(BoundingBox(*bbox_elements))
+        response = self._request("PUT", data=image_bytes, is_binary=True)
+        return self._parse_bounding_boxes(response)
 
-        return bounding_boxes
+    def _analyze_downscaled(self, pillow_image, original_size):
+        """
+        Uploads a downscaled image and maps the detected bounding boxes back to the original resolution.
+        :param pillow_image: downscaled pillow image.
+        :param original_size: tuple (width, height) of the original image.
+        :return: list of bounding boxes detected inside the image, in coordinates of the original image.
+        """
+        image_bytes = image_helper.encode_image(pillow_image, self.upload_format, self.upload_quality)
+        bounding_boxes = self._parse_bounding_boxes(self._request("PUT", data=image_bytes, is_binary=True))
+
+        scale_x = original_size[0] / pillow_image.size[0]
+        scale_y = original_size[1] / pillow_image.size[1]
+
+        return [BoundingBox(int(round(bbox.x * scale_x)), int(round(bbox.y * scale_y)),
+                            int(round(bbox.width * scale_x)), int(round(bbox.height * scale_y)))
+                for bbox in bounding_boxes]
+
+    @staticmethod
+    def _parse_bounding_boxes(response):
+        """
+        Builds the bounding boxes from the JSON response of the API.
+        :param response: parsed JSON response of the API.
+        :return: list of bounding boxes.
+        """
+        return BoundingBox.from_strings(response['bounding_boxes'])
 
     def analyze_file(self, filename):
         """
@@ -95,6 +153,11 @@ class FaceDetection(APIWrapper):
         :param pillow_image: pillow object representing an image..
         :return: list of bounding boxes detected inside the image.
         """
+        scale = image_helper.get_scale(pillow_image.size, self.max_side, self.max_pixels)
+
+        if scale < 1:
+            return self._analyze_downscaled(image_helper.resize_by_scale(pillow_image, scale), pillow_image.size)
 
         image_bytes = image_helper.to_byte_array(pillow_image)
-        return self.analyze_bytes(image_bytes)
+        response = self._request("PUT", data=image_bytes, is_binary=True)
+        return self._parse_bounding_boxes(response)
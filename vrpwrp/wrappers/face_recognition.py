@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.request import urlopen
-from vrpwrp.helpers import image_helper
+from vrpwrp.helpers import image_helper, json_helper
 from vrpwrp.config import config
+from vrpwrp.tools import distances
 from vrpwrp.tools.embedding import Embedding, NUMPY_LOADED
 from vrpwrp.wrappers.APIWrapper import APIWrapper
 
@@ -17,16 +20,53 @@ class FaceRecognition(APIWrapper):
     """
     Wrapper for FaceRecognition API, from Iván de Paz Centeno API-REST service.
     """
-    def __init__(self, API_URL=None):
+    def __init__(self, API_URL=None, batch_API_URL=None, workers=None, batch_cooldown=None, **kwargs):
         """
         API URL for the Face recognition algorithm.
         :param API_URL: URL for the face recognition algorithm. By default it is going to use the public one.
+        :param batch_API_URL: URL for the batch face recognition algorithm, which embeds several faces in a single
+        request. By default it is taken from config. If empty, batches are sent as parallel single requests.
+        :param workers: maximum number of parallel single requests for a batch. By default it is taken from config.
+        :param batch_cooldown: seconds batches are sent as single requests after a batch request fails, before trying
+        the batch endpoint again. By default it is taken from config.
+        :param kwargs: connection options for the APIWrapper (session, timeout, cache, coalesce, backend).
         :return:
         """
         if API_URL is None:
             API_URL = config.FACE_RECOGNITION_API
 
-        super().__init__(API_URL)
+        if batch_API_URL is None:
+            batch_API_URL = config.FACE_RECOGNITION_BATCH_API
+
+        if workers is None:
+            workers = config.FACE_RECOGNITION_WORKERS
+
+        if batch_cooldown is None:
+            batch_cooldown = config.FACE_RECOGNITION_BATCH_COOLDOWN
+
+        super().__init__(API_URL, **kwargs)
+
+        self.batch_API_URL = batch_API_URL
+        self.workers = workers
+        self.batch_cooldown = batch_cooldown
+        self._batch_retry_time = 0.0
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def __getstate__(self):
+        """
+        The embeddings keep a reference to their wrapper: the thread pool and its lock are left out of the pickled state
+        so that they can be pickled.
+        """
+        state = self.__dict__.copy()
+        del state['_executor'], state['_executor_lock']
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._executor = None
+        self._executor_lock = threading.Lock()
 
     def get_embeddings_from_bytes(self, image_bytes):
         """
@@ -47,9 +87,16 @@ class FaceRecognition(APIWrapper):
         :param image_bytes: array of bytes of the image to process.
         :return: embedding string representing the image of the face.
         """
-        response = self._request("GET", data=image_bytes, is_binary=True)['embedding_data']
-        embedding = Embedding(response['embedding'], self)
-        return embedding
+        response = self._request("GET", data=image_bytes, is_binary=True)
+        return self._parse_embedding(response)
+
+    def _parse_embedding(self, response):
+        """
+        Builds the embedding from the JSON response of the API.
+        :param response: parsed JSON response of the API.
+        :return: embedding object.
+        """
+        return Embedding(response['embedding_data']['embedding'], self)
 
     def get_embeddings_from_file(self, filename):
         """
@@ -93,6 +140,69 @@ class FaceRecognition(APIWrapper):
         image_bytes = image_helper.to_byte_array(pillow_image)
         return self.get_embeddings_from_bytes(image_bytes)
 
+    def _get_embedding_from_image(self, image):
+        """
+        Retrieves the face embedding for either the raw bytes of an image file or a pillow image.
+        """
+        if type(image) is bytes:
+            return self.get_embeddings_from_bytes(image)
+
+        return self.get_embeddings_from_pil(image)
+
+    def _get_executor(self):
+        """
+        Retrieves the thread pool for the parallel single requests, building it the first time.
+        :return: ThreadPoolExecutor object.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        return self._executor
+
+    def get_embeddings_from_batch(self, images, executor=None):
+        """
+        Retrieves the face embeddings for several images of faces at once.
+
+        If a batch endpoint is available, all the images are packed into a single multipart request. Otherwise, or if
+        the endpoint does not answer with a batch of embeddings, a single request is sent for each image, in parallel.
+        After such a failure, the batch endpoint is only tried again once batch_cooldown seconds have passed.
+
+        :param images: list of images of faces, either as raw bytes of image files or as pillow images.
+        :param executor: executor for the parallel single requests. By default, a thread pool of this object.
+        :return: list of embeddings, in the same order as the images.
+        """
+        if len(images) == 0:
+            return []
+
+        if self.batch_API_URL and time.time() >= self._batch_retry_time:
+            files = [("images", ("face{}".format(index), image if type(image) is bytes else
+                                 image_helper.to_byte_array(image), "application/octet-stream"))
+                     for index, image in enumerate(images)]
+
+            try:
+                response = self._request("PUT", files=files, is_binary=True, url=self.batch_API_URL)
+                embeddings = Embedding.from_strings([embedding_data['embedding']
+                                                     for embedding_data in response['embeddings_data']], self)
+
+                if len(embeddings) == len(images):
+                    return embeddings
+
+            except (KeyError, TypeError, ValueError):
+                pass
+
+            # The response is not a batch of embeddings: the endpoint does not support batching, or it failed for a
+            # moment. Single requests are sent for a while before trying again.
+            self._batch_retry_time = time.time() + self.batch_cooldown
+
+        if len(images) == 1:
+            return [self._get_embedding_from_image(images[0])]
+
+        if executor is None:
+            executor = self._get_executor()
+
+        return list(executor.map(self._get_embedding_from_image, images))
+
     def get_embeddings_distance(self, embedding1, embedding2):
         """
         Computes the distance between two embeddings. The distance is a float number.
@@ -117,11 +227,27 @@ class FaceRecognition(APIWrapper):
         global NUMPY_AVAILABLE
 
         if NUMPY_AVAILABLE:
-            result = [embedding_who - emb for emb in embeddings_list]
+            result = distances.embeddings_distances(embedding_who, embeddings_list).tolist()
         else:
             data={'who': str(embedding_who), 'subjects': [str(embedding) for embedding in embeddings_list]}
-            values = self._request("PUT", data=json.dumps(data))['distances']
+            values = self._request("PUT", data=json_helper.dumps(data))['distances']
             result = [float(val) for val in values]
 
         return result
 
+    def get_embeddings_distance_matrix(self, embeddings_probes, embeddings_list, dtype=None):
+        """
+        Computes the distances between each one of the probes and each one of the embeddings of a list.
+        :param embeddings_probes: the list of embeddings that want to be compared.
+        :param embeddings_list: the list of embeddings to compare to.
+        :param dtype: numpy type for the computation, for example numpy.float32. Ignored without numpy.
+        :return: a matrix (numpy array if available, list of lists otherwise) with a row of distances per probe.
+        """
+        global NUMPY_AVAILABLE
+
+        if NUMPY_AVAILABLE:
+            result = distances.embeddings_distance_matrix(embeddings_probes, embeddings_list, dtype=dtype)
+        else:
+            result = [self.get_embeddings_distances(probe, embeddings_list) for probe in embeddings_probes]
+
+        return result
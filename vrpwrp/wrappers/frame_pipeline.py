@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from vrpwrp.config import config
+from vrpwrp.helpers import image_helper, video_helper
+from vrpwrp.wrappers.face_bundle import FaceBundle
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class FramePipeline(object):
+    """
+    Streaming pipeline that detects (and optionally recognizes) the faces of every frame of a video or an image
+    sequence.
+
+    Frames are read lazily from the source and handed to a pool of workers, which encode and upload them while the
+    next frames are being read. At most look_ahead frames are in flight: reading waits for the oldest frame to finish,
+    so the memory stays flat no matter the length of the input.
+    """
+
+    def __init__(self, face_bundle=None, workers=None, look_ahead=None, frame_format=None, frame_quality=None,
+                 compute_embeddings=True):
+        """
+        Initializer of the pipeline.
+
+        :param face_bundle: face bundle to use for the detection and recognition of the faces. If not specified, it is
+        going to use the default one.
+        :param workers: number of frames processed at the same time. By default it is taken from config.
+        :param look_ahead: maximum number of frames read and not yet yielded. By default it is taken from config.
+        :param frame_format: format in which the decoded frames are uploaded: "JPEG", "PNG" or "PPM". Files of image
+        sequences are uploaded as they are. By default it is taken from config.
+        :param frame_quality: quality of the JPEG compression of the frames. By default it is taken from config.
+        :param compute_embeddings: False to only detect the faces, without face recognition.
+        """
+        if face_bundle is None:
+            face_bundle = FaceBundle()
+
+        if workers is None:
+            workers = config.FRAME_PIPELINE_WORKERS
+
+        if look_ahead is None:
+            look_ahead = config.FRAME_PIPELINE_LOOK_AHEAD
+
+        if frame_format is None:
+            frame_format = config.FRAME_PIPELINE_FORMAT
+
+        if frame_quality is None:
+            frame_quality = config.FRAME_PIPELINE_QUALITY
+
+        self.face_bundle = face_bundle
+        self.workers = workers
+        self.look_ahead = max(look_ahead, workers)
+        self.frame_format = frame_format
+        self.frame_quality = frame_quality
+        self.compute_embeddings = compute_embeddings
+
+    def _encode_frame(self, frame):
+        """
+        Encodes a frame for the upload. Frames that are already the bytes of an image file are not re-encoded.
+        :param frame: PIL image or bytes of an image file.
+        :return: bytes of the encoded frame.
+        """
+        if type(frame) is bytes:
+            return frame
+
+        return image_helper.encode_image(frame, self.frame_format, self.frame_quality)
+
+    def _process_frame(self, frame_number, frame):
+        """
+        Processes a frame, capturing its failure.
+        :return: tuple (frame number, bounding boxes, embeddings, error).
+        """
+        try:
+            image_bytes = self._encode_frame(frame)
+
+            if self.compute_embeddings:
+                bounding_boxes, embeddings = self.face_bundle.get_faces_from_bytes(image_bytes)
+            else:
+                bounding_boxes, embeddings = self.face_bundle.face_detection.analyze_bytes(image_bytes), None
+
+            return frame_number, bounding_boxes, embeddings, None
+
+        except Exception as ex:
+            return frame_number, None, None, ex
+
+    def process(self, source, step=1, every_seconds=None):
+        """
+        Generator that processes the frames of a source.
+
+        :param source: path to a video file (requires OpenCV), path to a directory of image files, list of paths to
+        image files, or iterable of PIL images or bytes of image files.
+        :param step: only one of each `step` frames is processed.
+        :param every_seconds: for video files, only one frame every this number of seconds is processed.
+        :return: yields tuples (frame number, bounding boxes, embeddings, error) in the order of the frames. On
+        failure, bounding boxes and embeddings are None and error holds the exception. Embeddings are None too if
+        they are not computed.
+        """
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                for frame_number, frame in video_helper.iterate_frames(source, step, every_seconds):
+                    pending.append(executor.submit(self._process_frame, frame_number, frame))
+
+                    if len(pending) >= self.look_ahead:
+                        yield pending.popleft().result()
+
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
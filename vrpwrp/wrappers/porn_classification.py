@@ -1,46 +1,286 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from vrpwrp.config import config
 from vrpwrp.helpers import image_helper
+from vrpwrp.helpers.image_process_pool import ImageProcessPool, SharedImage
 from vrpwrp.wrappers.APIWrapper import APIWrapper
 
 __author__ = 'Iván de Paz Centeno'
 
 
 class PornClassification(APIWrapper):
-    def __init__(self, API_URL=None):
+    """
+    Wrapper for PornClassification API, from Iván de Paz Centeno API-REST service.
+    """
+    def __init__(self, API_URL=None, workers=None, process_pool=None, **kwargs):
+        """
+        API URL for the Porn classification algorithm.
+        :param API_URL: URL for the porn classification algorithm. By default it is taken from config.
+        :param workers: maximum number of segments of an image scored in parallel. By default it is taken from config.
+        :param process_pool: ImageProcessPool to decode and encode the segments in, True to use the shared one, or
+        False to do it in the calling threads. By default it is taken from config.
+        :param kwargs: connection options for the APIWrapper (session, timeout, cache, coalesce, backend).
+        :return:
+        """
         if API_URL is None:
             API_URL = config.PORN_CLASSIFICATION_API
 
-        super().__init__(API_URL)
+        if workers is None:
+            workers = config.PORN_CLASSIFICATION_WORKERS
+
+        if process_pool is None:
+            process_pool = config.IMAGE_PROCESS_POOL_ENABLED
+
+        if process_pool is True:
+            process_pool = ImageProcessPool.get_shared_pool()
+
+        super().__init__(API_URL, **kwargs)
+
+        self.workers = workers
+        self.process_pool = process_pool or None
+        self._executor = None
+        self._executor_lock = threading.Lock()
 
     def get_score(self, image_bytes):
         try:
-            response = self._request("PUT", data=image_bytes, is_binary=True)['Image Result']
-            porn_score = float(response['Porn Score'])
-        except:
+            porn_score = self._parse_score(self._request("PUT", data=image_bytes, is_binary=True))
+        except Exception:
             porn_score = 0.0
 
         return porn_score
 
+    def _get_executor(self):
+        """
+        Retrieves the thread pool for scoring the segments, building it the first time.
+        :return: ThreadPoolExecutor object.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        return self._executor
+
+    def _decode_image(self, image_bytes):
+        """
+        Decodes an image to segment it: into shared memory by the process pool if there is one, or as a PIL image.
+        :return: SharedImage object or PIL image.
+        """
+        if self.process_pool is not None:
+            return self.process_pool.decode(image_bytes)
+
+        return image_helper.get_image(image_bytes)
+
+    def _encode_tile(self, tile):
+        """
+        Crops and encodes a segment of an image, in the process pool if the image is in shared memory.
+        :return: bytes of the encoded segment.
+        """
+        if isinstance(tile.source, SharedImage):
+            return self.process_pool.encode_regions(tile.source, [tile.get_bounding_box()])[0]
+
+        return tile.encode()
+
+    def _score_segment(self, tile, index):
+        """
+        Crops, encodes and scores a segment of an image.
+        :return: tuple (index, bounding_box, score, error).
+        """
+        try:
+            score = self._parse_score(self._request("PUT", data=self._encode_tile(tile), is_binary=True))
+            return index, tile.get_bounding_box(), score, None
+
+        except Exception as ex:
+            return index, tile.get_bounding_box(), None, ex
+
+    def get_segments_scores(self, image_bytes, segments_width=1024, segments_height=1024, stop_threshold=None,
+                            overlap=0):
+        """
+        Scores every segment of an image, sending up to `workers` segments in parallel. Segments are cropped and
+        encoded by the workers as they are needed, so only a bounded number of them is in memory at the same time.
+
+        :param image_bytes: array of bytes of an image.
+        :param segments_width: the width of the segments.
+        :param segments_height: the height of the segments.
+        :param stop_threshold: if specified, the segments not scored yet are cancelled as soon as one segment scores
+        this or more.
+        :param overlap: number of pixels shared by contiguous segments.
+        :return: list of tuples (bounding_box, score, error), in the order of the segments. On failure, score is None
+        and error holds the exception. Cancelled segments are not included.
+        """
+        image = self._decode_image(image_bytes)
+
+        try:
+            return self._score_segments(image, segments_width, segments_height, stop_threshold, overlap)
+        finally:
+            if isinstance(image, SharedImage):
+                image.close()
+
+    def _score_segments(self, image, segments_width, segments_height, stop_threshold=None, overlap=0):
+        """
+        Scores every segment of a PIL image or a SharedImage in parallel. See get_segments_scores().
+        """
+        executor = self._get_executor()
+        max_pending = self.workers * 2
+
+        results = []
+        pending = set()
+
+        def collect():
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            stop = False
+
+            for future in done:
+                pending.remove(future)
+                result = future.result()
+                results.append(result)
+
+                score = result[2]
+                stop = stop or (stop_threshold is not None and score is not None and score >= stop_threshold)
+
+            return stop
+
+        stop = False
+
+        try:
+            tiles = image_helper.get_tiles(image, segments_width, segments_height, overlap=overlap)
+
+            for index, tile in enumerate(tiles):
+                pending.add(executor.submit(self._score_segment, tile, index))
+
+                if len(pending) >= max_pending:
+                    stop = collect()
+
+                    if stop:
+                        break
+
+            while pending and not stop:
+                stop = collect()
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+        results.sort(key=lambda result: result[0])
+
+        return [(bounding_box, score, error) for _, bounding_box, score, error in results]
+
     def get_score_segmented(self, image_bytes, segments_width=1024, segments_height=1024):
-        porn_scores = []
+        """
+        Scores every segment of an image in parallel.
+
+        :param image_bytes: array of bytes of an image.
+        :param segments_width: the width of the segments.
+        :param segments_height: the height of the segments.
+        :return: list of the scores of the segments, in order. Segments that could not be scored are skipped.
+        """
+        return [score for _, score, error in self.get_segments_scores(image_bytes, segments_width, segments_height)
+                if error is None]
+
+    def get_score_adaptive(self, image_bytes, coarse_side=None, uncertain_band=None, segments_width=1024,
+                           segments_height=1024, overlap=None, stop_threshold=None):
+        """
+        Scores an image in two passes. A downscaled version of the whole image is scored first, and only if its score
+        is within the uncertain band the image is refined into segments at full resolution. Most images are decided
+        with a single request, and the full image is only decoded when refining.
+
+        :param image_bytes: array of bytes of an image.
+        :param coarse_side: maximum size of the sides of the downscaled image. By default it is taken from config.
+        :param uncertain_band: tuple (low, high) of scores of the downscaled image that require refining. By default
+        it is taken from config.
+        :param segments_width: the width of the segments.
+        :param segments_height: the height of the segments.
+        :param overlap: number of pixels shared by contiguous segments, to catch content across their borders. By
+        default it is taken from config.
+        :param stop_threshold: score the caller compares the result with. The uncertain band is widened to include it,
+        and the segments not scored yet are cancelled as soon as one segment scores this or more. By default, the high
+        end of the uncertain band.
+        :return: the score of the downscaled image if it is decided, or the highest score of the segments otherwise.
+        If no segment could be scored, the score of the downscaled image, or 0.0 if it could not be scored either.
+        """
+        if coarse_side is None:
+            coarse_side = config.PORN_CLASSIFICATION_COARSE_SIDE
+
+        if uncertain_band is None:
+            uncertain_band = config.PORN_CLASSIFICATION_UNCERTAIN_BAND
+
+        if overlap is None:
+            overlap = config.PORN_CLASSIFICATION_SEGMENTS_OVERLAP
 
-        image = image_helper.get_image(image_bytes)
+        low, high = uncertain_band
+
+        if stop_threshold is None:
+            stop_threshold = high
+
+        low, high = min(low, stop_threshold), max(high, stop_threshold)
+        width, height = image_helper.get_image_size(image_bytes)
+        scale = image_helper.get_scale((width, height), coarse_side)
+
+        if scale < 1 and self.process_pool is not None:
+            coarse_bytes = self.process_pool.get_preview(image_bytes, coarse_side)
+        elif scale < 1:
+            coarse_bytes = image_helper.to_byte_array(image_helper.get_preview(image_bytes, coarse_side))
+        else:
+            coarse_bytes = image_bytes
 
         try:
-            for pil_image in image_helper.segment_image(image, segments_width, segments_height):
-                response = self._request("PUT", data=image_helper.to_byte_array(pil_image), is_binary=True)['Image Result']
-                score = float(response['Porn Score'])
-                porn_scores.append(score)
-                print(score)
+            coarse_score = self._parse_score(self._request("PUT", data=coarse_bytes, is_binary=True))
+        except Exception:
+            # Undecided: the segments will tell.
+            coarse_score = None
+
+        fits_in_segment = width <= segments_width and height <= segments_height
+
+        if coarse_score is not None and (coarse_score < low or coarse_score >= high or
+                                         (scale >= 1 and fits_in_segment)):
+            return coarse_score
+
+        results = self.get_segments_scores(image_bytes, segments_width, segments_height,
+                                           stop_threshold=stop_threshold, overlap=overlap)
+
+        scores = [score for _, score, error in results if error is None]
+
+        if len(scores) == 0:
+            # Every segment failed: the downscaled pass is all there is.
+            return 0.0 if coarse_score is None else coarse_score
+
+        return max(scores)
+
+    @staticmethod
+    def _parse_score(response):
+        """
+        Retrieves the porn score from the JSON response of the API.
+        :param response: parsed JSON response of the API.
+        :return: porn score as a float.
+        """
+        return float(response['Image Result']['Porn Score'])
+
+    def is_porn(self, image_bytes, threshold=0.5, adaptive=None):
+        """
+        Checks whether any segment of an image is porn. Scoring stops as soon as one segment is over the threshold.
+
+        :param image_bytes: array of bytes of an image.
+        :param threshold: minimum score of a segment to consider the image porn.
+        :param adaptive: True to score a downscaled image first and only refine it into segments when its score is
+        uncertain (see get_score_adaptive()). By default it is taken from config.
+        :return: True if the image is considered porn.
+        """
+        if adaptive is None:
+            adaptive = config.PORN_CLASSIFICATION_ADAPTIVE
 
-        except:
-            pass
+        if adaptive:
+            return self.get_score_adaptive(image_bytes, stop_threshold=threshold) >= threshold
 
-        return porn_scores
+        results = self.get_segments_scores(image_bytes, stop_threshold=threshold)
+        return any(error is None and score >= threshold for _, score, error in results)
 
-    def is_porn(self, image_bytes):
-        scores = self.get_score_segmented(image_bytes)
-        return any([score >= 0.5 for score in scores])
\ No newline at end of file
+    def close(self):
+        """
+        Releases the threads of the wrapper.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from PIL import Image, ImageChops, ImageStat
+from vrpwrp.config import config
+from vrpwrp.helpers import image_helper
+from vrpwrp.tools.boundingbox import BoundingBox, BoundingBoxArray, NUMPY_LOADED
+from vrpwrp.wrappers.face_detection import FaceDetection
+from vrpwrp.wrappers.face_recognition import FaceRecognition
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class FaceTrack(object):
+    """
+    A face followed across the frames of a video, with its last known bounding box, its motion and its embedding.
+    """
+
+    def __init__(self, track_id, bounding_box, frame_number, embedding=None):
+        """
+        Initializer of the track.
+
+        :param track_id: identifier of the track, unique within a tracker.
+        :param bounding_box: bounding box of the face when it was detected.
+        :param frame_number: number of the frame in which it was detected.
+        :param embedding: Embedding of the face, if already computed.
+        """
+        self.track_id = track_id
+        self.bounding_box = bounding_box
+        self.embedding = embedding
+        self.first_frame = frame_number
+        self.last_frame = frame_number
+        self.missed = 0
+        self.velocity = (0.0, 0.0)
+
+    def predict(self, frame_number):
+        """
+        Estimates the bounding box of the face in a frame, moving it at the velocity measured between detections.
+
+        :param frame_number: number of the frame.
+        :return: BoundingBox object.
+        """
+        elapsed = frame_number - self.last_frame
+        bbox = self.bounding_box
+
+        return BoundingBox(int(round(bbox.x + self.velocity[0] * elapsed)),
+                           int(round(bbox.y + self.velocity[1] * elapsed)), bbox.width, bbox.height)
+
+    def update(self, bounding_box, frame_number):
+        """
+        Updates the track with a new detection of its face.
+
+        :param bounding_box: bounding box of the detected face.
+        :param frame_number: number of the frame in which it was detected.
+        """
+        elapsed = frame_number - self.last_frame
+
+        if elapsed > 0:
+            self.velocity = ((bounding_box.x - self.bounding_box.x) / elapsed,
+                             (bounding_box.y - self.bounding_box.y) / elapsed)
+
+        self.bounding_box = bounding_box
+        self.last_frame = frame_number
+        self.missed = 0
+
+    def __repr__(self):
+        """
+        :return: representation string to display in console directly, rather than "FaceTrack object".
+        """
+        return "FaceTrack {}: {}".format(self.track_id, self.bounding_box.get_box())
+
+
+class VideoFaceTracker(object):
+    """
+    Follows the faces of a video frame by frame, calling the face detection only on keyframes: every
+    keyframe_interval frames or when the scene changes. In between, the faces are moved with the motion measured
+    between detections. Detections are associated to the existing tracks by IoU, and the embedding of each face is
+    computed only once per track.
+    """
+
+    def __init__(self, face_detection=None, face_recognition=None, keyframe_interval=None,
+                 scene_change_threshold=None, iou_threshold=None, max_missed=None, compute_embeddings=True):
+        """
+        Initializer of the tracker.
+
+        :param face_detection: face detection object to use. If not specified, it is going to use the default one.
+        :param face_recognition: face recognition object to use. If not specified, it is going to use the default one.
+        :param keyframe_interval: maximum number of frames between detections. By default it is taken from config.
+        :param scene_change_threshold: mean difference of pixels (0-255) between consecutive frames, over which the
+        scene is considered changed and the faces are detected again. By default it is taken from config.
+        :param iou_threshold: minimum IoU between a detection and the predicted box of a track to associate them. By
+        default it is taken from config.
+        :param max_missed: number of consecutive keyframes a track may be missing from the detections before it is
+        dropped. By default it is taken from config.
+        :param compute_embeddings: False to only track the bounding boxes, without face recognition.
+        """
+        if face_detection is None:
+            face_detection = FaceDetection()
+
+        if face_recognition is None and compute_embeddings:
+            face_recognition = FaceRecognition()
+
+        if keyframe_interval is None:
+            keyframe_interval = config.VIDEO_KEYFRAME_INTERVAL
+
+        if scene_change_threshold is None:
+            scene_change_threshold = config.VIDEO_SCENE_CHANGE_THRESHOLD
+
+        if iou_threshold is None:
+            iou_threshold = config.VIDEO_TRACK_IOU_THRESHOLD
+
+        if max_missed is None:
+            max_missed = config.VIDEO_TRACK_MAX_MISSED
+
+        self.face_detection = face_detection
+        self.face_recognition = face_recognition
+        self.keyframe_interval = keyframe_interval
+        self.scene_change_threshold = scene_change_threshold
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.compute_embeddings = compute_embeddings
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets all the tracks and the previous frames, to start with a new video.
+        """
+        self._tracks = []
+        self._next_track_id = 0
+        self._frame_number = -1
+        self._last_keyframe = None
+        self._last_thumbnail = None
+
+        self.detection_calls = 0
+        self.embedding_calls = 0
+        self.embeddings = 0
+
+    def get_tracks(self):
+        """
+        :return: list of the FaceTrack objects currently followed.
+        """
+        return list(self._tracks)
+
+    def get_stats(self):
+        """
+        :return: dictionary with the number of "frames" processed, "detection_calls", "embedding_calls" (batches of
+        faces sent), "embeddings" (faces embedded) and active "tracks".
+        """
+        return {
+            "frames": self._frame_number + 1,
+            "detection_calls": self.detection_calls,
+            "embedding_calls": self.embedding_calls,
+            "embeddings": self.embeddings,
+            "tracks": len(self._tracks),
+        }
+
+    @staticmethod
+    def _get_thumbnail(pillow_image):
+        """
+        Builds the tiny grayscale version of a frame used to detect scene changes.
+        """
+        return pillow_image.resize((32, 32), Image.BILINEAR).convert("L")
+
+    def _is_scene_change(self, thumbnail):
+        """
+        Checks whether a frame is too different from the previous one to keep following the faces.
+        """
+        if self._last_thumbnail is None:
+            return True
+
+        difference = ImageStat.Stat(ImageChops.difference(thumbnail, self._last_thumbnail)).mean[0]
+
+        return difference > self.scene_change_threshold
+
+    def _get_iou_matrix(self, boxes, other_boxes):
+        """
+        Computes the IoU of each pair of boxes of two lists of bounding boxes.
+        """
+        if NUMPY_LOADED:
+            return BoundingBoxArray.from_bounding_boxes(boxes).get_iou(
+                BoundingBoxArray.from_bounding_boxes(other_boxes)).tolist()
+
+        matrix = []
+
+        for bbox in boxes:
+            row = []
+
+            for other_bbox in other_boxes:
+                intersection = bbox.intersect_with(other_bbox).get_area()
+                union = bbox.get_area() + other_bbox.get_area() - intersection
+                row.append(intersection / union if union > 0 else 0.0)
+
+            matrix.append(row)
+
+        return matrix
+
+    def _associate(self, bounding_boxes):
+        """
+        Pairs the detected bounding boxes with the tracks, greedily from the highest IoU with their predicted boxes.
+        :return: tuple (list of pairs (track, bounding box), list of unmatched bounding boxes).
+        """
+        if len(self._tracks) == 0 or len(bounding_boxes) == 0:
+            return [], list(bounding_boxes)
+
+        predictions = [track.predict(self._frame_number) for track in self._tracks]
+        iou = self._get_iou_matrix(predictions, bounding_boxes)
+
+        candidates = sorted(((iou[i][j], i, j) for i in range(len(predictions)) for j in range(len(bounding_boxes))
+                             if iou[i][j] >= self.iou_threshold), reverse=True)
+
+        matched_tracks = set()
+        matched_boxes = set()
+        pairs = []
+
+        for _, i, j in candidates:
+            if i not in matched_tracks and j not in matched_boxes:
+                matched_tracks.add(i)
+                matched_boxes.add(j)
+                pairs.append((self._tracks[i], bounding_boxes[j]))
+
+        unmatched = [bbox for j, bbox in enumerate(bounding_boxes) if j not in matched_boxes]
+
+        return pairs, unmatched
+
+    def _compute_embeddings(self, pillow_image, tracks):
+        """
+        Computes the embeddings of the tracks that do not have one yet, in a single batch.
+        """
+        tracks = [track for track in tracks if track.embedding is None]
+
+        if not self.compute_embeddings or len(tracks) == 0:
+            return
+
+        size = pillow_image.size
+        faces = []
+
+        for track in tracks:
+            bbox = BoundingBox(*track.bounding_box.get_box())
+            bbox.fit_in_size(size)
+            faces.append(image_helper.crop_by_bbox(pillow_image, bbox))
+
+        embeddings = self.face_recognition.get_embeddings_from_batch(faces)
+        self.embedding_calls += 1
+        self.embeddings += len(faces)
+
+        for track, embedding in zip(tracks, embeddings):
+            track.embedding = embedding
+
+    def _detect(self, pillow_image, scene_changed):
+        """
+        Detects the faces of a keyframe and updates the tracks with them.
+        """
+        bounding_boxes = self.face_detection.analyze_pil(pillow_image)
+        self.detection_calls += 1
+        self._last_keyframe = self._frame_number
+
+        if scene_changed:
+            # After a cut, the faces on screen are not the same ones.
+            self._tracks = []
+
+        pairs, unmatched = self._associate(bounding_boxes)
+        matched = set()
+
+        for track, bbox in pairs:
+            track.update(bbox, self._frame_number)
+            matched.add(track.track_id)
+
+        for track in self._tracks:
+            if track.track_id not in matched:
+                track.missed += 1
+
+        self._tracks = [track for track in self._tracks if track.missed <= self.max_missed]
+
+        new_tracks = []
+
+        for bbox in unmatched:
+            new_tracks.append(FaceTrack(self._next_track_id, bbox, self._frame_number))
+            self._next_track_id += 1
+
+        self._tracks.extend(new_tracks)
+        self._compute_embeddings(pillow_image, [track for track, _ in pairs] + new_tracks)
+
+    def process_frame(self, pillow_image):
+        """
+        Processes the next frame of the video.
+
+        :param pillow_image: PIL image of the frame.
+        :return: list of tuples (track_id, bounding box, embedding) of the faces in the frame. The bounding box is
+        the detected one on keyframes, and the predicted one otherwise. The embedding is None if not computed.
+        """
+        self._frame_number += 1
+
+        thumbnail = self._get_thumbnail(pillow_image)
+        scene_changed = self._is_scene_change(thumbnail)
+        self._last_thumbnail = thumbnail
+
+        if scene_changed or self._frame_number - self._last_keyframe >= self.keyframe_interval:
+            self._detect(pillow_image, scene_changed)
+
+            return [(track.track_id, track.bounding_box, track.embedding) for track in self._tracks
+                    if track.last_frame == self._frame_number]
+
+        return [(track.track_id, track.predict(self._frame_number), track.embedding) for track in self._tracks
+                if track.missed == 0]
+
+    def process_frames(self, frames):
+        """
+        Generator that processes the frames of a video one by one.
+
+        :param frames: iterable of PIL images.
+        :return: yields the result of process_frame() for each frame.
+        """
+        for pillow_image in frames:
+            yield self.process_frame(pillow_image)